@@ -0,0 +1,235 @@
+'''
+Tag-based response cache shared by handlers.
+Entries live in Redis, with a short-lived copy in process memory, and carry tags
+such as 'news' or 'partners'. Write paths call invalidate(tag): the tagged Redis
+keys are deleted and the tag is published on CACHE_INVALIDATION_CHANNEL, so every
+worker drops its in-memory copies as well. That keeps long TTLs safe.
+Usage: from _shared.cache import get_or_set, invalidate
+'''
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .logging import log_event
+from .security import get_redis_client
+
+CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', '3600'))
+# tag sets outlive every entry they index, so entry TTLs are capped at this value
+CACHE_TAG_TTL = int(os.environ.get('CACHE_TAG_TTL', str(7 * 24 * 3600)))
+CACHE_LOCAL_TTL = float(os.environ.get('CACHE_LOCAL_TTL', '300'))
+CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', '1024'))
+CACHE_INVALIDATION_CHANNEL = os.environ.get('CACHE_INVALIDATION_CHANNEL', 'cache:invalidate')
+CACHE_RECONNECT_SECONDS = float(os.environ.get('CACHE_RECONNECT_SECONDS', '5'))
+
+TAG_KEY_PREFIX = 'cache:tag:'
+GENERATION_KEY_PREFIX = 'cache:gen:'
+
+_lock = threading.Lock()
+# key -> (expires_at, tags, value)
+_local: 'OrderedDict[str, Tuple[float, Tuple[str, ...], str]]' = OrderedDict()
+_local_generations: Dict[str, int] = {}
+_stats = {'local_hits': 0, 'redis_hits': 0, 'misses': 0, 'invalidations': 0, 'errors': 0}
+_subscriber_pid: Optional[int] = None
+_subscribed = threading.Event()
+
+
+def _client():
+    return get_redis_client()
+
+
+def _normalize_tags(tags: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(sorted({tag for tag in tags if tag}))
+
+
+def _local_get(key: str) -> Optional[str]:
+    if not _subscribed.is_set():
+        return None
+    with _lock:
+        entry = _local.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _local[key]
+            return None
+        _local.move_to_end(key)
+        return entry[2]
+
+
+def _local_set(key: str, value: str, tags: Tuple[str, ...], ttl: float, generations: Optional[List[int]] = None) -> None:
+    # without a live subscription this worker would never hear about invalidations
+    if not _subscribed.is_set():
+        return
+    with _lock:
+        if generations is not None and generations != [_local_generations.get(tag, 0) for tag in tags]:
+            return
+        _local[key] = (time.monotonic() + min(ttl, CACHE_LOCAL_TTL), tags, value)
+        _local.move_to_end(key)
+        while len(_local) > CACHE_LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def _drop_local(tags: Iterable[str]) -> None:
+    tags = frozenset(tags)
+    with _lock:
+        for tag in tags:
+            _local_generations[tag] = _local_generations.get(tag, 0) + 1
+        for key in [key for key, entry in _local.items() if tags.intersection(entry[1])]:
+            del _local[key]
+
+
+def clear_local() -> None:
+    with _lock:
+        _local.clear()
+
+
+def _listen() -> None:
+    while True:
+        pubsub = None
+        try:
+            pubsub = _client().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            # messages published while we were not subscribed are lost
+            clear_local()
+            _subscribed.set()
+            for message in pubsub.listen():
+                if message.get('type') == 'message':
+                    _drop_local(str(message['data']).split(','))
+        except Exception as exc:
+            log_event('cache.subscriber_error', {'error': str(exc)})
+        finally:
+            _subscribed.clear()
+            clear_local()
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+        time.sleep(CACHE_RECONNECT_SECONDS)
+
+
+def _ensure_subscriber() -> None:
+    # like the log writer, a forked worker starts its own listener on first use
+    global _subscriber_pid
+    if _subscriber_pid == os.getpid():
+        return
+    with _lock:
+        if _subscriber_pid == os.getpid():
+            return
+        _subscriber_pid = os.getpid()
+        _subscribed.clear()
+        _local.clear()
+        threading.Thread(target=_listen, name='cache-invalidation', daemon=True).start()
+
+
+def _generations(client, tags: Tuple[str, ...]) -> List[int]:
+    if not tags:
+        return []
+    return [int(value or 0) for value in client.mget([GENERATION_KEY_PREFIX + tag for tag in tags])]
+
+
+def get(key: str) -> Optional[str]:
+    '''Cached value for key, or None on a miss or when Redis is unavailable.'''
+    _ensure_subscriber()
+    value = _local_get(key)
+    if value is not None:
+        _stats['local_hits'] += 1
+        return value
+    try:
+        value = _client().get(key)
+    except Exception as exc:
+        _stats['errors'] += 1
+        log_event('cache.error', {'op': 'get', 'key': key, 'error': str(exc)})
+        return None
+    if value is None:
+        _stats['misses'] += 1
+    else:
+        _stats['redis_hits'] += 1
+    return value
+
+
+def _store(key: str, value: str, tags: Tuple[str, ...], ttl: int,
+           generations: Optional[List[int]] = None, local_generations: Optional[List[int]] = None) -> bool:
+    # generations are read before the value was loaded; a mismatch means an
+    # invalidation raced the load, so the possibly stale entry is dropped
+    ttl = max(1, min(int(ttl), CACHE_TAG_TTL))
+    try:
+        client = _client()
+        pipe = client.pipeline()
+        pipe.setex(key, ttl, value)
+        for tag in tags:
+            pipe.sadd(TAG_KEY_PREFIX + tag, key)
+            pipe.expire(TAG_KEY_PREFIX + tag, CACHE_TAG_TTL)
+        pipe.execute()
+        if generations is not None and _generations(client, tags) != generations:
+            client.delete(key)
+            return False
+    except Exception as exc:
+        _stats['errors'] += 1
+        log_event('cache.error', {'op': 'set', 'key': key, 'error': str(exc)})
+        return False
+    _local_set(key, value, tags, ttl, local_generations)
+    return True
+
+
+def set(key: str, value: str, tags: Iterable[str] = (), ttl: int = CACHE_DEFAULT_TTL) -> bool:
+    '''Stores value under key and indexes it by tags. Returns False when Redis is unavailable.'''
+    _ensure_subscriber()
+    return _store(key, value, _normalize_tags(tags), ttl)
+
+
+def get_or_set(key: str, loader: Callable[[], str], tags: Iterable[str] = (), ttl: int = CACHE_DEFAULT_TTL) -> str:
+    '''Returns the cached value or stores and returns loader(); loader errors propagate.'''
+    value = get(key)
+    if value is not None:
+        return value
+    tags = _normalize_tags(tags)
+    with _lock:
+        local_generations = [_local_generations.get(tag, 0) for tag in tags]
+    try:
+        generations = _generations(_client(), tags)
+    except Exception:
+        generations = None
+    value = loader()
+    if generations is not None:
+        _store(key, value, tags, ttl, generations, local_generations)
+    return value
+
+
+def invalidate(*tags: str) -> bool:
+    '''
+    Drops every entry carrying one of tags, here and in the other workers.
+    Call after the write has been committed. Returns False when Redis could not be reached.
+    '''
+    tags = _normalize_tags(tags)
+    if not tags:
+        return True
+    _drop_local(tags)
+    _stats['invalidations'] += 1
+    try:
+        client = _client()
+        pipe = client.pipeline()
+        for tag in tags:
+            pipe.incr(GENERATION_KEY_PREFIX + tag)
+            pipe.smembers(TAG_KEY_PREFIX + tag)
+        results = pipe.execute()
+        keys = {key for members in results[1::2] for key in members}
+        pipe = client.pipeline()
+        if keys:
+            pipe.delete(*keys)
+        pipe.delete(*[TAG_KEY_PREFIX + tag for tag in tags])
+        pipe.publish(CACHE_INVALIDATION_CHANNEL, ','.join(tags))
+        pipe.execute()
+    except Exception as exc:
+        _stats['errors'] += 1
+        log_event('cache.invalidate_failed', {'tags': list(tags), 'error': str(exc)})
+        return False
+    log_event('cache.invalidate', {'tags': list(tags), 'keys': len(keys)})
+    return True
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        return dict(_stats, local_entries=len(_local), subscribed=_subscribed.is_set())
@@ -0,0 +1,163 @@
+'''
+Shared circuit breakers for external dependencies (Telegram, Bitrix24, Yandex, Ollama, SMTP).
+Usage: from _shared.circuit_breaker import get_breaker, CircuitOpenError
+'''
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from .logging import log_event
+
+FAILURE_RATE_THRESHOLD = float(os.environ.get('CIRCUIT_FAILURE_RATE', '0.5'))
+MINIMUM_CALLS = int(os.environ.get('CIRCUIT_MIN_CALLS', '5'))
+WINDOW_SIZE = int(os.environ.get('CIRCUIT_WINDOW_SIZE', '20'))
+OPEN_SECONDS = float(os.environ.get('CIRCUIT_OPEN_SECONDS', '30'))
+HALF_OPEN_MAX_CALLS = int(os.environ.get('CIRCUIT_HALF_OPEN_CALLS', '1'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    '''Raised instead of calling a dependency whose breaker is open.'''
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f'Circuit {name} is open, retry in {retry_after:.1f}s')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    '''
+    Failure-rate breaker over the last window_size calls.
+    Opens when at least minimum_calls were seen and the failure share reaches the threshold,
+    rejects calls for open_seconds, then lets half_open_max_calls probes through:
+    a successful probe closes the circuit, a failed one opens it again.
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = FAILURE_RATE_THRESHOLD,
+        minimum_calls: int = MINIMUM_CALLS,
+        window_size: int = WINDOW_SIZE,
+        open_seconds: float = OPEN_SECONDS,
+        half_open_max_calls: int = HALF_OPEN_MAX_CALLS,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = max(half_open_max_calls, 1)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window_size)
+        self._half_open_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str) -> None:
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self._half_open_in_flight = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+        log_event('circuit_breaker.state_change', {'name': self.name, 'from': previous, 'to': state})
+
+    def before_call(self) -> None:
+        '''Reserves a call slot or raises CircuitOpenError without touching the dependency.'''
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self._half_open_in_flight += 1
+
+    def is_rejecting(self) -> bool:
+        '''Whether before_call would raise right now; reserves nothing.'''
+        with self._lock:
+            if self.state == OPEN:
+                return self.opened_at + self.open_seconds > time.monotonic()
+            return self.state == HALF_OPEN and self._half_open_in_flight >= self.half_open_max_calls
+
+    def release(self) -> None:
+        '''Gives back a call reserved by before_call without an outcome (the call never reached the dependency).'''
+        with self._lock:
+            if self.state == HALF_OPEN and self._half_open_in_flight > 0:
+                self._half_open_in_flight -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+                return
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(OPEN)
+                return
+            self._outcomes.append(False)
+            if self.state == CLOSED and len(self._outcomes) >= self.minimum_calls:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) >= self.failure_rate_threshold:
+                    self._transition(OPEN)
+
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = self._outcomes.count(False)
+            return {
+                'state': self.state,
+                'calls': calls,
+                'failure_rate': failures / calls if calls else 0.0,
+                'rejected': self.rejected,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str, **settings: Any) -> CircuitBreaker:
+    '''Returns the process-wide breaker for a dependency; settings only apply on first creation.'''
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **settings)
+            _breakers[name] = breaker
+        return breaker
+
+
+def find_breaker(name: str) -> Optional[CircuitBreaker]:
+    with _registry_lock:
+        return _breakers.get(name)
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
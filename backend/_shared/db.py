@@ -0,0 +1,560 @@
+'''
+Shared database layer: pooled connections and a registry of hot statements
+that run as server-side prepared statements, with per-statement call stats.
+Every cursor is instrumented: statements over DB_SLOW_QUERY_MS are logged with
+normalized SQL and the calling function, plus a sampled EXPLAIN in DB_DEBUG mode.
+Handlers declare a statement budget with @statement_budget(ms); it becomes the
+statement_timeout of every connection they use, and timeouts turn into 503s.
+Read-only work (readonly=True) goes to DATABASE_REPLICA_URL while the replica's lag
+stays under DB_REPLICA_MAX_LAG_SECONDS; use_primary() forces reads back to the primary.
+Usage: from _shared.db import register_statement, fetch_all, get_connection, connect
+'''
+
+import functools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from psycopg2 import pool as pg_pool
+from psycopg2 import sql as pg_sql
+
+from .logging import log_event
+
+POOL_MIN_CONN = int(os.environ.get('DB_POOL_MIN', '1'))
+POOL_MAX_CONN = int(os.environ.get('DB_POOL_MAX', '10'))
+POOL_TIMEOUT_SECONDS = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('DB_SLOW_QUERY_MS', '250'))
+DEBUG = os.environ.get('DB_DEBUG', '').lower() in {'1', 'true', 'yes'}
+EXPLAIN_SAMPLE_RATE = float(os.environ.get('DB_EXPLAIN_SAMPLE_RATE', '0.1'))
+# statement_timeout for handlers without their own budget; 0 disables it
+STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '5000'))
+TIMEOUT_RETRY_AFTER_SECONDS = 5
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', '5'))
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.environ.get('DB_REPLICA_CHECK_SECONDS', '10'))
+REPLICA_LAG_SQL = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+'''
+
+_NAME_RE = re.compile(r'^[a-z_][a-z0-9_]*$')
+_PLACEHOLDER_RE = re.compile(r'%%|%s')
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_PARAM_RE = re.compile(r'%\(\w+\)s|%s|\$\d+')
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+_EXECUTE_RE = re.compile(r'^\s*EXECUTE\s+(\w+)', re.IGNORECASE)
+_READ_ONLY_RE = re.compile(r'^\s*(SELECT|WITH|VALUES|TABLE)\b', re.IGNORECASE)
+_WRITE_RE = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE)\b', re.IGNORECASE)
+_MODULE_FILE = os.path.abspath(__file__)
+
+_budget_ms: ContextVar[Optional[int]] = ContextVar('db_statement_budget_ms', default=None)
+_timed_out: ContextVar[bool] = ContextVar('db_statement_timed_out', default=False)
+_force_primary: ContextVar[bool] = ContextVar('db_force_primary', default=False)
+_replica_state: Dict[str, Any] = {'checked_at': None, 'healthy': False, 'lag_seconds': None, 'error': None}
+_replica_lock = threading.Lock()
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    '''Read-your-writes escape hatch: readonly work inside the block still goes to the primary.'''
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+def measure_replica_lag(replica_dsn: str) -> float:
+    with get_connection(replica_dsn, statement_timeout_ms=1000) as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(REPLICA_LAG_SQL)
+            return float(cur.fetchone()[0])
+        finally:
+            cur.close()
+
+
+def _set_replica_state(healthy: bool, lag: Optional[float], error: Optional[str]) -> None:
+    with _replica_lock:
+        changed = _replica_state['healthy'] != healthy
+        _replica_state.update(healthy=healthy, lag_seconds=lag, error=error)
+    if changed:
+        log_event('db.replica_state', {'healthy': healthy, 'lag_seconds': lag, 'error': error})
+
+
+def _replica_usable(replica_dsn: str) -> bool:
+    '''
+    Lag check cached for DB_REPLICA_CHECK_SECONDS; only one caller re-measures
+    while the others keep using the last verdict.
+    '''
+    now = time.monotonic()
+    with _replica_lock:
+        checked_at = _replica_state['checked_at']
+        if checked_at is not None and now - checked_at < REPLICA_CHECK_INTERVAL_SECONDS:
+            return _replica_state['healthy']
+        _replica_state['checked_at'] = now
+    try:
+        lag = measure_replica_lag(replica_dsn)
+    except Exception as exc:
+        _set_replica_state(False, None, str(exc))
+        return False
+    _set_replica_state(lag <= REPLICA_MAX_LAG_SECONDS, lag, None)
+    return lag <= REPLICA_MAX_LAG_SECONDS
+
+
+def route_dsn(readonly: bool) -> Optional[str]:
+    '''The replica DSN for read-only work while it is fresh enough, otherwise None (primary).'''
+    replica_dsn = os.environ.get('DATABASE_REPLICA_URL')
+    if not readonly or not replica_dsn or _force_primary.get():
+        return None
+    return replica_dsn if _replica_usable(replica_dsn) else None
+
+
+def get_replica_status() -> Dict[str, Any]:
+    with _replica_lock:
+        return {
+            'configured': bool(os.environ.get('DATABASE_REPLICA_URL')),
+            'healthy': _replica_state['healthy'],
+            'lag_seconds': _replica_state['lag_seconds'],
+            'error': _replica_state['error'],
+            'max_lag_seconds': REPLICA_MAX_LAG_SECONDS,
+        }
+
+
+def current_statement_timeout_ms() -> int:
+    budget = _budget_ms.get()
+    return STATEMENT_TIMEOUT_MS if budget is None else budget
+
+
+def statement_timeout_response() -> Dict[str, Any]:
+    return {
+        'statusCode': 503,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Retry-After': str(TIMEOUT_RETRY_AFTER_SECONDS)
+        },
+        'body': json.dumps({'error': 'Database is busy, please retry later'}),
+        'isBase64Encoded': False
+    }
+
+
+def statement_budget(timeout_ms: int) -> Callable:
+    '''
+    Handler decorator: every connection the handler checks out or opens gets
+    statement_timeout = timeout_ms. A cancelled statement becomes a 503, both when
+    QueryCanceled escapes the handler and when the handler turned it into a 500.
+    '''
+    def decorator(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+            budget_token = _budget_ms.set(timeout_ms)
+            flag_token = _timed_out.set(False)
+            try:
+                try:
+                    response = handler(event, context)
+                except psycopg2.errors.QueryCanceled:
+                    return statement_timeout_response()
+                if _timed_out.get() and isinstance(response, dict) and response.get('statusCode') == 500:
+                    return statement_timeout_response()
+                return response
+            finally:
+                _timed_out.reset(flag_token)
+                _budget_ms.reset(budget_token)
+        return wrapper
+    return decorator
+
+
+def normalize_sql(sql: str) -> str:
+    '''Replaces literals and parameters with ? so equal statements group together in logs.'''
+    sql = _STRING_LITERAL_RE.sub('?', sql)
+    sql = _PARAM_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def _caller() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if os.path.abspath(filename) != _MODULE_FILE and 'psycopg2' not in filename and 'contextlib' not in filename:
+            location = os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+            return f'{location}:{frame.f_code.co_name}:{frame.f_lineno}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+def _query_text(cur, query: Any) -> str:
+    if isinstance(query, pg_sql.Composable):
+        return query.as_string(cur)
+    if isinstance(query, bytes):
+        return query.decode('utf-8', 'replace')
+    return str(query)
+
+
+def _source_sql(text: str) -> str:
+    '''For EXECUTE of a registered statement, the SQL it was prepared from.'''
+    match = _EXECUTE_RE.match(text)
+    if match and match.group(1) in _statements:
+        return _statements[match.group(1)].sql
+    return text
+
+
+def _capture_plan(cur, text: str, params: Any) -> Optional[str]:
+    '''
+    Runs EXPLAIN (ANALYZE, BUFFERS) for a read-only statement on the same connection,
+    inside a savepoint so a failing EXPLAIN does not abort the caller's transaction.
+    '''
+    source = _source_sql(text)
+    if not _READ_ONLY_RE.match(source) or _WRITE_RE.search(source):
+        return None
+    conn = cur.connection
+    status = conn.get_transaction_status()
+    if status not in (psycopg2.extensions.TRANSACTION_STATUS_IDLE, psycopg2.extensions.TRANSACTION_STATUS_INTRANS):
+        return None
+    in_transaction = status == psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    plan_cur = psycopg2.extensions.cursor(conn)
+    try:
+        if in_transaction:
+            plan_cur.execute('SAVEPOINT db_explain')
+        plan_cur.execute('EXPLAIN (ANALYZE, BUFFERS) ' + text, params)
+        plan = '\n'.join(row[0] for row in plan_cur.fetchall())
+        if in_transaction:
+            plan_cur.execute('RELEASE SAVEPOINT db_explain')
+        return plan
+    except psycopg2.Error as exc:
+        if in_transaction:
+            plan_cur.execute('ROLLBACK TO SAVEPOINT db_explain')
+        return f'EXPLAIN failed: {exc}'
+    finally:
+        plan_cur.close()
+
+
+def _observe(cur, query: Any, params: Any, elapsed_ms: float, error: Optional[Exception]) -> None:
+    if elapsed_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+    text = _query_text(cur, query)
+    entry = {
+        'duration_ms': round(elapsed_ms, 2),
+        'sql': normalize_sql(_source_sql(text)),
+        'caller': _caller(),
+        'rows': cur.rowcount,
+    }
+    if error is not None:
+        entry['error'] = str(error)
+    elif DEBUG and random.random() < EXPLAIN_SAMPLE_RATE:
+        entry['plan'] = _capture_plan(cur, text, params)
+    print(f"[WARN] Slow query {entry['duration_ms']:.2f} ms at {entry['caller']}: {entry['sql'][:200]}")
+    log_event('db.slow_query', entry)
+
+
+class InstrumentedCursorMixin:
+    def execute(self, query: Any, vars: Any = None) -> Any:
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception as exc:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if isinstance(exc, psycopg2.errors.QueryCanceled):
+                _timed_out.set(True)
+                log_event('db.statement_timeout', {
+                    'duration_ms': round(elapsed_ms, 2),
+                    'timeout_ms': current_statement_timeout_ms(),
+                    'sql': normalize_sql(_source_sql(_query_text(self, query))),
+                    'caller': _caller(),
+                })
+            _observe(self, query, vars, elapsed_ms, exc)
+            raise
+        _observe(self, query, vars, (time.perf_counter() - start) * 1000, None)
+        return result
+
+
+_cursor_classes: Dict[type, type] = {}
+
+
+def _instrumented_cursor_class(base: Optional[type]) -> type:
+    base = base or psycopg2.extensions.cursor
+    if issubclass(base, InstrumentedCursorMixin):
+        return base
+    cls = _cursor_classes.get(base)
+    if cls is None:
+        cls = type(f'Instrumented{base.__name__}', (InstrumentedCursorMixin, base), {})
+        _cursor_classes[base] = cls
+    return cls
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    '''Connection whose cursors (any cursor_factory) time and report slow statements.'''
+
+    def cursor(self, *args: Any, **kwargs: Any):
+        kwargs['cursor_factory'] = _instrumented_cursor_class(kwargs.get('cursor_factory') or self.cursor_factory)
+        return super().cursor(*args, **kwargs)
+
+
+def connect(
+    dsn: Optional[str] = None,
+    statement_timeout_ms: Optional[int] = None,
+    readonly: bool = False,
+) -> InstrumentedConnection:
+    '''
+    Unpooled instrumented connection, a drop-in for psycopg2.connect(DATABASE_URL).
+    statement_timeout defaults to the handler's budget and is sent as a startup option.
+    readonly=True routes to the replica when one is configured and fresh.
+    '''
+    if statement_timeout_ms is None:
+        statement_timeout_ms = current_statement_timeout_ms()
+    options = f'-c statement_timeout={int(statement_timeout_ms)}'
+    replica_dsn = route_dsn(readonly) if dsn is None else None
+    if replica_dsn:
+        try:
+            return psycopg2.connect(replica_dsn, connection_factory=InstrumentedConnection, options=options)
+        except psycopg2.OperationalError as exc:
+            _set_replica_state(False, None, str(exc))
+    return psycopg2.connect(_resolve_dsn(dsn), connection_factory=InstrumentedConnection, options=options)
+
+
+class PreparedConnection(InstrumentedConnection):
+    '''Pooled connection that remembers which statements were PREPAREd in its session.'''
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.prepared: set = set()
+        self.statement_timeout_ms: Optional[int] = None
+
+    def apply_statement_timeout(self, timeout_ms: int) -> None:
+        if self.statement_timeout_ms == timeout_ms:
+            return
+        cur = psycopg2.extensions.cursor(self)
+        try:
+            cur.execute('SET statement_timeout = %s', (int(timeout_ms),))
+        finally:
+            cur.close()
+        # SET is transactional: commit so a later rollback does not undo it
+        self.commit()
+        self.statement_timeout_ms = timeout_ms
+
+
+class Statement:
+    def __init__(self, name: str, sql: str):
+        if not _NAME_RE.match(name):
+            raise ValueError(f'Invalid statement name: {name}')
+        self.name = name
+        self.sql = sql
+        self.param_count = 0
+
+        def to_positional(match: 're.Match') -> str:
+            if match.group(0) == '%%':
+                return '%'
+            self.param_count += 1
+            return f'${self.param_count}'
+
+        # PREPARE text is sent without parameters, so %% must become a plain %
+        self.prepared_sql = _PLACEHOLDER_RE.sub(to_positional, sql)
+        placeholders = ', '.join(['%s'] * self.param_count)
+        self.execute_sql = f'EXECUTE {name} ({placeholders})' if self.param_count else f'EXECUTE {name}'
+
+
+_statements: Dict[str, Statement] = {}
+_stats: Dict[str, Dict[str, float]] = {}
+_pools: Dict[str, pg_pool.ThreadedConnectionPool] = {}
+_slots: Dict[str, threading.BoundedSemaphore] = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def register_statement(name: str, sql: str) -> Statement:
+    '''
+    Declares a hot statement once (usually at module import). Re-registering the
+    same SQL is a no-op; a different SQL under an existing name is an error.
+    '''
+    with _lock:
+        existing = _statements.get(name)
+        if existing is not None:
+            if existing.sql != sql:
+                raise ValueError(f'Statement {name} is already registered with different SQL')
+            return existing
+        statement = Statement(name, sql)
+        _statements[name] = statement
+        return statement
+
+
+def _resolve_dsn(dsn: Optional[str]) -> str:
+    dsn = dsn or os.environ.get('DATABASE_URL')
+    if not dsn:
+        raise Exception('DATABASE_URL not set')
+    return dsn
+
+
+def get_pool(dsn: Optional[str] = None) -> pg_pool.ThreadedConnectionPool:
+    global _pid
+    dsn = _resolve_dsn(dsn)
+    with _lock:
+        if _pid != os.getpid():
+            # connections must not be shared with the parent after fork()
+            _pools.clear()
+            _slots.clear()
+            _pid = os.getpid()
+        db_pool = _pools.get(dsn)
+        if db_pool is None:
+            db_pool = pg_pool.ThreadedConnectionPool(
+                POOL_MIN_CONN, POOL_MAX_CONN, dsn, connection_factory=PreparedConnection
+            )
+            _pools[dsn] = db_pool
+            _slots[dsn] = threading.BoundedSemaphore(POOL_MAX_CONN)
+        return db_pool
+
+
+def _checkout(dsn: str, statement_timeout_ms: int):
+    db_pool = get_pool(dsn)
+    slots = _slots[dsn]
+    if not slots.acquire(timeout=POOL_TIMEOUT_SECONDS):
+        raise pg_pool.PoolError('Timed out waiting for a database connection')
+    conn = None
+    try:
+        conn = db_pool.getconn()
+        conn.apply_statement_timeout(statement_timeout_ms)
+    except Exception:
+        if conn is not None:
+            db_pool.putconn(conn, close=True)
+        slots.release()
+        raise
+    return db_pool, slots, conn
+
+
+def _checkin(db_pool: pg_pool.ThreadedConnectionPool, slots: threading.BoundedSemaphore, conn) -> None:
+    try:
+        discard = bool(conn.closed)
+        if not discard and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        db_pool.putconn(conn, close=discard)
+    finally:
+        slots.release()
+
+
+@contextmanager
+def get_connection(
+    dsn: Optional[str] = None,
+    statement_timeout_ms: Optional[int] = None,
+    readonly: bool = False,
+) -> Iterator[PreparedConnection]:
+    '''
+    Checks a connection out of the pool, waiting up to DB_POOL_TIMEOUT for a free one,
+    and sets its statement_timeout (default: the handler's budget).
+    readonly=True uses the replica pool when it is healthy, falling back to the primary.
+    Uncommitted work is rolled back on return; broken connections are discarded.
+    '''
+    if statement_timeout_ms is None:
+        statement_timeout_ms = current_statement_timeout_ms()
+    replica_dsn = route_dsn(readonly) if dsn is None else None
+    checkout = None
+    if replica_dsn:
+        try:
+            checkout = _checkout(replica_dsn, statement_timeout_ms)
+        except psycopg2.OperationalError as exc:
+            _set_replica_state(False, None, str(exc))
+    if checkout is None:
+        checkout = _checkout(_resolve_dsn(dsn), statement_timeout_ms)
+    db_pool, slots, conn = checkout
+    try:
+        yield conn
+    finally:
+        _checkin(db_pool, slots, conn)
+
+
+def _record(name: str, elapsed_ms: float) -> None:
+    with _lock:
+        stats = _stats.setdefault(name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        stats['calls'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+
+def execute_prepared(cur, name: str, params: Sequence[Any] = ()) -> None:
+    '''
+    Runs a registered statement on cur. On pooled connections the statement is
+    PREPAREd once per session and then EXECUTEd; on plain connections it falls
+    back to a regular execute.
+    '''
+    statement = _statements[name]
+    if len(params) != statement.param_count:
+        raise ValueError(f'Statement {name} expects {statement.param_count} parameters, got {len(params)}')
+    prepared = getattr(cur.connection, 'prepared', None)
+    start = time.perf_counter()
+    if prepared is None:
+        cur.execute(statement.sql, tuple(params))
+    else:
+        if name not in prepared:
+            cur.execute(f'PREPARE {name} AS {statement.prepared_sql}')
+            prepared.add(name)
+        try:
+            cur.execute(statement.execute_sql, tuple(params))
+        except psycopg2.errors.InvalidSqlStatementName:
+            # the session lost its prepared statements (e.g. DISCARD ALL); prepare again next time
+            prepared.discard(name)
+            raise
+    _record(name, (time.perf_counter() - start) * 1000)
+
+
+def fetch_all(
+    name: str,
+    params: Sequence[Any] = (),
+    cursor_factory=None,
+    dsn: Optional[str] = None,
+    readonly: bool = False,
+) -> List[Any]:
+    with get_connection(dsn, readonly=readonly) as conn:
+        cur = conn.cursor(cursor_factory=cursor_factory)
+        try:
+            execute_prepared(cur, name, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+
+def fetch_one(
+    name: str,
+    params: Sequence[Any] = (),
+    cursor_factory=None,
+    dsn: Optional[str] = None,
+    readonly: bool = False,
+) -> Any:
+    with get_connection(dsn, readonly=readonly) as conn:
+        cur = conn.cursor(cursor_factory=cursor_factory)
+        try:
+            execute_prepared(cur, name, params)
+            return cur.fetchone()
+        finally:
+            cur.close()
+
+
+def get_statement_stats() -> Dict[str, Dict[str, float]]:
+    '''Per-statement call count and latency, busiest first.'''
+    with _lock:
+        snapshot = {
+            name: {**stats, 'avg_ms': stats['total_ms'] / stats['calls'] if stats['calls'] else 0.0}
+            for name, stats in _stats.items()
+        }
+    return dict(sorted(snapshot.items(), key=lambda item: item[1]['total_ms'], reverse=True))
+
+
+def reset_statement_stats() -> None:
+    with _lock:
+        _stats.clear()
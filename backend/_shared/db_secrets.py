@@ -5,15 +5,20 @@ Usage: from _shared.db_secrets import get_secret
 
 import os
 import base64
-import psycopg2
 from typing import Optional
 
+from .db import connect, fetch_one, register_statement
+
 _cache = {}
 
+register_statement(
+    'secure_settings_lookup',
+    'SELECT encrypted_value FROM secure_settings WHERE key = %s'
+)
+
 def get_db_connection():
     '''Creates database connection'''
-    dsn = os.environ.get('DATABASE_URL')
-    return psycopg2.connect(dsn)
+    return connect()
 
 def decrypt_value(encrypted: str) -> str:
     '''Decrypts base64 encoded value'''
@@ -36,17 +41,7 @@ def get_secret(key: str, fallback_env: bool = True) -> Optional[str]:
     
     # Try database
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute(
-            "SELECT encrypted_value FROM secure_settings WHERE key = %s",
-            (key,)
-        )
-        
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+        row = fetch_one('secure_settings_lookup', (key,))
         
         if row:
             value = decrypt_value(row[0])
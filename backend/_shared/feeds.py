@@ -0,0 +1,215 @@
+'''
+Concurrent RSS/Atom downloads for news-admin.
+All feeds are requested at once and the batch is bounded by one deadline, so a run
+takes about as long as the slowest feed instead of the sum of all of them; a feed
+that misses the deadline is reported as timed out and the others are kept.
+Parsing is left to the caller and happens after the downloads.
+With states from news_feeds_state the requests are conditional (ETag /
+Last-Modified); a 304 or a body whose hash matches the stored one is reported as
+unchanged, so the caller can skip parsing and processing for that feed.
+Usage: from _shared.feeds import fetch_feeds, load_feed_states, save_feed_states
+'''
+
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from .db import connect
+from .http import CircuitOpenError, http_get
+from .logging import log_event
+
+FEED_TIMEOUT_SECONDS = float(os.environ.get('NEWS_FEED_TIMEOUT', '10'))
+FEED_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('NEWS_FEED_CONNECT_TIMEOUT', '3.05'))
+FEED_MAX_WORKERS = int(os.environ.get('NEWS_FEED_WORKERS', '8'))
+FEED_RETRIES = int(os.environ.get('NEWS_FEED_RETRIES', '1'))
+FEED_USER_AGENT = os.environ.get('NEWS_FEED_USER_AGENT', 'Mozilla/5.0 (compatible; pixel-news-bot/1.0)')
+FEED_ACCEPT = 'application/rss+xml, application/atom+xml, application/xml;q=0.9, text/xml;q=0.8, */*;q=0.5'
+
+
+@dataclass
+class FeedState:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+
+@dataclass
+class FeedResult:
+    feed: Dict[str, Any]
+    content: Optional[bytes] = None
+    status: Optional[int] = None
+    # lower-cased header names
+    headers: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+    content_hash: Optional[str] = None
+    # 304, or a 200 whose body hash equals the stored one
+    unchanged: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and (self.content is not None or self.status == 304)
+
+    @property
+    def changed(self) -> bool:
+        return self.ok and self.content is not None and not self.unchanged
+
+
+def fetch_feed(
+    feed: Dict[str, Any],
+    timeout: float = FEED_TIMEOUT_SECONDS,
+    state: Optional[FeedState] = None,
+) -> FeedResult:
+    '''Downloads one feed; errors are returned on the result instead of raised.'''
+    started = time.perf_counter()
+    result = FeedResult(feed=feed)
+    headers = {'User-Agent': FEED_USER_AGENT, 'Accept': FEED_ACCEPT}
+    if state is not None:
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+    try:
+        response = http_get(
+            feed['url'],
+            timeout=(min(FEED_CONNECT_TIMEOUT_SECONDS, timeout), timeout),
+            retries=FEED_RETRIES,
+            headers=headers,
+        )
+        result.status = response.status_code
+        result.headers = {name.lower(): value for name, value in response.headers.items()}
+        if response.status_code == 304:
+            result.unchanged = True
+        elif response.status_code == 200:
+            result.content = response.content
+            result.content_hash = hashlib.sha256(result.content).hexdigest()
+            result.unchanged = state is not None and state.content_hash == result.content_hash
+        else:
+            result.error = f'HTTP {response.status_code}'
+    except CircuitOpenError as exc:
+        result.error = str(exc)
+    except Exception as exc:
+        result.error = f'{type(exc).__name__}: {exc}'
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
+
+
+def fetch_feeds(
+    feeds: Sequence[Dict[str, Any]],
+    timeout: float = FEED_TIMEOUT_SECONDS,
+    max_workers: int = FEED_MAX_WORKERS,
+    states: Optional[Dict[str, FeedState]] = None,
+) -> List[FeedResult]:
+    '''
+    Downloads feeds concurrently and returns one result per feed, in input order.
+    The whole batch waits at most timeout seconds (plus scheduling slack).
+    states (url -> FeedState) makes the requests conditional.
+    '''
+    states = states or {}
+    if not feeds:
+        return []
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(feeds))), thread_name_prefix='feed-fetch')
+    try:
+        futures = [executor.submit(fetch_feed, feed, timeout, states.get(feed['url'])) for feed in feeds]
+        wait(futures, timeout=timeout + 0.5)
+        results = []
+        for feed, future in zip(feeds, futures):
+            if future.done():
+                results.append(future.result())
+            else:
+                future.cancel()
+                results.append(FeedResult(feed=feed, error=f'timed out after {timeout:.1f}s',
+                                          elapsed_ms=(time.perf_counter() - started) * 1000))
+    finally:
+        # a hung download must not hold the run; its thread finishes in the background
+        executor.shutdown(wait=False)
+    log_event('news-admin.feeds_fetched', {
+        'total_ms': round((time.perf_counter() - started) * 1000, 1),
+        'feeds': [
+            {'url': result.feed.get('url'), 'status': result.status, 'error': result.error,
+             'unchanged': result.unchanged, 'elapsed_ms': round(result.elapsed_ms, 1)}
+            for result in results
+        ],
+    })
+    return results
+
+
+def load_feed_states(urls: Sequence[str], conn=None) -> Dict[str, FeedState]:
+    '''Stored validators for urls; empty when news_feeds_state is unavailable, so feeds are fetched in full.'''
+    own_connection = conn is None
+    try:
+        if own_connection:
+            conn = connect()
+        cur = conn.cursor()
+        cur.execute(
+            'SELECT url, etag, last_modified, content_hash FROM news_feeds_state WHERE url = ANY(%s)',
+            (list(urls),),
+        )
+        states = {row[0]: FeedState(row[1], row[2], row[3]) for row in cur.fetchall()}
+        cur.close()
+        return states
+    except Exception as exc:
+        if conn is not None and not own_connection:
+            conn.rollback()
+        log_event('news-admin.feed_state_error', {'op': 'load', 'error': str(exc)})
+        return {}
+    finally:
+        if own_connection and conn is not None:
+            conn.close()
+
+
+def save_feed_states(results: Sequence[FeedResult], conn=None) -> None:
+    '''
+    Stores validators of successfully fetched feeds. Call only after their entries
+    were processed and saved; otherwise a failed run would be skipped as unchanged.
+    '''
+    rows = [
+        (
+            result.feed['url'],
+            result.headers.get('etag'),
+            result.headers.get('last-modified'),
+            result.content_hash,
+            result.status,
+        )
+        for result in results if result.ok
+    ]
+    if not rows:
+        return
+    own_connection = conn is None
+    try:
+        if own_connection:
+            conn = connect()
+        cur = conn.cursor()
+        # a 304 keeps the stored validators and hash unless it sends new ones;
+        # a full response replaces them, and moves changed_at only when the hash differs
+        cur.executemany('''
+            INSERT INTO news_feeds_state (url, etag, last_modified, content_hash, last_status, checked_at, changed_at)
+            VALUES (%s, %s, %s, %s, %s, now(), now())
+            ON CONFLICT (url) DO UPDATE SET
+                etag = CASE WHEN EXCLUDED.last_status = 304
+                            THEN COALESCE(EXCLUDED.etag, news_feeds_state.etag) ELSE EXCLUDED.etag END,
+                last_modified = CASE WHEN EXCLUDED.last_status = 304
+                                     THEN COALESCE(EXCLUDED.last_modified, news_feeds_state.last_modified)
+                                     ELSE EXCLUDED.last_modified END,
+                content_hash = COALESCE(EXCLUDED.content_hash, news_feeds_state.content_hash),
+                last_status = EXCLUDED.last_status,
+                checked_at = now(),
+                changed_at = CASE
+                    WHEN EXCLUDED.content_hash IS DISTINCT FROM news_feeds_state.content_hash
+                         AND EXCLUDED.content_hash IS NOT NULL THEN now()
+                    ELSE news_feeds_state.changed_at
+                END
+        ''', rows)
+        conn.commit()
+        cur.close()
+    except Exception as exc:
+        if conn is not None:
+            conn.rollback()
+        log_event('news-admin.feed_state_error', {'op': 'save', 'error': str(exc)})
+    finally:
+        if own_connection and conn is not None:
+            conn.close()
@@ -0,0 +1,199 @@
+'''
+Shared outbound HTTP client: one pooled keep-alive session per host,
+standard timeouts, retries with jittered backoff, a circuit breaker per host
+and per-host metrics.
+Usage: from _shared.http import http_get, http_post
+'''
+
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from .circuit_breaker import CircuitOpenError, find_breaker, get_breaker
+
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '10'))
+POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '10'))
+DEFAULT_RETRIES = int(os.environ.get('HTTP_RETRIES', '2'))
+BACKOFF_BASE_SECONDS = 0.3
+BACKOFF_MAX_SECONDS = 5.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# answers that count against the host's circuit breaker
+BREAKER_FAILURE_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+Timeout = Union[float, Tuple[float, float]]
+
+_sessions: Dict[str, requests.Session] = {}
+_metrics: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'.lower()
+
+
+def get_session(url: str) -> requests.Session:
+    '''Returns the keep-alive session for the url's scheme://host:port.'''
+    global _pid
+    key = _host_key(url)
+    with _lock:
+        if _pid != os.getpid():
+            # sockets must not be shared with the parent after fork()
+            _sessions.clear()
+            _pid = os.getpid()
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+        return session
+
+
+def backoff_delay(attempt: int) -> float:
+    '''Full-jitter exponential backoff for the given zero-based retry number.'''
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def _not_sent(exc: requests.RequestException) -> bool:
+    '''Whether the request failed before any bytes went out: connect timeout, refused or unresolved host.'''
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(exc, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def _record(host: str, breaker: str, elapsed_ms: float, status: Optional[int], error: bool, retried: bool) -> None:
+    with _lock:
+        stats = _metrics.setdefault(host, {
+            'requests': 0,
+            'errors': 0,
+            'retries': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'statuses': {},
+            'breakers': set(),
+        })
+        stats['breakers'].add(breaker)
+        stats['requests'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        if error:
+            stats['errors'] += 1
+        if retried:
+            stats['retries'] += 1
+        if status is not None:
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+
+
+def http_request(
+    method: str,
+    url: str,
+    timeout: Optional[Timeout] = None,
+    retries: Optional[int] = None,
+    idempotent: Optional[bool] = None,
+    breaker: Optional[str] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    '''
+    Sends a request through the pooled session of the target host.
+    Connect failures (timeout, refused, unresolved host: nothing was sent) are
+    retried for every method. Other connection errors, read timeouts and 429/5xx
+    answers are retried only when the call is idempotent (by method, or
+    idempotent=True for POSTs that are safe to repeat). The last response is
+    returned as is; the last exception is re-raised.
+    Every attempt goes through the circuit breaker named by breaker (default:
+    the host), which raises CircuitOpenError while the dependency is known down.
+    '''
+    method = method.upper()
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    if retries is None:
+        retries = DEFAULT_RETRIES
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    host = _host_key(url)
+    session = get_session(url)
+    breaker = breaker or urlsplit(url).netloc.lower()
+    circuit = get_breaker(breaker)
+
+    attempt = 0
+    while True:
+        circuit.before_call()
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException as exc:
+            circuit.record_failure()
+            retryable = _not_sent(exc) or (
+                idempotent and isinstance(exc, (requests.ConnectionError, requests.ReadTimeout))
+            )
+            will_retry = retryable and attempt < retries
+            _record(host, breaker, (time.perf_counter() - start) * 1000, None, True, will_retry)
+            if not will_retry:
+                raise
+        except Exception:
+            # a caller-side bug (bad arguments) says nothing about the dependency,
+            # but a half-open probe slot must still be given back
+            circuit.release()
+            raise
+        else:
+            if response.status_code in BREAKER_FAILURE_STATUSES:
+                circuit.record_failure()
+            else:
+                circuit.record_success()
+            will_retry = idempotent and response.status_code in RETRY_STATUSES and attempt < retries
+            _record(host, breaker, (time.perf_counter() - start) * 1000, response.status_code,
+                    response.status_code >= 500, will_retry)
+            if not will_retry:
+                return response
+            response.close()
+        time.sleep(backoff_delay(attempt))
+        attempt += 1
+
+
+def http_get(url: str, **kwargs: Any) -> requests.Response:
+    return http_request('GET', url, **kwargs)
+
+
+def http_post(url: str, **kwargs: Any) -> requests.Response:
+    return http_request('POST', url, **kwargs)
+
+
+def get_http_metrics() -> Dict[str, Dict[str, Any]]:
+    '''
+    Per-host counters with average latency, e.g. for a health or metrics endpoint.
+    circuits holds every breaker the host's requests went through, named ones
+    (e.g. ollama:<host>) as well as the host's own.
+    '''
+    with _lock:
+        snapshot = {}
+        for host, stats in _metrics.items():
+            circuits = {}
+            for name in sorted(stats['breakers']):
+                circuit = find_breaker(name)
+                if circuit is not None:
+                    circuits[name] = circuit.snapshot()
+            snapshot[host] = {
+                **{key: value for key, value in stats.items() if key != 'breakers'},
+                'statuses': dict(stats['statuses']),
+                'avg_ms': stats['total_ms'] / stats['requests'] if stats['requests'] else 0.0,
+                'circuits': circuits,
+            }
+        return snapshot
+
+
+def reset_http_metrics() -> None:
+    with _lock:
+        _metrics.clear()
@@ -1,8 +1,187 @@
+import atexit
 import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
 
 LOG_PATH = os.environ.get('BACKEND_LOG_PATH', '/tmp/backend_requests.log')
+LOG_MAX_BYTES = int(os.environ.get('BACKEND_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get('BACKEND_LOG_BACKUP_COUNT', '5'))
+LOG_QUEUE_SIZE = int(os.environ.get('BACKEND_LOG_QUEUE_SIZE', '10000'))
+LOG_BATCH_SIZE = int(os.environ.get('BACKEND_LOG_BATCH_SIZE', '200'))
+LOG_FLUSH_INTERVAL = float(os.environ.get('BACKEND_LOG_FLUSH_INTERVAL', '1.0'))
+# drop_newest: discard the incoming entry, drop_oldest: discard the oldest queued entry,
+# block: wait up to LOG_BLOCK_TIMEOUT for free space, then discard the incoming entry
+LOG_DROP_POLICY = os.environ.get('BACKEND_LOG_DROP_POLICY', 'drop_newest')
+LOG_BLOCK_TIMEOUT = float(os.environ.get('BACKEND_LOG_BLOCK_TIMEOUT', '0.05'))
+
+DROP_POLICIES = {'drop_newest', 'drop_oldest', 'block'}
+
+
+class LogWriter:
+    '''
+    Background writer for JSON log lines.
+    Callers only enqueue; a daemon thread batches entries and appends them to the file,
+    flushing on batch size or interval. Writes and rotation happen under an flock on
+    "<path>.lock", so several worker processes can share one log file.
+    '''
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = LOG_MAX_BYTES,
+        backup_count: int = LOG_BACKUP_COUNT,
+        queue_size: int = LOG_QUEUE_SIZE,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        drop_policy: str = LOG_DROP_POLICY,
+    ):
+        if drop_policy not in DROP_POLICIES:
+            drop_policy = 'drop_newest'
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue_size = queue_size
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._queue: 'queue.Queue[str]' = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_started(self) -> None:
+        # Threads do not survive fork(), so a worker process forked after import
+        # gets its own queue and writer thread on first use.
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, line: str) -> bool:
+        self._ensure_started()
+        try:
+            if self.drop_policy == 'block':
+                self._queue.put(line, timeout=LOG_BLOCK_TIMEOUT)
+            else:
+                self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            pass
+        if self.drop_policy == 'drop_oldest':
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+                self._queue.put_nowait(line)
+                return True
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+        return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        '''Waits until every queued entry has been written. Returns False on timeout.'''
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self) -> None:
+        log_queue = self._queue
+        while True:
+            batch: List[str] = []
+            try:
+                batch.append(log_queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(log_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+                self.written += len(batch)
+            except Exception:
+                # best effort logging
+                self.write_errors += 1
+            finally:
+                for _ in batch:
+                    log_queue.task_done()
+
+    def _write_batch(self, lines: List[str]) -> None:
+        data = ''.join(lines).encode('utf-8')
+        lock_fd = os.open(self.path + '.lock', os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            self._rotate_if_needed(len(data))
+            fd = os.open(self.path, os.O_CREAT | os.O_WRONLY | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        finally:
+            if fcntl:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+
+    def _rotate_if_needed(self, incoming: int) -> None:
+        if self.max_bytes <= 0:
+            return
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size == 0 or size + incoming <= self.max_bytes:
+            return
+        if self.backup_count <= 0:
+            os.truncate(self.path, 0)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{index}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{index + 1}')
+        os.replace(self.path, f'{self.path}.1')
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'write_errors': self.write_errors,
+            'drop_policy': self.drop_policy,
+        }
+
+
+_writer = LogWriter(LOG_PATH)
+atexit.register(lambda: _writer.flush(timeout=2.0))
+
 
 def log_event(event_name: str, payload: dict) -> None:
     try:
@@ -11,8 +190,19 @@ def log_event(event_name: str, payload: dict) -> None:
             'event': event_name,
             'payload': payload
         }
-        with open(LOG_PATH, 'a', encoding='utf-8') as log_file:
-            log_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        _writer.submit(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
     except Exception:
         # best effort logging
         pass
+
+
+def flush_logs(timeout: float = 5.0) -> bool:
+    return _writer.flush(timeout)
+
+
+def get_dropped_count() -> int:
+    return _writer.dropped
+
+
+def get_log_stats() -> Dict[str, Any]:
+    return _writer.stats()
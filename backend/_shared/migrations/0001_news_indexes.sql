@@ -0,0 +1,15 @@
+-- migrate: no-transaction
+-- news-feed: active news, newest first, optionally filtered by category
+CREATE INDEX CONCURRENTLY IF NOT EXISTS news_active_published_idx
+    ON news (published_date DESC, created_at DESC)
+    WHERE is_active = TRUE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS news_active_category_published_idx
+    ON news (category, published_date DESC, created_at DESC)
+    WHERE is_active = TRUE;
+
+-- news-admin: duplicate check by link = ANY(...)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS news_link_idx
+    ON news (link);
+
+ANALYZE news;
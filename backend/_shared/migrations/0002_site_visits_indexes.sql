@@ -0,0 +1,12 @@
+-- migrate: no-transaction
+-- get-analytics: visit_date ranges over public visits. site_visits is append-only and
+-- visit_date follows insertion order, so a BRIN index stays tiny and cheap to maintain.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS site_visits_visit_date_brin
+    ON site_visits USING brin (visit_date) WITH (pages_per_range = 32);
+
+-- today's visits and unique sessions without touching the heap
+CREATE INDEX CONCURRENTLY IF NOT EXISTS site_visits_public_date_session_idx
+    ON site_visits (visit_date, session_id)
+    WHERE is_admin = FALSE;
+
+ANALYZE site_visits;
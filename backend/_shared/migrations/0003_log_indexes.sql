@@ -0,0 +1,11 @@
+-- migrate: no-transaction
+-- bot-stats and admin-login-logs page through logs newest first; ORDER BY ... LIMIT
+-- needs an ordered btree, BRIN can only narrow the created_at ranges
+CREATE INDEX CONCURRENTLY IF NOT EXISTS bot_logs_created_at_idx
+    ON bot_logs (created_at DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS admin_login_logs_created_at_idx
+    ON admin_login_logs (created_at DESC);
+
+ANALYZE bot_logs;
+ANALYZE admin_login_logs;
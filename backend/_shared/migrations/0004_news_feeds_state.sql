@@ -0,0 +1,11 @@
+-- news-admin: validators of the last successful fetch of every feed, used for
+-- conditional requests (If-None-Match / If-Modified-Since) and the content hash check
+CREATE TABLE IF NOT EXISTS news_feeds_state (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    last_status INTEGER,
+    checked_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    changed_at TIMESTAMPTZ
+);
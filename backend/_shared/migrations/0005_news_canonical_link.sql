@@ -0,0 +1,4 @@
+-- news-admin: canonical form of news.link (no tracking parameters, trailing slash
+-- or scheme difference), compared before translation; existing rows are filled in
+-- by _shared.news_dedup on its first run
+ALTER TABLE news ADD COLUMN IF NOT EXISTS canonical_link TEXT;
@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- news-admin: pre-translation dedup by canonical_link = ANY(...)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS news_canonical_link_idx
+    ON news (canonical_link);
@@ -0,0 +1,13 @@
+-- news-admin: translations keyed by sha256 of the normalized source text, model and
+-- prompt version (_shared.translation_cache); Redis keeps the hot copies
+CREATE TABLE IF NOT EXISTS translation_cache (
+    source_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    translated TEXT NOT NULL,
+    source_length INTEGER NOT NULL,
+    hits BIGINT NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_used_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (model, prompt_version, source_hash)
+);
@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- notification worker: claim of due pending rows and of expired 'sending' leases
+CREATE INDEX CONCURRENTLY IF NOT EXISTS notification_outbox_claim_idx
+    ON notification_outbox (next_attempt_at) WHERE status IN ('pending', 'sending');
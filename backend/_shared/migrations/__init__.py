@@ -0,0 +1,195 @@
+'''
+Versioned SQL migrations.
+Files in this directory are named NNNN_description.sql and applied in version order,
+each once, under a session advisory lock so concurrent deploys do not race.
+Applied versions and file checksums are recorded in schema_migrations.
+A file starting with "-- migrate: no-transaction" runs statement by statement in
+autocommit mode, as CREATE INDEX CONCURRENTLY requires; its statements must be
+idempotent (IF NOT EXISTS) because a failed run is simply repeated.
+Usage: python -m backend._shared.migrations [status]
+'''
+
+import hashlib
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from ..db import connect
+from ..logging import log_event
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATION_LOCK_ID = int(os.environ.get('MIGRATION_LOCK_ID', '590039'))
+NO_TRANSACTION_MARKER = '-- migrate: no-transaction'
+
+TRACKING_DDL = '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        duration_ms INTEGER NOT NULL DEFAULT 0,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+'''
+
+_FILE_RE = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+_STATEMENT_END_RE = re.compile(r';\s*$', re.MULTILINE)
+_CONCURRENT_INDEX_RE = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?("?[\w.]+"?)',
+    re.IGNORECASE,
+)
+
+
+class MigrationError(Exception):
+    '''Raised when a migration fails or an applied file was edited afterwards.'''
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    name: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode('utf-8')).hexdigest()
+
+    @property
+    def transactional(self) -> bool:
+        return not self.sql.lstrip().startswith(NO_TRANSACTION_MARKER)
+
+    def statements(self) -> List[str]:
+        statements = []
+        for chunk in _STATEMENT_END_RE.split(self.sql):
+            lines = [line for line in chunk.strip().splitlines() if not line.strip().startswith('--')]
+            statement = '\n'.join(lines).strip()
+            if statement:
+                statements.append(statement)
+        return statements
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILE_RE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), encoding='utf-8') as handle:
+            migrations.append(Migration(match.group(1), match.group(2), handle.read()))
+    migrations.sort(key=lambda migration: int(migration.version))
+    versions = [int(migration.version) for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise MigrationError(f'Duplicate migration versions in {directory}')
+    return migrations
+
+
+def _applied(cur) -> Dict[str, str]:
+    cur.execute('SELECT version, checksum FROM schema_migrations')
+    return {version: checksum for version, checksum in cur.fetchall()}
+
+
+def _drop_invalid_index(cur, statement: str) -> None:
+    # an interrupted CREATE INDEX CONCURRENTLY leaves an INVALID index behind,
+    # which IF NOT EXISTS would then silently keep
+    match = _CONCURRENT_INDEX_RE.search(statement)
+    if not match:
+        return
+    name = match.group(1)
+    cur.execute('SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(%s) AND NOT indisvalid', (name,))
+    if cur.fetchone():
+        log_event('db.migration_invalid_index', {'index': name})
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def _apply(conn, migration: Migration) -> None:
+    cur = conn.cursor()
+    try:
+        if migration.transactional:
+            conn.autocommit = False
+            cur.execute(migration.sql)
+            cur.execute(
+                'INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)',
+                (migration.version, migration.name, migration.checksum),
+            )
+            conn.commit()
+            return
+        conn.autocommit = True
+        for statement in migration.statements():
+            _drop_invalid_index(cur, statement)
+            cur.execute(statement)
+        cur.execute(
+            'INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)',
+            (migration.version, migration.name, migration.checksum),
+        )
+    except Exception:
+        if not conn.autocommit:
+            conn.rollback()
+        raise
+    finally:
+        conn.autocommit = True
+        cur.close()
+
+
+def migrate(dsn: Optional[str] = None, directory: str = MIGRATIONS_DIR, conn=None) -> List[str]:
+    '''Applies pending migrations in order and returns their versions.'''
+    migrations = load_migrations(directory)
+    own_connection = conn is None
+    if own_connection:
+        # index builds on large tables outlive any handler statement budget
+        conn = connect(dsn, statement_timeout_ms=0)
+    applied_now: List[str] = []
+    try:
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute('SELECT pg_advisory_lock(%s)', (MIGRATION_LOCK_ID,))
+        try:
+            cur.execute(TRACKING_DDL)
+            applied = _applied(cur)
+            for migration in migrations:
+                checksum = applied.get(migration.version)
+                if checksum is not None:
+                    if checksum != migration.checksum:
+                        raise MigrationError(
+                            f'Migration {migration.version}_{migration.name} was changed after it was applied'
+                        )
+                    continue
+                started = time.perf_counter()
+                try:
+                    _apply(conn, migration)
+                except Exception as exc:
+                    log_event('db.migration_failed', {'version': migration.version, 'name': migration.name, 'error': str(exc)})
+                    raise MigrationError(f'Migration {migration.version}_{migration.name} failed: {exc}') from exc
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                cur.execute('UPDATE schema_migrations SET duration_ms = %s WHERE version = %s', (duration_ms, migration.version))
+                log_event('db.migration_applied', {'version': migration.version, 'name': migration.name, 'duration_ms': duration_ms})
+                applied_now.append(migration.version)
+        finally:
+            cur.execute('SELECT pg_advisory_unlock(%s)', (MIGRATION_LOCK_ID,))
+            cur.close()
+    finally:
+        if own_connection:
+            conn.close()
+    return applied_now
+
+
+def status(dsn: Optional[str] = None, directory: str = MIGRATIONS_DIR) -> List[Dict[str, Any]]:
+    '''Every known migration with its applied flag.'''
+    conn = connect(dsn, statement_timeout_ms=0)
+    try:
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute(TRACKING_DDL)
+        applied = _applied(cur)
+        cur.close()
+    finally:
+        conn.close()
+    return [
+        {
+            'version': migration.version,
+            'name': migration.name,
+            'applied': migration.version in applied,
+            'modified': migration.version in applied and applied[migration.version] != migration.checksum,
+        }
+        for migration in load_migrations(directory)
+    ]
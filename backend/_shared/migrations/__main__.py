@@ -0,0 +1,12 @@
+import sys
+
+from . import migrate, status
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['status']:
+        for row in status():
+            state = 'modified' if row['modified'] else 'applied' if row['applied'] else 'pending'
+            print(f"{row['version']}_{row['name']}: {state}")
+    else:
+        applied = migrate()
+        print(f"Applied {len(applied)} migration(s): {', '.join(applied) or '-'}")
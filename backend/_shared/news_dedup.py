@@ -0,0 +1,155 @@
+'''
+Pre-translation dedup for news-admin.
+Feed links are canonicalized (tracking parameters, fragment, trailing slashes and the
+http/https difference removed) and checked before any Ollama call, so articles that
+are already stored with a translation are not translated again on every run.
+An in-process Bloom filter of stored canonical links answers "certainly new" without
+a query; only its hits are confirmed against news.canonical_link in one batched query.
+The filter is topped up incrementally by news.id. A link it misses (e.g. edited in
+the admin) only costs one translation: save_news_to_db still matches existing rows.
+Usage: from _shared.news_dedup import canonicalize_url, known_links
+'''
+
+import hashlib
+import math
+import os
+import threading
+from typing import Iterable, List, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .db import connect
+from .logging import log_event
+
+BLOOM_CAPACITY = int(os.environ.get('NEWS_DEDUP_BLOOM_CAPACITY', '100000'))
+BLOOM_ERROR_RATE = float(os.environ.get('NEWS_DEDUP_BLOOM_ERROR_RATE', '0.01'))
+
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'yclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    '_hsenc', '_hsmi', 'mkt_tok', 'ref', 'ref_src', 'ref_url', 'cmpid', 'ncid', 'sr_share',
+})
+TRACKING_PREFIXES = ('utm_', '_ga', 'pk_', 'mtm_')
+_DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def canonicalize_url(url: str) -> str:
+    '''Canonical form of a link, used only for comparison; the stored link keeps its original form.'''
+    url = (url or '').strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return url
+    netloc = parts.hostname.lower()
+    if parts.port is not None and str(parts.port) != _DEFAULT_PORTS[scheme]:
+        netloc = f'{netloc}:{parts.port}'
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit(('https', netloc, parts.path.rstrip('/'), urlencode(query), ''))
+
+
+class BloomFilter:
+    '''Set membership without false negatives; false positives at about error_rate up to capacity items.'''
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str) -> Iterable[int]:
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class KnownLinks:
+    '''Bloom filter of stored canonical links, refreshed from news rows with id above the last seen one.'''
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE):
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.last_id = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self, conn) -> None:
+        cur = conn.cursor()
+        cur.execute('SELECT id, link, canonical_link FROM news WHERE id > %s ORDER BY id', (self.last_id,))
+        rows = cur.fetchall()
+        # rows written before canonical_link existed are filled in once
+        backfill = []
+        for news_id, link, canonical in rows:
+            if canonical is None and link:
+                canonical = canonicalize_url(link)
+                backfill.append((canonical, news_id))
+            if canonical:
+                self.bloom.add(canonical)
+        if backfill:
+            cur.executemany('UPDATE news SET canonical_link = %s WHERE id = %s AND canonical_link IS NULL', backfill)
+            conn.commit()
+        if rows:
+            self.last_id = rows[-1][0]
+        cur.close()
+
+    def find(self, links: Iterable[str], conn=None) -> Set[str]:
+        '''
+        Canonical links among links that are stored with a non-empty translation.
+        On database errors nothing is reported as known, so every entry is processed as before.
+        '''
+        canonical = {canonicalize_url(link) for link in links if link}
+        canonical.discard('')
+        if not canonical:
+            return set()
+        own_connection = conn is None
+        try:
+            if own_connection:
+                conn = connect()
+            with self._lock:
+                self._refresh(conn)
+                candidates: List[str] = sorted(link for link in canonical if link in self.bloom)
+            known: Set[str] = set()
+            if candidates:
+                cur = conn.cursor()
+                cur.execute(
+                    "SELECT canonical_link FROM news WHERE canonical_link = ANY(%s)"
+                    " AND COALESCE(btrim(translated_content), '') <> ''",
+                    (candidates,),
+                )
+                known = {row[0] for row in cur.fetchall()}
+                cur.close()
+            log_event('news-admin.dedup', {
+                'links': len(canonical),
+                'bloom_hits': len(candidates),
+                'known': len(known),
+                'bloom_size': len(self.bloom),
+            })
+            return known
+        except Exception as exc:
+            if conn is not None:
+                conn.rollback()
+            log_event('news-admin.dedup_error', {'error': str(exc)})
+            return set()
+        finally:
+            if own_connection and conn is not None:
+                conn.close()
+
+
+_known_links = KnownLinks()
+
+
+def known_links(links: Iterable[str], conn=None) -> Set[str]:
+    '''Process-wide KnownLinks.find.'''
+    return _known_links.find(links, conn)
@@ -0,0 +1,531 @@
+'''
+Durable notification outbox: handlers insert rows into notification_outbox,
+a worker drains them with batching, retries, per-chat rate limits and deduplication.
+Non-urgent Telegram messages are held for a digest window and coalesced per chat.
+Usage: from _shared.notifications import enqueue_telegram
+       (send_telegram_now when the caller needs the delivery result)
+Worker: python -m backend._shared.notifications
+'''
+
+import base64
+import html
+import json
+import os
+import re
+import select
+import smtplib
+import time
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Dict, List, Optional, Tuple
+
+from .circuit_breaker import get_breaker
+from .db_secrets import get_db_connection, get_secret
+from .http import http_post
+from .logging import log_event
+
+OUTBOX_CHANNEL = 'notification_outbox'
+BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '50'))
+MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8'))
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+POLL_INTERVAL_SECONDS = float(os.environ.get('OUTBOX_POLL_INTERVAL', '5'))
+# Telegram allows roughly one message per second to the same chat
+CHAT_MIN_INTERVAL_SECONDS = float(os.environ.get('OUTBOX_CHAT_MIN_INTERVAL', '1.0'))
+# non-urgent Telegram messages to one chat within this window go out as a single digest
+DIGEST_WINDOW_SECONDS = float(os.environ.get('TELEGRAM_DIGEST_WINDOW', '60'))
+TELEGRAM_MESSAGE_LIMIT = 4096
+DIGEST_SEPARATOR = '\n\n— — —\n\n'
+# a row left in 'sending' by a worker that died is picked up again after this long
+SENDING_LEASE_SECONDS = float(os.environ.get('OUTBOX_SENDING_LEASE', '300'))
+
+_HTML_TAG_RE = re.compile(r'<[^>]*>')
+
+_last_sent_at: Dict[str, float] = {}
+
+
+class DeliveryError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None, permanent: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.permanent = permanent
+
+
+def enqueue_notification(
+    channel: str,
+    recipient: str,
+    payload: Dict[str, Any],
+    dedup_key: Optional[str] = None,
+    conn=None,
+    delay_seconds: float = 0,
+) -> Optional[int]:
+    '''
+    Stores a notification for the worker, due after delay_seconds. With conn the row joins the caller's
+    transaction (and is committed with it); otherwise a connection is opened and committed here.
+    Returns the row id, or None when dedup_key was already queued.
+    '''
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            '''
+            INSERT INTO notification_outbox (channel, recipient, payload, dedup_key, next_attempt_at)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+            ON CONFLICT (dedup_key) DO NOTHING
+            RETURNING id
+            ''',
+            (channel, str(recipient), json.dumps(payload, ensure_ascii=False), dedup_key, delay_seconds)
+        )
+        row = cur.fetchone()
+        cur.execute(f'NOTIFY {OUTBOX_CHANNEL}')
+        cur.close()
+        if own_conn:
+            conn.commit()
+        return row[0] if row else None
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def enqueue_telegram(
+    text: str,
+    chat_id: Optional[str] = None,
+    parse_mode: Optional[str] = None,
+    dedup_key: Optional[str] = None,
+    urgent: bool = False,
+    conn=None,
+) -> Optional[int]:
+    '''
+    Queues a sendMessage call; chat_id defaults to the TELEGRAM_CHAT_ID secret.
+    Unless urgent, the message waits DIGEST_WINDOW_SECONDS and is merged with
+    other non-urgent messages for the same chat.
+    '''
+    chat_id = chat_id or get_secret('TELEGRAM_CHAT_ID')
+    if not chat_id:
+        return None
+    payload: Dict[str, Any] = {'text': text}
+    if parse_mode:
+        payload['parse_mode'] = parse_mode
+    delay = 0.0
+    if not urgent and DIGEST_WINDOW_SECONDS > 0:
+        payload['coalesce'] = True
+        delay = DIGEST_WINDOW_SECONDS
+    return enqueue_notification('telegram', chat_id, payload, dedup_key=dedup_key, conn=conn, delay_seconds=delay)
+
+
+def enqueue_telegram_document(
+    chat_id: str,
+    filename: str,
+    content: bytes,
+    caption: str = '',
+    dedup_key: Optional[str] = None,
+    conn=None,
+) -> Optional[int]:
+    payload = {
+        'filename': filename,
+        'content_b64': base64.b64encode(content).decode(),
+        'caption': caption,
+    }
+    return enqueue_notification('telegram_document', chat_id, payload, dedup_key=dedup_key, conn=conn)
+
+
+def enqueue_email(
+    to_email: str,
+    subject: str,
+    body: str,
+    attachments: Optional[List[Dict[str, Any]]] = None,
+    dedup_key: Optional[str] = None,
+    conn=None,
+) -> Optional[int]:
+    '''attachments: [{'filename': ..., 'content': bytes, 'subtype': 'pdf'}]'''
+    payload = {
+        'subject': subject,
+        'body': body,
+        'attachments': [
+            {
+                'filename': item['filename'],
+                'subtype': item.get('subtype', 'octet-stream'),
+                'content_b64': base64.b64encode(item['content']).decode(),
+            }
+            for item in attachments or []
+        ],
+    }
+    return enqueue_notification('email', to_email, payload, dedup_key=dedup_key, conn=conn)
+
+
+def _telegram_api(method: str) -> str:
+    token = get_secret('TELEGRAM_BOT_TOKEN')
+    if not token:
+        raise DeliveryError('TELEGRAM_BOT_TOKEN not configured')
+    return f'https://api.telegram.org/bot{token}/{method}'
+
+
+def _check_telegram_response(response) -> None:
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+    if response.status_code == 200 and data.get('ok'):
+        return
+    retry_after = (data.get('parameters') or {}).get('retry_after')
+    permanent = response.status_code in (400, 403)
+    raise DeliveryError(
+        f"Telegram {response.status_code}: {data.get('description', response.text[:200])}",
+        retry_after=retry_after,
+        permanent=permanent,
+    )
+
+
+def split_text(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    '''Splits text into pieces of at most limit characters, preferring line breaks.'''
+    pieces = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut <= 0:
+            cut = limit
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    if text or not pieces:
+        pieces.append(text)
+    return pieces
+
+
+def html_to_plain(text: str) -> str:
+    '''Telegram HTML as plain text: tags dropped, entities decoded.'''
+    return html.unescape(_HTML_TAG_RE.sub('', text))
+
+
+def build_digest(
+    items: List[Tuple[int, Dict[str, Any]]],
+    limit: int = TELEGRAM_MESSAGE_LIMIT,
+) -> List[Tuple[List[int], str, Optional[str]]]:
+    '''
+    Merges (row_id, payload) Telegram messages into as few messages as fit in limit.
+    Returns (row_ids, text, parse_mode) chunks; a row id is listed with the chunk
+    carrying its last piece, so it counts as delivered once that chunk is sent.
+    Plain messages are escaped when the digest has to be sent as HTML. An item too
+    long for one HTML message goes alone as plain text, because a cut could break a
+    tag or an entity and Telegram rejects the whole message.
+    '''
+    as_html = any(payload.get('parse_mode') == 'HTML' for _, payload in items)
+    parse_mode = 'HTML' if as_html else None
+    header = f'📬 Сводка уведомлений: {len(items)}\n\n' if len(items) > 1 else ''
+
+    chunks: List[Tuple[List[int], str, Optional[str]]] = []
+    current_ids: List[int] = []
+    current = header
+    for row_id, payload in items:
+        text = payload['text'].strip()
+        is_html = payload.get('parse_mode') == 'HTML'
+        if as_html and not is_html:
+            text = html.escape(text, quote=False)
+        if as_html and len(text) > limit - len(header):
+            if current_ids:
+                chunks.append((current_ids, current, parse_mode))
+            pieces = split_text(html_to_plain(text), limit)
+            chunks.extend(([], piece, None) for piece in pieces[:-1])
+            chunks.append(([row_id], pieces[-1], None))
+            current_ids, current = [], ''
+            continue
+        for piece in split_text(text, limit - len(header)):
+            joined = f'{current}{DIGEST_SEPARATOR}{piece}' if current and current != header else current + piece
+            if len(joined) <= limit:
+                current = joined
+            else:
+                chunks.append((current_ids, current, parse_mode))
+                current_ids, current = [], piece
+        current_ids.append(row_id)
+    if current_ids or current.strip():
+        chunks.append((current_ids, current, parse_mode))
+    return chunks
+
+
+def _post_telegram_message(recipient: str, text: str, parse_mode: Optional[str]) -> None:
+    wait = _chat_wait('telegram', recipient)
+    if wait > 0:
+        time.sleep(wait)
+    body = {'chat_id': recipient, 'text': text}
+    if parse_mode:
+        body['parse_mode'] = parse_mode
+    try:
+        _check_telegram_response(http_post(_telegram_api('sendMessage'), json=body, timeout=10, retries=0))
+    finally:
+        _last_sent_at[recipient] = time.monotonic()
+
+
+def _send_telegram(recipient: str, payload: Dict[str, Any]) -> None:
+    text, parse_mode = payload['text'], payload.get('parse_mode')
+    if parse_mode == 'HTML' and len(text) > TELEGRAM_MESSAGE_LIMIT:
+        # split HTML could break a tag or an entity, so a long message goes as plain text
+        text, parse_mode = html_to_plain(text), None
+    for piece in split_text(text):
+        _post_telegram_message(recipient, piece, parse_mode)
+
+
+def send_telegram_now(text: str, chat_id: str, parse_mode: Optional[str] = None) -> None:
+    '''
+    Sends a message right away, bypassing the outbox; raises DeliveryError (or the HTTP error) on failure.
+    For callers that must not commit a change until the message is delivered, e.g. a temporary password.
+    '''
+    _send_telegram(str(chat_id), {'text': text, 'parse_mode': parse_mode})
+
+
+def _send_telegram_document(recipient: str, payload: Dict[str, Any]) -> None:
+    files = {'document': (payload['filename'], base64.b64decode(payload['content_b64']), 'application/octet-stream')}
+    data = {'chat_id': recipient, 'caption': payload.get('caption', '')}
+    try:
+        _check_telegram_response(http_post(_telegram_api('sendDocument'), files=files, data=data, timeout=30, retries=0))
+    finally:
+        _last_sent_at[recipient] = time.monotonic()
+
+
+def _send_email(recipient: str, payload: Dict[str, Any]) -> None:
+    smtp_host = os.environ.get('SMTP_HOST')
+    smtp_port = int(os.environ.get('SMTP_PORT', '587'))
+    smtp_user = os.environ.get('SMTP_USER')
+    smtp_password = os.environ.get('SMTP_PASSWORD')
+    if not all([smtp_host, smtp_user, smtp_password]):
+        raise DeliveryError('SMTP credentials not configured')
+
+    msg = MIMEMultipart()
+    msg['From'] = smtp_user
+    msg['To'] = recipient
+    msg['Subject'] = payload.get('subject', '')
+    msg.attach(MIMEText(payload.get('body', ''), 'plain', 'utf-8'))
+    for item in payload.get('attachments', []):
+        attachment = MIMEApplication(base64.b64decode(item['content_b64']), _subtype=item.get('subtype', 'octet-stream'))
+        attachment.add_header('Content-Disposition', 'attachment', filename=item['filename'])
+        msg.attach(attachment)
+
+    def deliver() -> None:
+        server = smtplib.SMTP(smtp_host, smtp_port, timeout=30)
+        try:
+            server.ehlo()
+            if server.has_extn('STARTTLS'):
+                server.starttls()
+                server.ehlo()
+            server.login(smtp_user, smtp_password)
+            server.send_message(msg)
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+    get_breaker('smtp').call(deliver)
+
+
+SENDERS = {
+    'telegram': _send_telegram,
+    'telegram_document': _send_telegram_document,
+    'email': _send_email,
+}
+
+
+def retry_delay(attempts: int) -> float:
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+
+
+def _chat_wait(channel: str, recipient: str) -> float:
+    if not channel.startswith('telegram'):
+        return 0.0
+    last = _last_sent_at.get(recipient)
+    if last is None:
+        return 0.0
+    return max(0.0, last + CHAT_MIN_INTERVAL_SECONDS - time.monotonic())
+
+
+def _mark_sent(cur, row_id: int, attempts: int) -> None:
+    cur.execute(
+        "UPDATE notification_outbox SET status = 'sent', attempts = %s, sent_at = CURRENT_TIMESTAMP WHERE id = %s",
+        (attempts, row_id)
+    )
+
+
+def _mark_failed(cur, row_id: int, channel: str, attempts: int, exc: Exception, result: Dict[str, int]) -> None:
+    retry_after = getattr(exc, 'retry_after', None)
+    permanent = getattr(exc, 'permanent', False)
+    if permanent or attempts >= MAX_ATTEMPTS:
+        cur.execute(
+            "UPDATE notification_outbox SET status = 'failed', attempts = %s, last_error = %s WHERE id = %s",
+            (attempts, str(exc)[:1000], row_id)
+        )
+        result['failed'] += 1
+        log_event('notification_outbox.failed', {'id': row_id, 'channel': channel, 'error': str(exc)})
+    else:
+        delay = retry_after if retry_after else retry_delay(attempts)
+        cur.execute(
+            '''UPDATE notification_outbox
+               SET status = 'pending', attempts = %s, last_error = %s,
+                   next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+               WHERE id = %s''',
+            (attempts, str(exc)[:1000], delay, row_id)
+        )
+        result['retried'] += 1
+
+
+def _defer(cur, row_id: int, wait: float, result: Dict[str, int]) -> None:
+    # keeps the chat under its rate limit; does not count as an attempt
+    cur.execute(
+        """UPDATE notification_outbox
+           SET status = 'pending', next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+           WHERE id = %s""",
+        (wait, row_id)
+    )
+    result['deferred'] += 1
+
+
+def _claim(conn, cur, condition: str, params: tuple, limit: int) -> List[tuple]:
+    '''
+    Marks matching rows 'sending' with a lease of SENDING_LEASE_SECONDS and commits,
+    so no row lock is held while messages go out and other workers skip these rows.
+    '''
+    cur.execute(
+        f'''
+        UPDATE notification_outbox
+        SET status = 'sending', next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+        WHERE id IN (
+            SELECT id FROM notification_outbox
+            WHERE {condition}
+            ORDER BY next_attempt_at, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, channel, recipient, payload, attempts
+        ''',
+        (SENDING_LEASE_SECONDS, *params, limit)
+    )
+    rows = sorted(cur.fetchall(), key=lambda row: row[0])
+    conn.commit()
+    return rows
+
+
+def _deliver_digest(conn, cur, recipient: str, due_rows: List[tuple], result: Dict[str, int]) -> None:
+    '''
+    Sends every pending coalescible message for the chat, including ones whose
+    window has not closed yet, as one digest split to Telegram's size limit.
+    '''
+    wait = _chat_wait('telegram', recipient)
+    if wait > 0:
+        for row in due_rows:
+            _defer(cur, row[0], wait, result)
+        conn.commit()
+        return
+    waiting = _claim(
+        conn, cur,
+        "status = 'pending' AND channel = 'telegram' AND recipient = %s AND payload ? 'coalesce'",
+        (recipient,), BATCH_SIZE,
+    )
+    rows = sorted(due_rows + waiting, key=lambda row: row[0])
+    chunks = build_digest([(row[0], row[3]) for row in rows])
+
+    delivered = set()
+    error: Optional[Exception] = None
+    for row_ids, text, parse_mode in chunks:
+        try:
+            _post_telegram_message(recipient, text, parse_mode)
+        except Exception as exc:
+            error = exc
+            break
+        delivered.update(row_ids)
+
+    for row_id, channel, _, _, attempts in rows:
+        if row_id in delivered:
+            _mark_sent(cur, row_id, attempts + 1)
+            result['sent'] += 1
+        else:
+            _mark_failed(cur, row_id, channel, attempts + 1, error, result)
+    conn.commit()
+    if len(rows) > 1:
+        log_event('notification_outbox.digest', {
+            'recipient': recipient,
+            'messages': len(rows),
+            'chunks': len(chunks),
+            'delivered': len(delivered),
+        })
+
+
+def drain_outbox(batch_size: int = BATCH_SIZE, conn=None) -> Dict[str, int]:
+    '''
+    Claims one batch of due rows (marked 'sending' in a short transaction, with
+    FOR UPDATE SKIP LOCKED, so several workers can run) and delivers them, committing
+    each row's outcome right after its request. Rows of a worker that died mid-batch
+    are claimed again once their lease expires. Failures are rescheduled with
+    exponential backoff or Telegram's retry_after; rows go to status 'failed' after
+    MAX_ATTEMPTS or a permanent error. Coalescible Telegram rows are grouped per chat
+    and sent as digests.
+    '''
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    result = {'sent': 0, 'retried': 0, 'failed': 0, 'deferred': 0}
+    try:
+        cur = conn.cursor()
+        rows = _claim(conn, cur, "status IN ('pending', 'sending') AND next_attempt_at <= CURRENT_TIMESTAMP", (), batch_size)
+        digests: Dict[str, List[tuple]] = {}
+        for row in rows:
+            row_id, channel, recipient, payload, attempts = row
+            if channel == 'telegram' and payload.get('coalesce'):
+                digests.setdefault(recipient, []).append(row)
+                continue
+            wait = _chat_wait(channel, recipient)
+            if wait > 0:
+                _defer(cur, row_id, wait, result)
+                conn.commit()
+                continue
+            attempts += 1
+            try:
+                sender = SENDERS.get(channel)
+                if sender is None:
+                    raise DeliveryError(f'Unknown channel {channel}', permanent=True)
+                sender(recipient, payload)
+            except Exception as exc:
+                _mark_failed(cur, row_id, channel, attempts, exc, result)
+            else:
+                _mark_sent(cur, row_id, attempts)
+                result['sent'] += 1
+            finally:
+                if channel.startswith('telegram'):
+                    _last_sent_at[recipient] = time.monotonic()
+            conn.commit()
+        for recipient, due_rows in digests.items():
+            _deliver_digest(conn, cur, recipient, due_rows, result)
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+    return result
+
+
+def run_worker(poll_interval: float = POLL_INTERVAL_SECONDS) -> None:
+    '''Drains the outbox forever; wakes up on NOTIFY from enqueue or every poll_interval.'''
+    listen_conn = get_db_connection()
+    listen_conn.autocommit = True
+    listen_conn.cursor().execute(f'LISTEN {OUTBOX_CHANNEL}')
+    work_conn = get_db_connection()
+    print(f'Notification worker started (poll every {poll_interval}s)')
+    while True:
+        try:
+            result = drain_outbox(conn=work_conn)
+            if any(result.values()):
+                print(f'Outbox batch: {result}')
+                log_event('notification_outbox.batch', result)
+            if result['sent'] + result['retried'] + result['failed'] >= BATCH_SIZE:
+                continue
+        except Exception as exc:
+            print(f'Outbox drain error: {exc}')
+            log_event('notification_outbox.error', {'error': str(exc)})
+            time.sleep(poll_interval)
+        if select.select([listen_conn], [], [], poll_interval) != ([], [], []):
+            listen_conn.poll()
+            listen_conn.notifies.clear()
+
+
+if __name__ == '__main__':
+    run_worker()
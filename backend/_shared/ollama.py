@@ -0,0 +1,367 @@
+'''
+Ollama client for the translation pipeline.
+Requests are spread over the endpoints in OLLAMA_URLS (comma separated, default
+OLLAMA_URL) by _shared.ollama_pool: least outstanding requests weighted by latency,
+with failing endpoints ejected for a while and a request that could not reach one
+box retried on the next. OLLAMA_NUM_PARALLEL should match the server setting of
+the same name: at most that many generate requests are in flight per endpoint,
+and the rest wait for a slot here instead of queueing inside Ollama, where they
+would eat into their read timeout. The pool drains at interpreter exit.
+parallel_map runs independent jobs (fields, chunks, articles) concurrently, up to
+the slots of all endpoints, and returns their results in input order, so the
+assembled output is the same as with sequential calls. Nested parallel_map calls
+are safe: only the leaf requests hold a slot.
+generate_stream reads the NDJSON stream of /api/generate as it arrives and stops
+the generation (by closing the connection) as soon as a stop string appears or the
+output exceeds a ceiling, so a rambling model does not run up to num_predict. Every
+call records time to first token and tokens per second.
+Every request asks Ollama to keep the model loaded for OLLAMA_KEEP_ALIVE; warm_up
+loads it ahead of a run and reports load time and warm latency, and is_available
+caches the /api/tags check for OLLAMA_AVAILABILITY_TTL seconds.
+Usage: from _shared.ollama import generate, generate_stream, is_available, parallel_map, warm_up
+       (get_pool_stats for per-endpoint load and latency)
+'''
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import requests
+
+from .circuit_breaker import CircuitOpenError
+from .http import Timeout, http_get, http_post
+from .logging import log_event
+from .ollama_pool import Endpoint, EndpointPool
+
+OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434').rstrip('/')
+OLLAMA_URLS = [url.strip() for url in os.environ.get('OLLAMA_URLS', OLLAMA_URL).split(',') if url.strip()]
+OLLAMA_NUM_PARALLEL = max(1, int(os.environ.get('OLLAMA_NUM_PARALLEL', '4')))
+OLLAMA_DRAIN_TIMEOUT = float(os.environ.get('OLLAMA_DRAIN_TIMEOUT', '30'))
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+OLLAMA_AVAILABILITY_TTL = float(os.environ.get('OLLAMA_AVAILABILITY_TTL', '30'))
+# loading weights from disk can take a minute on a cold box
+OLLAMA_WARMUP_TIMEOUT = float(os.environ.get('OLLAMA_WARMUP_TIMEOUT', '180'))
+GENERATE_TIMEOUT = (3.05, 45.0)
+# a failed check is repeated sooner, so a freshly started Ollama is picked up quickly
+FAILED_AVAILABILITY_TTL = 5.0
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+_pool = EndpointPool(OLLAMA_URLS, OLLAMA_NUM_PARALLEL)
+_STAT_NAMES = ('calls', 'stopped_early', 'tokens', 'decode_ms', 'ttft_ms_total', 'errors')
+_stats_lock = threading.Lock()
+_stats = dict.fromkeys(_STAT_NAMES, 0)
+_availability_lock = threading.Lock()
+_availability: Dict[str, Any] = {'checked_at': None, 'available': False, 'models': ()}
+
+
+@dataclass
+class StreamResult:
+    text: str = ''
+    status_code: Optional[int] = None
+    # 'stop' / 'length' from Ollama, or 'client_stop' / 'client_length' when cut off here
+    done_reason: Optional[str] = None
+    ttft_ms: Optional[float] = None
+    elapsed_ms: float = 0.0
+    tokens: int = 0
+    tokens_per_second: Optional[float] = None
+    endpoint: Optional[str] = None
+
+    @property
+    def stopped_early(self) -> bool:
+        return self.done_reason in ('client_stop', 'client_length')
+
+
+@dataclass
+class WarmupResult:
+    model: str
+    endpoint: str
+    loaded: bool = False
+    # Ollama's load_duration: close to 0 when the model was already resident
+    load_ms: Optional[float] = None
+    wall_ms: float = 0.0
+    # a one-token generation right after loading
+    warm_latency_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+def _with_keep_alive(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return payload if 'keep_alive' in payload else dict(payload, keep_alive=OLLAMA_KEEP_ALIVE)
+
+
+def _route(send: Callable[[Endpoint], R], url: Optional[str] = None) -> R:
+    '''
+    send(endpoint) while holding a slot on the best endpoint (or on url). A request that
+    never got an answer (connection refused, endpoint ejected) moves to the next endpoint.
+    '''
+    tried: List[str] = []
+    while True:
+        with _pool.acquire(url=url, exclude=tried) as endpoint:
+            try:
+                return send(endpoint)
+            except (CircuitOpenError, requests.ConnectionError) as exc:
+                tried.append(endpoint.url)
+                if url is not None or len(tried) >= len(_pool.endpoints):
+                    raise
+                log_event('ollama.failover', {'endpoint': endpoint.url, 'error': f'{type(exc).__name__}: {exc}'})
+
+
+def generate(payload: Dict[str, Any], timeout: Timeout = GENERATE_TIMEOUT, url: Optional[str] = None) -> requests.Response:
+    '''POST /api/generate once an endpoint slot is free; errors propagate like http_post.'''
+    def send(endpoint: Endpoint) -> requests.Response:
+        try:
+            response = http_post(f'{endpoint.url}/api/generate', json=_with_keep_alive(payload),
+                                 timeout=timeout, retries=0, breaker=endpoint.breaker_name)
+        except Exception:
+            _pool.record(endpoint, None, ok=False)
+            raise
+        # no latency sample: total time depends on the output length (or is a model load for warm_up),
+        # so only generate_stream's time to first token feeds the routing weight
+        _pool.record(endpoint, None, ok=response.status_code == 200)
+        return response
+
+    return _route(send, url)
+
+
+def _count(**amounts: float) -> None:
+    with _stats_lock:
+        for name, amount in amounts.items():
+            _stats[name] += amount
+
+
+def _find_stop(text: str, stop: Sequence[str], start: int) -> int:
+    positions = [text.find(marker, start) for marker in stop]
+    return min((position for position in positions if position >= 0), default=-1)
+
+
+def _read_stream(
+    endpoint: Endpoint,
+    payload: Dict[str, Any],
+    stop: Sequence[str],
+    max_chars: Optional[int],
+    timeout: Timeout,
+) -> Tuple[StreamResult, float]:
+    '''One streamed request to endpoint; returns the result and the decode time in ms.'''
+    result = StreamResult(endpoint=endpoint.url)
+    started = time.perf_counter()
+    first_token_at = None
+    last_token_at = None
+    parts: List[str] = []
+    length = 0
+    longest_stop = max((len(marker) for marker in stop), default=0)
+    try:
+        response = http_post(f'{endpoint.url}/api/generate', json=dict(_with_keep_alive(payload), stream=True),
+                             timeout=timeout, retries=0, breaker=endpoint.breaker_name, stream=True)
+        result.status_code = response.status_code
+        try:
+            lines = response.iter_lines() if response.status_code == 200 else ()
+            for line in lines:
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                piece = chunk.get('response', '')
+                if piece:
+                    last_token_at = time.perf_counter()
+                    if first_token_at is None:
+                        first_token_at = last_token_at
+                    result.tokens += 1
+                    parts.append(piece)
+                    length += len(piece)
+                if chunk.get('done'):
+                    result.done_reason = chunk.get('done_reason', 'stop')
+                    # the server's own count is exact; the chunk count is the fallback
+                    if chunk.get('eval_count') and chunk.get('eval_duration'):
+                        result.tokens = chunk['eval_count']
+                        result.tokens_per_second = round(chunk['eval_count'] / (chunk['eval_duration'] / 1e9), 1)
+                    break
+                if stop and piece:
+                    text = ''.join(parts)
+                    position = _find_stop(text, stop, max(0, len(text) - len(piece) - longest_stop))
+                    if position >= 0:
+                        parts = [text[:position]]
+                        result.done_reason = 'client_stop'
+                        break
+                if max_chars is not None and length > max_chars:
+                    result.done_reason = 'client_length'
+                    break
+        finally:
+            # closing mid-stream drops the connection, which makes Ollama abort the generation
+            response.close()
+    except Exception:
+        _pool.record(endpoint, None, ok=False)
+        raise
+    result.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    result.text = ''.join(parts)
+    decode_ms = 0.0
+    if first_token_at is not None:
+        result.ttft_ms = round((first_token_at - started) * 1000, 1)
+        decode_ms = (last_token_at - first_token_at) * 1000
+        if result.tokens_per_second is None and result.tokens > 1 and decode_ms > 0:
+            result.tokens_per_second = round((result.tokens - 1) / (decode_ms / 1000), 1)
+    # time to first token does not depend on the output length, so it is the routing sample
+    _pool.record(endpoint, result.ttft_ms, ok=result.status_code == 200)
+    return result, decode_ms
+
+
+def generate_stream(
+    payload: Dict[str, Any],
+    stop: Sequence[str] = (),
+    max_chars: Optional[int] = None,
+    timeout: Timeout = GENERATE_TIMEOUT,
+) -> StreamResult:
+    '''
+    Streams /api/generate, cutting the text at the first stop string and ending the
+    generation there or once the text is longer than max_chars. The read timeout
+    applies between chunks. Errors propagate like http_post.
+    '''
+    try:
+        result, decode_ms = _route(lambda endpoint: _read_stream(endpoint, payload, stop, max_chars, timeout))
+    except Exception:
+        _count(errors=1)
+        raise
+    _count(
+        calls=1,
+        errors=int(result.status_code != 200),
+        stopped_early=int(result.stopped_early),
+        tokens=result.tokens,
+        decode_ms=decode_ms,
+        ttft_ms_total=result.ttft_ms or 0,
+    )
+    log_event('ollama.generate', {
+        'model': payload.get('model'),
+        'endpoint': result.endpoint,
+        'status': result.status_code,
+        'done_reason': result.done_reason,
+        'ttft_ms': result.ttft_ms,
+        'elapsed_ms': result.elapsed_ms,
+        'tokens': result.tokens,
+        'tokens_per_second': result.tokens_per_second,
+        'chars': len(result.text),
+    })
+    return result
+
+
+def get_generate_stats() -> Dict[str, Any]:
+    '''generate_stream counters since the last reset, with average TTFT and tokens per second.'''
+    with _stats_lock:
+        stats: Dict[str, Any] = dict(_stats)
+    calls = stats['calls']
+    stats['avg_ttft_ms'] = round(stats['ttft_ms_total'] / calls, 1) if calls else None
+    stats['tokens_per_second'] = round(stats['tokens'] / (stats['decode_ms'] / 1000), 1) if stats['decode_ms'] else None
+    return stats
+
+
+def reset_generate_stats() -> None:
+    with _stats_lock:
+        _stats.update(dict.fromkeys(_STAT_NAMES, 0))
+
+
+def get_pool_stats() -> List[Dict[str, Any]]:
+    '''Per endpoint: capacity, requests in flight, totals, latency average and whether it is ejected.'''
+    return _pool.stats()
+
+
+def drain(timeout: Optional[float] = OLLAMA_DRAIN_TIMEOUT) -> bool:
+    '''Stops sending new requests and waits for those in flight; True when all finished.'''
+    return _pool.drain(timeout)
+
+
+atexit.register(lambda: drain())
+
+
+def _has_model(models: Sequence[str], model: str) -> bool:
+    # /api/tags lists "llama3.2:latest"; a model configured without a tag means :latest
+    wanted = model if ':' in model else f'{model}:latest'
+    return wanted in models or model in models
+
+
+def _endpoint_models(endpoint: Endpoint) -> Optional[Tuple[str, ...]]:
+    '''Models pulled on endpoint, or None when it does not answer.'''
+    try:
+        response = http_get(f'{endpoint.url}/api/tags', timeout=5, retries=0, breaker=endpoint.breaker_name)
+        if response.status_code == 200:
+            return tuple(item.get('name', '') for item in response.json().get('models', []))
+    except Exception as exc:
+        log_event('ollama.unavailable', {'endpoint': endpoint.url, 'error': f'{type(exc).__name__}: {exc}'})
+    return None
+
+
+def is_available(model: Optional[str] = None, max_age: float = OLLAMA_AVAILABILITY_TTL) -> bool:
+    '''
+    Whether some endpoint answers /api/tags (and has model pulled, when given).
+    The answer is reused for max_age seconds, a negative one for at most FAILED_AVAILABILITY_TTL.
+    '''
+    now = time.monotonic()
+    with _availability_lock:
+        checked_at = _availability['checked_at']
+        ttl = max_age if _availability['available'] else min(max_age, FAILED_AVAILABILITY_TTL)
+        fresh = checked_at is not None and now - checked_at < ttl
+        available, models = _availability['available'], _availability['models']
+    if not fresh:
+        answers = [found for found in parallel_map(_endpoint_models, _pool.endpoints) if found is not None]
+        available = bool(answers)
+        models = tuple(dict.fromkeys(name for found in answers for name in found))
+        with _availability_lock:
+            _availability.update(checked_at=time.monotonic(), available=available, models=models)
+    return available and (model is None or _has_model(models, model))
+
+
+def warm_up(model: str, keep_alive: str = OLLAMA_KEEP_ALIVE, url: Optional[str] = None) -> WarmupResult:
+    '''
+    Loads model on url (default: the first endpoint) with a generate request without a
+    prompt, keeping it resident for keep_alive, then times a one-token generation.
+    Errors are reported on the result.
+    '''
+    url = url or _pool.endpoints[0].url
+    result = WarmupResult(model=model, endpoint=url)
+    started = time.perf_counter()
+    try:
+        response = generate({'model': model, 'keep_alive': keep_alive, 'stream': False},
+                            timeout=(3.05, OLLAMA_WARMUP_TIMEOUT), url=url)
+        if response.status_code != 200:
+            raise ValueError(f'HTTP {response.status_code}')
+        result.load_ms = round(response.json().get('load_duration', 0) / 1e6, 1)
+        result.loaded = True
+        result.wall_ms = round((time.perf_counter() - started) * 1000, 1)
+        probe_started = time.perf_counter()
+        probe = generate({'model': model, 'keep_alive': keep_alive, 'prompt': 'Hi', 'stream': False,
+                          'options': {'num_predict': 1}}, url=url)
+        if probe.status_code == 200:
+            result.warm_latency_ms = round((time.perf_counter() - probe_started) * 1000, 1)
+    except Exception as exc:
+        result.error = f'{type(exc).__name__}: {exc}'
+        result.wall_ms = round((time.perf_counter() - started) * 1000, 1)
+    log_event('ollama.warmup', asdict(result))
+    return result
+
+
+def warm_up_in_background(model: str, keep_alive: str = OLLAMA_KEEP_ALIVE) -> 'Future[List[WarmupResult]]':
+    '''warm_up on every endpoint in a separate thread, so the models load while the caller prepares its work.'''
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ollama-warmup')
+    future = executor.submit(
+        parallel_map, lambda endpoint: warm_up(model, keep_alive, endpoint.url), _pool.endpoints,
+    )
+    executor.shutdown(wait=False)
+    return future
+
+
+def parallel_map(func: Callable[[T], R], items: Iterable[T], max_workers: Optional[int] = None) -> List[R]:
+    '''
+    [func(item) for item in items], run concurrently; exceptions propagate after all jobs
+    were started. Jobs see the caller's context variables, e.g. the handler's statement budget.
+    '''
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    workers = min(len(items), max_workers or _pool.capacity)
+    # one copy per job: a context cannot be entered by two threads at once
+    jobs = [(contextvars.copy_context(), item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ollama') as executor:
+        return list(executor.map(lambda job: job[0].run(func, job[1]), jobs))
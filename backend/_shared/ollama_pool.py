@@ -0,0 +1,124 @@
+'''
+Pool of Ollama endpoints (inference boxes) behind _shared.ollama.
+Each endpoint serves at most `capacity` requests at once. A request goes to the
+endpoint with the fewest outstanding requests per slot, weighted by its recent
+latency, so a second box of the same speed takes half of the load and a slower one
+proportionally less. Every endpoint has its own circuit breaker: after repeated
+connection errors or 5xx answers it is ejected for OLLAMA_EJECT_SECONDS, then
+probed again. drain() stops handing out slots and waits for the requests in flight.
+Usage: from _shared.ollama_pool import EndpointPool
+'''
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from .circuit_breaker import get_breaker
+from .logging import log_event
+
+OLLAMA_EJECT_SECONDS = float(os.environ.get('OLLAMA_EJECT_SECONDS', '30'))
+# weight of the newest sample in an endpoint's latency average
+LATENCY_ALPHA = 0.2
+# how often waiting requests look again, so an ejection that expired is noticed
+WAIT_INTERVAL_SECONDS = 0.5
+
+
+class PoolDrainingError(Exception):
+    '''Raised instead of starting a request once the pool is draining.'''
+
+
+class Endpoint:
+    def __init__(self, url: str, capacity: int):
+        self.url = url
+        self.capacity = max(1, capacity)
+        self.breaker_name = f'ollama:{urlsplit(url).netloc}'
+        # an endpoint is ejected after a few failures, not after a full default window
+        self.breaker = get_breaker(self.breaker_name, minimum_calls=3, open_seconds=OLLAMA_EJECT_SECONDS)
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency_ms: Optional[float] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'capacity': self.capacity,
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency_ms': round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            'ejected': self.breaker.is_rejecting(),
+        }
+
+
+class EndpointPool:
+    def __init__(self, urls: Sequence[str], capacity: int):
+        urls = [url.rstrip('/') for url in dict.fromkeys(urls) if url]
+        if not urls:
+            raise ValueError('At least one Ollama endpoint is required')
+        self.endpoints = [Endpoint(url, capacity) for url in urls]
+        self.capacity = sum(endpoint.capacity for endpoint in self.endpoints)
+        self.draining = False
+        self._cond = threading.Condition()
+
+    def _pick(self, url: Optional[str], exclude: Sequence[str]) -> Optional[Endpoint]:
+        allowed = [e for e in self.endpoints if e.url not in exclude and (url is None or e.url == url)]
+        if not allowed:
+            raise ValueError(f'Unknown Ollama endpoint {url}' if url else 'No Ollama endpoint left to try')
+        # with every endpoint ejected the request goes out anyway and fails fast on its breaker
+        healthy = [e for e in allowed if not e.breaker.is_rejecting()] or allowed
+        free = [e for e in healthy if e.outstanding < e.capacity]
+        if not free:
+            return None
+        # an endpoint without samples yet counts as the fastest one, so it gets tried
+        fastest = min((e.latency_ms for e in self.endpoints if e.latency_ms is not None), default=1.0)
+        return min(free, key=lambda e: (e.outstanding + 1) / e.capacity * (e.latency_ms or fastest))
+
+    @contextmanager
+    def acquire(self, url: Optional[str] = None, exclude: Sequence[str] = ()) -> Iterator[Endpoint]:
+        '''
+        Holds a slot on the best endpoint (or on url) not in exclude, waiting for one
+        to free up. Raises PoolDrainingError once drain() was called.
+        '''
+        with self._cond:
+            while True:
+                if self.draining:
+                    raise PoolDrainingError('Ollama endpoint pool is draining')
+                endpoint = self._pick(url, exclude)
+                if endpoint is not None:
+                    break
+                self._cond.wait(WAIT_INTERVAL_SECONDS)
+            endpoint.outstanding += 1
+        try:
+            yield endpoint
+        finally:
+            with self._cond:
+                endpoint.outstanding -= 1
+                self._cond.notify_all()
+
+    def record(self, endpoint: Endpoint, latency_ms: Optional[float], ok: bool) -> None:
+        '''
+        Counts a finished request; latency_ms of successful ones feeds the routing weight.
+        Pass comparable samples only (time to first token), or None.
+        '''
+        with self._cond:
+            endpoint.requests += 1
+            if not ok:
+                endpoint.errors += 1
+            elif latency_ms is not None:
+                previous = endpoint.latency_ms
+                endpoint.latency_ms = latency_ms if previous is None else previous + LATENCY_ALPHA * (latency_ms - previous)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        '''Refuses new requests and waits up to timeout for those in flight; True when none are left.'''
+        with self._cond:
+            self.draining = True
+            outstanding = sum(e.outstanding for e in self.endpoints)
+            log_event('ollama.pool_draining', {'outstanding': outstanding})
+            return self._cond.wait_for(lambda: not any(e.outstanding for e in self.endpoints), timeout)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [endpoint.snapshot() for endpoint in self.endpoints]
@@ -0,0 +1,85 @@
+'''
+Shared JSON serialization: orjson when installed, stdlib json otherwise.
+datetime/date/time, Decimal, UUID and sets are encoded natively, so handlers
+can put database rows into responses without converting them first.
+Usage: from _shared.serialization import json_body, dumps, loads
+'''
+
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, memoryview):
+        return value.tobytes().decode('utf-8', 'replace')
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(value: Any) -> bytes:
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+        # orjson accepts only exact str, so JsonBody is read from its bytes
+        return orjson.loads(getattr(data, 'encoded', data))
+else:
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+    def dumps_bytes(value: Any) -> bytes:
+        return _encoder.encode(value).encode('utf-8')
+
+    def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+class JsonBody(str):
+    '''
+    Response body that is a plain str for serverless runtimes but also carries
+    the UTF-8 bytes it was decoded from, so the gateway can send them as is.
+    '''
+
+    def __new__(cls, encoded: bytes) -> 'JsonBody':
+        body = super().__new__(cls, encoded.decode('utf-8'))
+        body.encoded = encoded
+        return body
+
+
+def dumps(value: Any) -> str:
+    return dumps_bytes(value).decode('utf-8')
+
+
+def json_body(value: Any) -> JsonBody:
+    '''Serializes a handler response body once; use as 'body': json_body(payload).'''
+    return JsonBody(dumps_bytes(value))
+
+
+def body_bytes(body: Union[str, bytes, None]) -> bytes:
+    '''Bytes for a handler body without re-encoding JsonBody values.'''
+    if body is None:
+        return b''
+    if isinstance(body, bytes):
+        return body
+    encoded = getattr(body, 'encoded', None)
+    if encoded is not None:
+        return encoded
+    return body.encode('utf-8')
@@ -0,0 +1,89 @@
+'''
+Batched translation of short texts (titles, excerpts).
+Several texts go to Ollama in one /api/generate call as a JSON object
+{"1": text, "2": text, ...} with format=json, so a run pays one round trip and one
+instruction prompt per batch instead of per field. The answer is validated key by
+key; a failed request or unparsable answer yields None for the whole batch, an
+invalid value yields None for that text, and the caller translates those one by one.
+Usage: from _shared.translation_batch import make_batches, translate_batch
+'''
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+from .logging import log_event
+from .ollama import generate
+
+TRANSLATION_BATCH_SIZE = int(os.environ.get('TRANSLATION_BATCH_SIZE', '8'))
+TRANSLATION_BATCH_MAX_CHARS = int(os.environ.get('TRANSLATION_BATCH_MAX_CHARS', '1500'))
+
+
+def make_batches(
+    texts: Sequence[str],
+    size: int = TRANSLATION_BATCH_SIZE,
+    max_chars: int = TRANSLATION_BATCH_MAX_CHARS,
+) -> List[List[str]]:
+    '''Consecutive groups of at most size texts and max_chars characters (a longer text gets its own batch).'''
+    batches: List[List[str]] = []
+    chars = 0
+    for text in texts:
+        if not batches or len(batches[-1]) >= size or chars + len(text) > max_chars:
+            batches.append([])
+            chars = 0
+        batches[-1].append(text)
+        chars += len(text)
+    return batches
+
+
+def parse_batch_response(raw: str, count: int) -> Optional[List[Optional[str]]]:
+    '''Values for keys "1".."count" in order; None for the batch when raw is not a JSON object.'''
+    try:
+        data = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    values: List[Optional[str]] = []
+    for index in range(1, count + 1):
+        value = data.get(str(index))
+        values.append(value.strip() if isinstance(value, str) and value.strip() else None)
+    return values
+
+
+def translate_batch(
+    texts: Sequence[str],
+    instructions: str,
+    model: str,
+    options: Optional[Dict[str, Any]] = None,
+) -> Optional[List[Optional[str]]]:
+    '''
+    One request for all texts; instructions precede the JSON object in the prompt.
+    Returns translations aligned with texts, or None when the whole batch failed.
+    '''
+    source = {str(index): text for index, text in enumerate(texts, start=1)}
+    payload = {
+        'model': model,
+        'prompt': instructions + json.dumps(source, ensure_ascii=False),
+        'format': 'json',
+        'stream': False,
+        'options': {
+            'temperature': 0.3,
+            'top_p': 0.9,
+            'top_k': 40,
+            # Russian output plus JSON quoting; generous so the object is not cut off
+            'num_predict': min(4000, 200 + sum(len(text) for text in texts)),
+            **(options or {}),
+        },
+    }
+    try:
+        response = generate(payload)
+        if response.status_code != 200:
+            raise ValueError(f'HTTP {response.status_code}')
+        values = parse_batch_response(response.json().get('response', ''), len(texts))
+    except Exception as exc:
+        log_event('translation_batch.failed', {'texts': len(texts), 'error': f'{type(exc).__name__}: {exc}'})
+        return None
+    if values is None:
+        log_event('translation_batch.failed', {'texts': len(texts), 'error': 'response is not a JSON object'})
+    return values
@@ -0,0 +1,247 @@
+'''
+Persistent translation cache for news-admin.
+Translations are keyed by (sha256 of the normalized source text, model, prompt version)
+and stored in translation_cache, with Redis (through _shared.cache) in front of it,
+so a title that appears in two feeds, or an article seen again, goes to Ollama once.
+Changing the model or bumping the prompt version starts a fresh key space; the old
+entries are removed with the CLI below.
+Usage: from _shared.translation_cache import lookup_translation, store_translation
+       (lookup_translations / store_translations for batches)
+       python -m backend._shared.translation_cache stats
+       python -m backend._shared.translation_cache evict --model llama3.2 [--prompt-version 1]
+'''
+
+import argparse
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import cache
+from .db import get_connection
+from .logging import log_event
+
+TRANSLATION_CACHE_ENABLED = os.environ.get('TRANSLATION_CACHE_ENABLED', '1').lower() not in {'0', 'false', 'no'}
+TRANSLATION_CACHE_REDIS_TTL = int(os.environ.get('TRANSLATION_CACHE_REDIS_TTL', str(7 * 24 * 3600)))
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_STAT_NAMES = ('redis_hits', 'db_hits', 'misses', 'stores', 'errors')
+_stats_lock = threading.Lock()
+_stats = dict.fromkeys(_STAT_NAMES, 0)
+
+
+def normalize_text(text: str) -> str:
+    '''Unicode NFC with whitespace runs collapsed, so formatting-only differences share an entry.'''
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text or '')).strip()
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def _redis_key(digest: str, model: str, prompt_version: str) -> str:
+    return f'translation:{model}:{prompt_version}:{digest}'
+
+
+def _tag(model: str, prompt_version: str) -> str:
+    return f'translation:{model}:{prompt_version}'
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def lookup_translation(text: str, model: str, prompt_version: str) -> Optional[str]:
+    '''Cached translation of text, or None on a miss; cache failures count as misses.'''
+    if not TRANSLATION_CACHE_ENABLED or not normalize_text(text):
+        return None
+    digest = source_hash(text)
+    key = _redis_key(digest, model, prompt_version)
+    value = cache.get(key)
+    if value is not None:
+        _count('redis_hits')
+        return value
+    try:
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                'UPDATE translation_cache SET hits = hits + 1, last_used_at = now()'
+                ' WHERE model = %s AND prompt_version = %s AND source_hash = %s RETURNING translated',
+                (model, prompt_version, digest),
+            )
+            row = cur.fetchone()
+            conn.commit()
+            cur.close()
+    except Exception as exc:
+        _count('errors')
+        log_event('translation_cache.error', {'op': 'lookup', 'error': str(exc)})
+        return None
+    if row is None:
+        _count('misses')
+        return None
+    _count('db_hits')
+    cache.set(key, row[0], tags=(_tag(model, prompt_version),), ttl=TRANSLATION_CACHE_REDIS_TTL)
+    return row[0]
+
+
+def lookup_translations(texts: Sequence[str], model: str, prompt_version: str) -> Dict[str, str]:
+    '''Batched lookup_translation: Redis per key, then one Postgres query for the rest. Maps text -> translation.'''
+    if not TRANSLATION_CACHE_ENABLED:
+        return {}
+    found: Dict[str, str] = {}
+    missing: Dict[str, List[str]] = {}
+    for text in dict.fromkeys(texts):
+        if not normalize_text(text):
+            continue
+        digest = source_hash(text)
+        value = cache.get(_redis_key(digest, model, prompt_version))
+        if value is not None:
+            _count('redis_hits')
+            found[text] = value
+        else:
+            missing.setdefault(digest, []).append(text)
+    if not missing:
+        return found
+    try:
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                'UPDATE translation_cache SET hits = hits + 1, last_used_at = now()'
+                ' WHERE model = %s AND prompt_version = %s AND source_hash = ANY(%s) RETURNING source_hash, translated',
+                (model, prompt_version, list(missing)),
+            )
+            rows = cur.fetchall()
+            conn.commit()
+            cur.close()
+    except Exception as exc:
+        _count('errors')
+        log_event('translation_cache.error', {'op': 'lookup', 'error': str(exc)})
+        return found
+    for digest, translated in rows:
+        texts_found = missing.pop(digest, [])
+        _count('db_hits', len(texts_found))
+        found.update(dict.fromkeys(texts_found, translated))
+        cache.set(_redis_key(digest, model, prompt_version), translated,
+                  tags=(_tag(model, prompt_version),), ttl=TRANSLATION_CACHE_REDIS_TTL)
+    _count('misses', sum(len(texts_left) for texts_left in missing.values()))
+    return found
+
+
+def store_translation(text: str, translated: str, model: str, prompt_version: str) -> None:
+    '''Saves a successful translation; call only with real model output, never with the fallback original.'''
+    store_translations([(text, translated)], model, prompt_version)
+
+
+def store_translations(pairs: Sequence[Tuple[str, str]], model: str, prompt_version: str) -> None:
+    '''Batched store_translation for (text, translated) pairs.'''
+    rows = {}
+    for text, translated in pairs:
+        if normalize_text(text) and translated:
+            rows[source_hash(text)] = (translated, len(text))
+    if not TRANSLATION_CACHE_ENABLED or not rows:
+        return
+    try:
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.executemany('''
+                INSERT INTO translation_cache (source_hash, model, prompt_version, translated, source_length)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (model, prompt_version, source_hash) DO UPDATE SET
+                    translated = EXCLUDED.translated,
+                    last_used_at = now()
+            ''', [(digest, model, prompt_version, translated, length) for digest, (translated, length) in rows.items()])
+            conn.commit()
+            cur.close()
+    except Exception as exc:
+        _count('errors')
+        log_event('translation_cache.error', {'op': 'store', 'error': str(exc)})
+        return
+    _count('stores', len(rows))
+    for digest, (translated, _length) in rows.items():
+        cache.set(_redis_key(digest, model, prompt_version), translated,
+                  tags=(_tag(model, prompt_version),), ttl=TRANSLATION_CACHE_REDIS_TTL)
+
+
+def evict_translations(model: Optional[str] = None, prompt_version: Optional[str] = None) -> Dict[str, int]:
+    '''
+    Deletes entries of model and/or prompt_version from Postgres and their Redis copies.
+    Returns the number of deleted rows per "model:prompt_version".
+    '''
+    if model is None and prompt_version is None:
+        raise ValueError('model or prompt_version is required')
+    with get_connection(statement_timeout_ms=0) as conn:
+        cur = conn.cursor()
+        cur.execute('''
+            WITH deleted AS (
+                DELETE FROM translation_cache
+                WHERE (%(model)s::text IS NULL OR model = %(model)s)
+                  AND (%(prompt_version)s::text IS NULL OR prompt_version = %(prompt_version)s)
+                RETURNING model, prompt_version
+            )
+            SELECT model, prompt_version, COUNT(*) FROM deleted GROUP BY model, prompt_version
+        ''', {'model': model, 'prompt_version': prompt_version})
+        deleted = {(row[0], row[1]): row[2] for row in cur.fetchall()}
+        conn.commit()
+        cur.close()
+    if deleted:
+        cache.invalidate(*(_tag(*key) for key in deleted))
+    log_event('translation_cache.evicted', {'model': model, 'prompt_version': prompt_version, 'rows': sum(deleted.values())})
+    return {f'{key[0]}:{key[1]}': count for key, count in deleted.items()}
+
+
+def get_translation_cache_summary() -> List[Dict[str, Any]]:
+    '''Entries and recorded database hits per model and prompt version.'''
+    with get_connection(readonly=True) as conn:
+        cur = conn.cursor()
+        cur.execute('''
+            SELECT model, prompt_version, COUNT(*), COALESCE(SUM(hits), 0), MAX(last_used_at)
+            FROM translation_cache GROUP BY model, prompt_version ORDER BY model, prompt_version
+        ''')
+        rows = cur.fetchall()
+        cur.close()
+    return [
+        {'model': row[0], 'prompt_version': row[1], 'entries': row[2], 'hits': row[3], 'last_used_at': row[4]}
+        for row in rows
+    ]
+
+
+def get_translation_cache_stats() -> Dict[str, Any]:
+    '''Counters of this process since the last reset, with the overall hit rate.'''
+    with _stats_lock:
+        stats: Dict[str, Any] = dict(_stats)
+    lookups = stats['redis_hits'] + stats['db_hits'] + stats['misses']
+    stats['hit_rate'] = round((stats['redis_hits'] + stats['db_hits']) / lookups, 3) if lookups else 0.0
+    return stats
+
+
+def reset_translation_cache_stats() -> None:
+    with _stats_lock:
+        _stats.update(dict.fromkeys(_STAT_NAMES, 0))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m backend._shared.translation_cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help='entries and hits per model and prompt version')
+    evict = commands.add_parser('evict', help='delete entries of a model and/or prompt version')
+    evict.add_argument('--model')
+    evict.add_argument('--prompt-version')
+    args = parser.parse_args(argv)
+
+    if args.command == 'stats':
+        for row in get_translation_cache_summary():
+            print(f"{row['model']} v{row['prompt_version']}: {row['entries']} entries, "
+                  f"{row['hits']} hits, last used {row['last_used_at']}")
+        return
+    if args.model is None and args.prompt_version is None:
+        parser.error('evict needs --model and/or --prompt-version')
+    deleted = evict_translations(args.model, args.prompt_version)
+    print(f"Evicted {sum(deleted.values())} translation(s)"
+          + ''.join(f'\n  {key}: {count}' for key, count in sorted(deleted.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+'''
+Sentence-level translation memory for long texts.
+Source text is split into sentences the way translate_long_text chunks it. Sentences
+already in the translation cache are reused, and only runs of consecutive missing
+sentences are sent to the model, each run as one request. When a run's translation
+splits into the same number of sentences, every pair is stored, so an article that
+is edited upstream, or repeated with small differences, costs only its new sentences.
+Runs are translated concurrently (_shared.ollama.parallel_map) and reassembled in order.
+Sentence pairs are inferred from the model output, so they live in their own prompt
+version, "<prompt_version>-segments", of _shared.translation_cache: they never answer
+lookups of whole texts and can be evicted separately
+(python -m backend._shared.translation_cache evict --prompt-version 1-segments).
+Usage: from _shared.translation_memory import split_segments, translate_segments
+'''
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple, Union
+
+from .logging import log_event
+from .ollama import parallel_map
+from .translation_cache import lookup_translations, normalize_text, store_translations
+
+SENTENCE_SPLIT_RE = re.compile(r'([.!?]+\s+)')
+# translated/source length outside this range means the model merged or split sentences
+PAIR_LENGTH_RATIO = (0.4, 3.0)
+
+
+@dataclass
+class MemoryResult:
+    # translated pieces in source order; join with ' '
+    pieces: List[str] = field(default_factory=list)
+    segments: int = 0
+    reused: int = 0
+    calls: int = 0
+    # False when a run came back untranslated and its source text was kept
+    complete: bool = True
+
+    @property
+    def text(self) -> str:
+        return ' '.join(self.pieces)
+
+
+def split_segments(text: str) -> List[str]:
+    '''Sentences with their closing punctuation and whitespace; ''.join() gives back text.'''
+    parts = SENTENCE_SPLIT_RE.split(text or '')
+    segments = [parts[i] + (parts[i + 1] if i + 1 < len(parts) else '') for i in range(0, len(parts), 2)]
+    return [segment for segment in segments if segment]
+
+
+def _sentences(text: str) -> List[str]:
+    return [segment.strip() for segment in split_segments(text) if segment.strip()]
+
+
+def segment_prompt_version(prompt_version: str) -> str:
+    return f'{prompt_version}-segments'
+
+
+def _aligned_pairs(sources: List[str], sentences: List[str]) -> List[Tuple[str, str]]:
+    '''(source, translation) pairs when the run's output lines up sentence by sentence, else [].'''
+    if len(sources) != len(sentences):
+        return []
+    low, high = PAIR_LENGTH_RATIO
+    pairs = list(zip(sources, sentences))
+    if any(not low <= len(translated) / max(len(source.strip()), 1) <= high for source, translated in pairs):
+        return []
+    return pairs
+
+
+def translate_segments(
+    segments: List[str],
+    translate: Callable[[str], Optional[str]],
+    model: str,
+    prompt_version: str,
+    max_chars: int = 1500,
+) -> MemoryResult:
+    '''
+    Translates segments, reusing cached sentences. translate(text) returns the model
+    output or None on failure; consecutive misses are joined into runs of at most
+    max_chars, one translate() call per run, called from several threads.
+    '''
+    result = MemoryResult(segments=len(segments))
+    prompt_version = segment_prompt_version(prompt_version)
+    known = lookup_translations([segment for segment in segments if normalize_text(segment)], model, prompt_version)
+    # cached translations as str, runs of missing segments as lists
+    plan: List[Union[str, List[str]]] = []
+    for segment in segments:
+        cached = known.get(segment) if normalize_text(segment) else None
+        if cached is not None:
+            plan.append(cached)
+            result.reused += 1
+        elif plan and isinstance(plan[-1], list) and len(''.join(plan[-1])) + len(segment) <= max_chars:
+            plan[-1].append(segment)
+        else:
+            plan.append([segment])
+
+    runs = [item for item in plan if isinstance(item, list)]
+    translations = iter(parallel_map(lambda run: translate(''.join(run)), runs))
+    result.calls = len(runs)
+    for item in plan:
+        if isinstance(item, str):
+            result.pieces.append(item)
+            continue
+        translated = next(translations)
+        if translated is None:
+            result.complete = False
+            result.pieces.append(''.join(item).strip())
+            continue
+        result.pieces.append(translated)
+        pairs = _aligned_pairs([segment for segment in item if segment.strip()], _sentences(translated))
+        if pairs:
+            store_translations(pairs, model, prompt_version)
+
+    log_event('translation_memory.translated', {
+        'segments': result.segments,
+        'reused': result.reused,
+        'calls': result.calls,
+        'complete': result.complete,
+    })
+    return result
@@ -0,0 +1,117 @@
+'''
+Shared validators: every pattern is compiled once at import.
+Usage: from _shared.validation import FieldSpec, validate_form
+'''
+
+import html
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+PHONE_RE = re.compile(r"\+7\s?\(\d{3}\)\s?\d{3}-\d{2}-\d{2}")
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+IMAGE_URL_RE = re.compile(r'^https?://[\w\-./?=%&]+\.(jpg|jpeg|png|gif|webp)$', re.IGNORECASE)
+REPEATED_NEWLINES_RE = re.compile(r'[\r\n]{2,}')
+
+
+def sanitize_text(value: str) -> str:
+    if not isinstance(value, str):
+        return ''
+    value = html.escape(value)
+    return REPEATED_NEWLINES_RE.sub('\n', value).strip()
+
+
+def is_valid_phone(phone: str) -> bool:
+    return bool(PHONE_RE.fullmatch(phone))
+
+
+def is_valid_email(email: str) -> bool:
+    return bool(EMAIL_RE.fullmatch(email))
+
+
+def is_valid_image_url(value: str) -> bool:
+    if not value or not isinstance(value, str):
+        return False
+    return bool(IMAGE_URL_RE.search(value))
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    '''
+    Describes one form field for validate_form.
+    sanitize: run sanitize_text on the value (non-strings become '')
+    required: an empty value is an error
+    validator/error: checked for non-empty values, error is the message reported
+    empty_as_none: store None instead of '' for empty values
+    '''
+    default: Any = ''
+    sanitize: bool = True
+    required: bool = False
+    validator: Optional[Callable[[str], bool]] = None
+    error: str = ''
+    empty_as_none: bool = False
+
+
+def validate_form(data: Dict[str, Any], spec: Dict[str, FieldSpec]) -> Tuple[Dict[str, Any], List[str]]:
+    '''
+    Cleans and validates every field of a payload in one pass.
+    Returns (cleaned values keyed like spec, error messages in spec order).
+    '''
+    cleaned: Dict[str, Any] = {}
+    errors: List[str] = []
+    for name, field in spec.items():
+        value = data.get(name, field.default)
+        if field.sanitize:
+            value = sanitize_text(value)
+        empty = value is None or value == ''
+        if empty:
+            if field.required:
+                errors.append(field.error or f'{name} is required')
+            cleaned[name] = None if field.empty_as_none else value
+            continue
+        if field.validator is not None and not field.validator(value):
+            errors.append(field.error or f'Invalid {name}')
+        cleaned[name] = value
+    return cleaned, errors
+
+
+def _extract_host(value: str) -> str:
+    value = value.strip().lower()
+    if '://' in value:
+        host = urlsplit(value).hostname or ''
+    else:
+        host = value.split('/', 1)[0].rsplit('@', 1)[-1]
+        if not host.startswith('['):
+            host = host.split(':', 1)[0]
+    return host.rstrip('.')
+
+
+class OriginMatcher:
+    '''
+    Matches Origin/Referer values against allowed hosts.
+    Entries may be bare hosts or full origins; subdomains of an allowed host match too,
+    so a lookup costs one set probe per label of the request host.
+    '''
+
+    def __init__(self, allowed: Iterable[str]):
+        self.hosts = frozenset(host for host in (_extract_host(item) for item in allowed if item) if host)
+
+    def matches(self, origin: str) -> bool:
+        if not origin or not self.hosts:
+            return False
+        host = _extract_host(origin)
+        while host:
+            if host in self.hosts:
+                return True
+            _, dot, host = host.partition('.')
+            if not dot:
+                return False
+        return False
+
+
+@lru_cache(maxsize=16)
+def get_origin_matcher(allowed_origins: str) -> OriginMatcher:
+    '''Builds (once per distinct value) a matcher for a comma separated ALLOWED_ORIGINS string.'''
+    return OriginMatcher(item.strip() for item in allowed_origins.split(','))
@@ -7,11 +7,12 @@ from typing import Any, Dict, List, Optional, Tuple
 import psycopg2
 import redis
 
+from backend._shared.db import SLOW_QUERY_THRESHOLD_MS, connect
 from backend._shared.security import ensure_admin_authorized
+from backend._shared.serialization import dumps, json_body
 
 MAX_LIMIT = 100
 CACHE_TTL_SECONDS = 30
-SLOW_QUERY_THRESHOLD_MS = 250
 
 
 def get_redis_client() -> redis.Redis:
@@ -40,7 +41,7 @@ def json_response(status: int, body: Dict[str, Any]) -> Dict[str, Any]:
             'Content-Type': 'application/json',
             'Access-Control-Allow-Origin': '*'
         },
-        'body': json.dumps(body),
+        'body': json_body(body),
         'isBase64Encoded': False
     }
 
@@ -49,7 +50,7 @@ def get_db_connection() -> psycopg2.extensions.connection:
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
         raise RuntimeError('Database not configured')
-    return psycopg2.connect(database_url)
+    return connect(readonly=True)
 
 
 def parse_bool(value: str) -> Optional[bool]:
@@ -96,7 +97,7 @@ def mask_ip(ip_address: str) -> str:
 
 
 def cache_stats(client: redis.Redis, key: str, stats: Dict[str, Any]) -> None:
-    client.setex(f"admin-logs:stats:{key}", CACHE_TTL_SECONDS, json.dumps(stats))
+    client.setex(f"admin-logs:stats:{key}", CACHE_TTL_SECONDS, dumps(stats))
 
 
 def get_cached_stats(client: redis.Redis, key: str) -> Optional[Dict[str, Any]]:
@@ -109,7 +110,6 @@ def get_cached_stats(client: redis.Redis, key: str) -> Optional[Dict[str, Any]]:
 def fetch_logs(limit: int, offset: int, filters: str, args: List[Any], sort: str, direction: str) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
     conn = get_db_connection()
     cursor = conn.cursor()
-    start = time.time()
     cursor.execute(f"SELECT COUNT(*) FROM admin_login_logs{filters}", tuple(args))
     total = cursor.fetchone()[0]
     sorting = f"ORDER BY {sort} {direction}"
@@ -118,9 +118,6 @@ def fetch_logs(limit: int, offset: int, filters: str, args: List[Any], sort: str
         (*args, limit, offset)
     )
     rows = cursor.fetchall()
-    duration_ms = (time.time() - start) * 1000
-    if duration_ms > SLOW_QUERY_THRESHOLD_MS:
-        print(f"[WARN] Slow admin_logs query: {duration_ms:.2f} ms")
     cursor.close()
     conn.close()
     masks = []
@@ -220,5 +217,5 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return json_response(200, {'logs': logs, 'stats': stats, 'pagination': pagination})
     cache_key = f"{limit}:{offset}:{sort}:{direction}"
     client = get_redis_client()
-    client.setex(f"admin-logs:logs:{cache_key}", CACHE_TTL_SECONDS, json.dumps(logs))
+    client.setex(f"admin-logs:logs:{cache_key}", CACHE_TTL_SECONDS, dumps(logs))
     return json_response(200, {'logs': logs, 'stats': stats, 'pagination': pagination})
@@ -1,8 +1,9 @@
 import json
 import os
-import psycopg2
 from typing import Dict, Any, Optional
 
+from backend._shared.cache import invalidate
+from backend._shared.db import connect
 from backend._shared.security import ensure_admin_authorized, enforce_rate_limit
 
 
@@ -70,7 +71,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
-    conn = psycopg2.connect(database_url)
+    conn = connect(database_url)
     cur = conn.cursor()
     
     if method == 'GET':
@@ -142,6 +143,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         row = cur.fetchone()
         conn.commit()
+        invalidate('partners')
         
         partner = {
             'id': row[0],
@@ -213,6 +215,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         cur.execute(query, values)
         row = cur.fetchone()
         conn.commit()
+        invalidate('partners')
         
         if not row:
             cur.close()
@@ -275,6 +278,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         row = cur.fetchone()
         conn.commit()
+        invalidate('partners')
         
         cur.close()
         conn.close()
@@ -3,11 +3,11 @@ import os
 import secrets
 from typing import Any, Dict
 
-import psycopg2
 import redis
 
 from .bcrypt_utils import verify_password
-from backend.token_utils import create_jwt, verify_jwt
+from backend._shared.db import connect
+from backend.token_utils import create_jwt, revoke_jti, verify_jwt
 
 ATTEMPT_WINDOW_SECONDS = 60
 MAX_ATTEMPTS_PER_WINDOW = 5
@@ -51,7 +51,7 @@ def log_login_attempt(ip_address: str, user_agent: str, success: bool) -> None:
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
         return
-    conn = psycopg2.connect(database_url)
+    conn = connect(database_url)
     cursor = conn.cursor()
     cursor.execute(
         "INSERT INTO admin_login_logs (ip_address, user_agent, success) VALUES (%s, %s, %s)",
@@ -66,7 +66,7 @@ def get_password_hash_from_db() -> str:
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
         return ''
-    conn = psycopg2.connect(database_url)
+    conn = connect(database_url)
     cursor = conn.cursor()
     cursor.execute(
         "SELECT password_hash FROM users WHERE id = 2 OR username = 'suser' LIMIT 1"
@@ -142,6 +142,22 @@ def refresh_token_flow(token: str) -> Dict[str, str]:
     return generate_tokens(int(decoded.get('sub', '0')))
 
 
+def revoke_session(jti: str) -> None:
+    client = get_redis_client()
+    client.delete(f"auth-admin:refresh:{jti}")
+    client.setex(f"auth-admin:revoked:{jti}", ACCESS_TOKEN_SECONDS, '1')
+    revoke_jti(jti, ACCESS_TOKEN_SECONDS)
+
+
+def revoke_token_flow(token: str) -> bool:
+    refresh_secret = os.environ.get('JWT_REFRESH_SECRET', '')
+    decoded = verify_jwt(token, refresh_secret)
+    if not decoded or decoded.get('type') != 'refresh' or not decoded.get('jti'):
+        return False
+    revoke_session(decoded['jti'])
+    return True
+
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method = event.get('httpMethod', 'GET')
     headers = event.get('headers') or {}
@@ -168,6 +184,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return response(401, {'error': 'Invalid refresh token'})
         return response(200, {'tokens': tokens})
 
+    if grant_type == 'revoke':
+        if not revoke_token_flow(payload.get('refresh_token', '')):
+            return response(401, {'error': 'Invalid refresh token'})
+        return response(200, {'revoked': True})
+
     if not validate_captcha(payload):
         record_attempt(ip_address, False)
         log_login_attempt(ip_address, user_agent, False)
@@ -5,6 +5,8 @@ from typing import Dict, Any
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from backend._shared.db import connect
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Логирование попыток доступа ботов с сохранением в БД
@@ -52,7 +54,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'body': json.dumps({'error': 'DATABASE_URL not configured'})
             }
         
-        conn = psycopg2.connect(database_url)
+        conn = connect(database_url)
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
         user_agent_escaped = user_agent.replace("'", "''")
@@ -4,6 +4,10 @@ from typing import Dict, Any
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from backend._shared.db import connect, statement_budget
+from backend._shared.serialization import json_body
+
+@statement_budget(2000)
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Получение статистики и логов ботов из БД
@@ -50,7 +54,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'body': json.dumps({'error': 'DATABASE_URL not configured'})
             }
         
-        conn = psycopg2.connect(database_url)
+        conn = connect(readonly=True)
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
         cur.execute("""
@@ -77,10 +81,6 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         logs = cur.fetchall()
         
-        for log in logs:
-            if log['created_at']:
-                log['created_at'] = log['created_at'].isoformat()
-        
         cur.execute("SELECT COUNT(*) as total FROM bot_logs")
         total = cur.fetchone()['total']
         
@@ -94,7 +94,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'Content-Type': 'application/json'
             },
             'isBase64Encoded': False,
-            'body': json.dumps({
+            'body': json_body({
                 'stats': {
                     'total_attempts': stats['total_attempts'],
                     'blocked_count': stats['blocked_count'],
@@ -10,11 +10,16 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_LEFT
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
-import requests
+from backend._shared.notifications import enqueue_email, enqueue_telegram, enqueue_telegram_document
+from backend._shared.validation import OriginMatcher
+
+BRIEF_ORIGINS = OriginMatcher([
+    'centerai.tech',
+    'www.centerai.tech',
+    'centerai-tech.web.app',
+    'centerai-tech.firebaseapp.com',
+    'localhost'
+])
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
@@ -47,21 +52,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     origin = headers.get('origin', headers.get('Origin', ''))
     referer = headers.get('referer', headers.get('Referer', ''))
     
-    allowed_domains = [
-        'centerai.tech',
-        'www.centerai.tech',
-        'centerai-tech.web.app',
-        'centerai-tech.firebaseapp.com',
-        'localhost'
-    ]
-    
-    is_allowed = False
-    for domain in allowed_domains:
-        if domain in origin or domain in referer:
-            is_allowed = True
-            break
-    
-    if not is_allowed:
+    if not BRIEF_ORIGINS.matches(origin) and not BRIEF_ORIGINS.matches(referer):
         return {
             'statusCode': 403,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -71,7 +62,6 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     try:
         body_data = json.loads(event.get('body', '{}'))
         
-        telegram_token = os.environ.get('TELEGRAM_BOT_TOKEN', '')
         telegram_chat_id = os.environ.get('TELEGRAM_CHAT_ID', '')
         
         pdf_buffer = generate_pdf(body_data)
@@ -93,16 +83,15 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             try:
                 send_telegram_pdf(
                     telegram_username=body_data.get('clientTelegram'),
-                    pdf_buffer=pdf_buffer,
-                    bot_token=telegram_token
+                    pdf_buffer=pdf_buffer
                 )
                 delivery_success = True
             except Exception as tg_error:
                 print(f'Telegram sending error: {tg_error}')
         
-        if telegram_token and telegram_chat_id:
+        if telegram_chat_id:
             try:
-                send_telegram_notification(body_data, telegram_token, telegram_chat_id)
+                send_telegram_notification(body_data, telegram_chat_id)
             except Exception as notif_error:
                 print(f'Notification error: {notif_error}')
         
@@ -208,18 +197,7 @@ def generate_pdf(data: Dict[str, Any]) -> io.BytesIO:
 
 
 def send_email_with_pdf(to_email: str, pdf_buffer: io.BytesIO, brief_data: Dict[str, Any]) -> None:
-    smtp_host = os.environ.get('SMTP_HOST')
-    smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-    smtp_user = os.environ.get('SMTP_USER')
-    smtp_password = os.environ.get('SMTP_PASSWORD')
-    
-    if not all([smtp_host, smtp_user, smtp_password]):
-        raise ValueError('SMTP credentials not configured')
-    
-    msg = MIMEMultipart()
-    msg['From'] = smtp_user
-    msg['To'] = to_email
-    msg['Subject'] = 'Ваша заполненная анкета на создание сайта'
+    subject = 'Ваша заполненная анкета на создание сайта'
     
     body = f'''Здравствуйте, {brief_data.get('companyName', '')}!
 
@@ -234,37 +212,15 @@ Email: ivanickiy@centerai.tech
 Телефон: +7 (958) 240-00-10
 '''
     
-    msg.attach(MIMEText(body, 'plain', 'utf-8'))
-    
-    pdf_buffer.seek(0)
-    pdf_attachment = MIMEApplication(pdf_buffer.read(), _subtype='pdf')
-    pdf_attachment.add_header('Content-Disposition', 'attachment', filename='anketa.pdf')
-    msg.attach(pdf_attachment)
-    
-    server = None
-    try:
-        server = smtplib.SMTP(smtp_host, smtp_port, timeout=30)
-        server.set_debuglevel(0)
-        server.ehlo()
-        if server.has_extn('STARTTLS'):
-            server.starttls()
-            server.ehlo()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
-    except Exception as e:
-        print(f'SMTP error details: {str(e)}')
-        raise
-    finally:
-        if server:
-            try:
-                server.quit()
-            except Exception:
-                pass
+    enqueue_email(
+        to_email,
+        subject,
+        body,
+        attachments=[{'filename': 'anketa.pdf', 'content': pdf_buffer.getvalue(), 'subtype': 'pdf'}]
+    )
 
 
-def send_telegram_pdf(telegram_username: str, pdf_buffer: io.BytesIO, bot_token: str) -> None:
-    url = f'https://api.telegram.org/bot{bot_token}/sendDocument'
-    
+def send_telegram_pdf(telegram_username: str, pdf_buffer: io.BytesIO) -> None:
     caption_text = f'''Здравствуйте!
 
 Спасибо за заполнение анкеты на создание сайта.
@@ -276,18 +232,10 @@ def send_telegram_pdf(telegram_username: str, pdf_buffer: io.BytesIO, bot_token:
 📧 ivanickiy@centerai.tech
 📞 +7 (958) 240-00-10'''
     
-    files = {'document': ('anketa.pdf', pdf_buffer.getvalue(), 'application/pdf')}
-    data = {
-        'chat_id': telegram_username,
-        'caption': caption_text
-    }
-    
-    requests.post(url, files=files, data=data)
+    enqueue_telegram_document(telegram_username, 'anketa.pdf', pdf_buffer.getvalue(), caption=caption_text)
 
 
-def send_telegram_notification(brief_data: Dict[str, Any], bot_token: str, chat_id: str) -> None:
-    url = f'https://api.telegram.org/bot{bot_token}/sendMessage'
-    
+def send_telegram_notification(brief_data: Dict[str, Any], chat_id: str) -> None:
     design_types = {
         'corporate': 'Строгий корпоративный',
         'corporate-graphics': 'Корпоративный с графикой',
@@ -316,10 +264,4 @@ def send_telegram_notification(brief_data: Dict[str, Any], bot_token: str, chat_
 ⏰ Дата: {datetime.now().strftime("%d.%m.%Y %H:%M")}
 '''
     
-    data = {
-        'chat_id': chat_id,
-        'text': message,
-        'parse_mode': 'HTML'
-    }
-    
-    requests.post(url, json=data)
\ No newline at end of file
+    enqueue_telegram(message, chat_id=chat_id, parse_mode='HTML')
\ No newline at end of file
@@ -5,22 +5,28 @@ Returns: HTTP response with success/error status
 '''
 import json
 import os
-import urllib.request
-import time
 from typing import Dict, Any
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from _shared.db_secrets import get_secret
-from _shared.security import (
-    sanitize_text,
-    is_valid_phone,
-    is_valid_email,
+from backend._shared.db import connect
+from backend._shared.security import (
     rate_limited,
     validate_origin,
     check_honeypot,
 )
-from _shared.logging import log_event
-import threading
+from backend._shared.validation import FieldSpec, is_valid_email, is_valid_phone, validate_form
+from backend._shared.logging import log_event
+from backend._shared.notifications import enqueue_telegram
+from backend._shared.serialization import json_body
+
+CONSENT_FORM_SPEC = {
+    'fullName': FieldSpec(default='Аноним'),
+    'phone': FieldSpec(validator=is_valid_phone, error='Неверный формат телефона', empty_as_none=True),
+    'email': FieldSpec(validator=is_valid_email, error='Неверный формат email', empty_as_none=True),
+    'cookies': FieldSpec(default=False, sanitize=False),
+    'terms': FieldSpec(default=False, sanitize=False),
+    'privacy': FieldSpec(default=False, sanitize=False),
+}
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
@@ -53,35 +59,6 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Forbidden: Invalid origin'})
         }
 
-    def _send_telegram(message_payload: dict):
-        telegram_token = get_secret('TELEGRAM_BOT_TOKEN')
-        telegram_chat = get_secret('TELEGRAM_CHAT_ID')
-        if not telegram_token or not telegram_chat:
-            return
-
-        attempts = 0
-        while attempts < 3:
-            try:
-                telegram_url = f'https://api.telegram.org/bot{telegram_token}/sendMessage'
-                request_payload = {
-                    'chat_id': telegram_chat,
-                    'text': message_payload['text'],
-                    'parse_mode': 'HTML'
-                }
-                req = urllib.request.Request(
-                    telegram_url,
-                    data=json.dumps(request_payload).encode('utf-8'),
-                    headers={'Content-Type': 'application/json'}
-                )
-                with urllib.request.urlopen(req, timeout=5) as response:
-                    result = json.loads(response.read().decode('utf-8'))
-                    if result.get('ok'):
-                        break
-            except Exception as e:
-                log_event('consent_telegram_retry_error', {'error': str(e), 'attempt': attempts + 1})
-                time.sleep(attempts + 1)
-            attempts += 1
-
     if method == 'POST':
         try:
             body_data = json.loads(event.get('body', '{}'))
@@ -109,12 +86,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'body': json.dumps({'error': 'Rate limit exceeded'})
                 }
 
-            full_name = sanitize_text(body_data.get('fullName', 'Аноним'))
-            phone = sanitize_text(body_data.get('phone', '')).strip() or None
-            email = sanitize_text(body_data.get('email', '')).strip() or None
-            cookies = body_data.get('cookies', False)
-            terms = body_data.get('terms', False)
-            privacy = body_data.get('privacy', False)
+            form, errors = validate_form(body_data, CONSENT_FORM_SPEC)
+            full_name = form['fullName']
+            phone = form['phone']
+            email = form['email']
+            cookies = form['cookies']
+            terms = form['terms']
+            privacy = form['privacy']
             
             # Если privacy не принято, разрешаем пустое full_name
             if privacy and not full_name:
@@ -133,27 +111,19 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             user_agent = event.get('headers', {}).get('user-agent', 'unknown')
 
-            if phone and not is_valid_phone(phone):
+            if errors:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
                     'isBase64Encoded': False,
-                    'body': json.dumps({'error': 'Неверный формат телефона'})
-                }
-
-            if email and not is_valid_email(email):
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'isBase64Encoded': False,
-                    'body': json.dumps({'error': 'Неверный формат email'})
+                    'body': json.dumps({'error': errors[0]})
                 }
             
             database_url = os.environ.get('DATABASE_URL')
             if not database_url:
                 raise Exception('DATABASE_URL not configured')
             
-            conn = psycopg2.connect(database_url)
+            conn = connect(database_url)
             cur = conn.cursor()
 
             insert_query = '''
@@ -176,12 +146,39 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             result = cur.fetchone()
             consent_id = result[0] if result else None
+
+            # Уведомление пишется в outbox в той же транзакции, что и согласие
+            telegram_success = False
+            cur.execute('SAVEPOINT consent_notification')
+            try:
+                telegram_message = f'''
+✅ Новое согласие от пользователя
+👤 Имя: {full_name}
+📞 Телефон: {phone or 'не указан'}
+📧 Email: {email or 'не указан'}
+🍪 Cookies: {'да' if cookies else 'нет'}
+📋 Terms: {'да' if terms else 'нет'}
+🔐 Privacy: {'да' if privacy else 'нет'}
+🌐 IP: {ip_address}
+🆔 ID: {consent_id}
+'''
+                enqueue_telegram(
+                    telegram_message,
+                    parse_mode='HTML',
+                    dedup_key=f'consent:{consent_id}',
+                    conn=conn,
+                )
+                cur.execute('RELEASE SAVEPOINT consent_notification')
+                telegram_success = True
+            except Exception as e:
+                cur.execute('ROLLBACK TO SAVEPOINT consent_notification')
+                log_event('consent_telegram_enqueue_error', {'error': str(e), 'consent_id': consent_id})
             
             conn.commit()
             cur.close()
             conn.close()
             try:
-                conn2 = psycopg2.connect(database_url)
+                conn2 = connect(database_url)
                 cur2 = conn2.cursor()
                 cur2.execute('''
                     INSERT INTO user_consents_history 
@@ -204,24 +201,6 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             except Exception as e:
                 log_event('consent_history_error', {'error': str(e), 'consent_id': consent_id})
 
-            # Отправка уведомления в Telegram (не блокирующая, с коротким таймаутом)
-            telegram_success = False
-            try:
-                telegram_message = f'''
-✅ Новое согласие от пользователя
-👤 Имя: {full_name}
-📞 Телефон: {phone or 'не указан'}
-📧 Email: {email or 'не указан'}
-🍪 Cookies: {'да' if cookies else 'нет'}
-📋 Terms: {'да' if terms else 'нет'}
-🔐 Privacy: {'да' if privacy else 'нет'}
-🌐 IP: {ip_address}
-🆔 ID: {consent_id}
-'''
-                threading.Thread(target=_send_telegram, args=({'text': telegram_message},), daemon=True).start()
-                telegram_success = True
-            except Exception as e:
-                log_event('consent_telegram_spawn_error', {'error': str(e)})
             return {
                 'statusCode': 200,
                 'headers': {
@@ -256,7 +235,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             if not database_url:
                 raise Exception('DATABASE_URL not configured')
             
-            conn = psycopg2.connect(database_url)
+            conn = connect(readonly=True)
             cur = conn.cursor(cursor_factory=RealDictCursor)
             
             cur.execute('''
@@ -284,7 +263,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'terms': consent['terms_accepted'],
                     'privacy': consent['privacy_accepted'],
                     'ipAddress': consent['ip_address'],
-                    'createdAt': consent['created_at'].isoformat() if consent['created_at'] else None
+                    'createdAt': consent['created_at']
                 })
             
             return {
@@ -294,7 +273,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'Access-Control-Allow-Origin': '*'
                 },
                 'isBase64Encoded': False,
-                'body': json.dumps({'consents': result})
+                'body': json_body({'consents': result})
             }
             
         except Exception as e:
@@ -1,47 +1,26 @@
 import json
 import os
-import urllib.request
 from typing import Dict, Any
-import psycopg2
-import base64
+import hashlib
 
-from _shared.security import (
-    sanitize_text,
-    is_valid_phone,
-    is_valid_email,
+from backend._shared.db_secrets import get_secret
+from backend._shared.security import (
     rate_limited,
     validate_origin,
     check_honeypot,
 )
-from _shared.logging import log_event
+from backend._shared.validation import FieldSpec, is_valid_email, is_valid_phone, validate_form
+from backend._shared.logging import log_event
+from backend._shared.http import http_post
+from backend._shared.notifications import enqueue_telegram
 
-_secret_cache = {}
-
-def get_secret(key: str) -> str:
-    '''Reads secret from database with caching'''
-    if key in _secret_cache:
-        return _secret_cache[key]
-    
-    try:
-        dsn = os.environ.get('DATABASE_URL')
-        conn = psycopg2.connect(dsn)
-        cur = conn.cursor()
-        key_escaped = key.replace("'", "''")
-        cur.execute(f"SELECT encrypted_value FROM secure_settings WHERE key = '{key_escaped}'")
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
-        
-        if row:
-            value = base64.b64decode(row[0].encode()).decode()
-            _secret_cache[key] = value
-            return value
-    except Exception as e:
-        print(f'DB secret read error for {key}: {str(e)}')
-    
-    env_value = os.environ.get(key, '')
-    _secret_cache[key] = env_value
-    return env_value
+CONTACT_FORM_SPEC = {
+    'name': FieldSpec(default='Не указано'),
+    'phone': FieldSpec(default='Не указано', required=True, validator=is_valid_phone, error='Неверный формат телефона'),
+    'email': FieldSpec(validator=is_valid_email, error='Неверный формат email'),
+    'type': FieldSpec(default='contact_form'),
+    'timestamp': FieldSpec(),
+}
 
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -112,25 +91,19 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Rate limit exceeded'})
         }
 
-    name: str = sanitize_text(body_data.get('name', 'Не указано'))
-    phone: str = sanitize_text(body_data.get('phone', 'Не указано'))
-    email: str = sanitize_text(body_data.get('email', ''))
-    form_type: str = sanitize_text(body_data.get('type', 'contact_form'))
-    timestamp: str = sanitize_text(body_data.get('timestamp', ''))
-
-    if not is_valid_phone(phone):
+    form, errors = validate_form(body_data, CONTACT_FORM_SPEC)
+    if errors:
         return {
             'statusCode': 400,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Неверный формат телефона'})
+            'body': json.dumps({'error': errors[0]})
         }
 
-    if email and not is_valid_email(email):
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Неверный формат email'})
-        }
+    name: str = form['name']
+    phone: str = form['phone']
+    email: str = form['email']
+    form_type: str = form['type']
+    timestamp: str = form['timestamp']
     
     # Битрикс24
     bitrix_webhook = get_secret('BITRIX24_WEBHOOK_URL') or get_secret('bitrix24_webhook_url') or ''
@@ -147,25 +120,15 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             }
             
             bitrix_url = f'{bitrix_webhook}crm.lead.add.json'
-            bitrix_request = urllib.request.Request(
-                bitrix_url,
-                data=json.dumps({'fields': bitrix_data}).encode('utf-8'),
-                headers={'Content-Type': 'application/json'}
-            )
-            with urllib.request.urlopen(bitrix_request, timeout=10) as response:
-                bitrix_result = json.loads(response.read().decode('utf-8'))
-                bitrix_success = bitrix_result.get('result', False)
+            response = http_post(bitrix_url, json={'fields': bitrix_data}, timeout=10)
+            bitrix_success = response.json().get('result', False)
         except Exception as e:
             log_event('contact_form_bitrix_error', {'error': str(e), 'body': body_data})
     
-    # Telegram
+    # Telegram: уведомление ставится в outbox, отправляет воркер
     telegram_success = False
-    telegram_bot_token = get_secret('TELEGRAM_BOT_TOKEN') or ''
-    telegram_chat_id = get_secret('TELEGRAM_CHAT_ID') or ''
-    
-    if telegram_bot_token and telegram_chat_id:
-        try:
-            telegram_message = f'''
+    try:
+        telegram_message = f'''
 🆕 Новая заявка с сайта
 
 👤 Имя: {name}
@@ -174,24 +137,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 📝 Тип формы: {form_type}
 🕐 Время: {timestamp}
 '''
-            
-            telegram_url = f'https://api.telegram.org/bot{telegram_bot_token}/sendMessage'
-            telegram_data = {
-                'chat_id': telegram_chat_id,
-                'text': telegram_message
-            }
-            
-            telegram_request = urllib.request.Request(
-                telegram_url,
-                data=json.dumps(telegram_data).encode('utf-8'),
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            with urllib.request.urlopen(telegram_request, timeout=10) as response:
-                telegram_result = json.loads(response.read().decode('utf-8'))
-                telegram_success = telegram_result.get('ok', False)
-        except Exception as e:
-            log_event('contact_form_telegram_error', {'error': str(e), 'body': body_data})
+        dedup_key = 'contact-form:' + hashlib.sha256(
+            f'{phone}|{form_type}|{timestamp}'.encode()
+        ).hexdigest() if timestamp else None
+        enqueue_telegram(telegram_message, chat_id=get_secret('TELEGRAM_CHAT_ID'), dedup_key=dedup_key)
+        telegram_success = True
+    except Exception as e:
+        log_event('contact_form_telegram_error', {'error': str(e), 'body': body_data})
     
     return {
         'statusCode': 200,
@@ -1,9 +1,11 @@
 import json
-import psycopg2
 import os
 from datetime import datetime, timedelta
 from typing import Dict, Any
 
+from backend._shared.db import connect, statement_budget
+
+@statement_budget(2000)
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Получение статистики посещений сайта
@@ -31,7 +33,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         days = int(params.get('days', '14'))
         
         dsn = os.environ.get('DATABASE_URL')
-        conn = psycopg2.connect(dsn)
+        conn = connect(readonly=True)
         cur = conn.cursor()
         
         cur.execute("""
@@ -8,11 +8,14 @@ Returns: HTTP response dict with statusCode, headers, body
 
 import json
 import os
-import psycopg2
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from backend._shared.cache import invalidate
+from backend._shared.db import connect, statement_budget
 from backend._shared.logging import log_event
+from backend._shared.news_dedup import canonicalize_url
+from backend._shared.serialization import json_body
 from backend._shared.security import (
     ensure_admin_authorized,
     enforce_rate_limit,
@@ -24,7 +27,7 @@ def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise Exception('DATABASE_URL not found in environment')
-    return psycopg2.connect(dsn)
+    return connect(dsn)
 
 def get_all_news() -> List[Dict[str, Any]]:
     """Get all news sorted by published_date descending"""
@@ -55,16 +58,8 @@ def get_all_news() -> List[Dict[str, Any]]:
             """)
             
             columns = [desc[0] for desc in cur.description]
-            news_list = []
-            for row in cur.fetchall():
-                news_item = dict(zip(columns, row))
-                # Convert datetime objects to ISO strings
-                for date_field in ['published_date', 'created_at', 'updated_at', 'translated_at']:
-                    if news_item.get(date_field) and isinstance(news_item[date_field], datetime):
-                        news_item[date_field] = news_item[date_field].isoformat()
-                news_list.append(news_item)
-            
-            return news_list
+            # datetime-поля сериализует json_body, без промежуточного isoformat()
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
     finally:
         conn.close()
 
@@ -76,9 +71,9 @@ def create_news(data: Dict[str, Any]) -> Dict[str, Any]:
             cur.execute("""
                 INSERT INTO public.news
                 (original_title, translated_title, original_excerpt, translated_excerpt,
-                 original_content, translated_content, source, source_url, link, image_url,
+                 original_content, translated_content, source, source_url, link, canonical_link, image_url,
                  category, published_date, is_active, translated_at, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
                 RETURNING id, original_title, translated_title, original_excerpt, translated_excerpt,
                           original_content, translated_content, source, source_url, link, image_url,
                           category, published_date, is_active, created_at, updated_at, translated_at
@@ -92,6 +87,7 @@ def create_news(data: Dict[str, Any]) -> Dict[str, Any]:
                 data.get('source', ''),
                 data.get('source_url', ''),
                 data.get('link', ''),
+                canonicalize_url(data.get('link', '')) or None,
                 data.get('image_url', ''),
                 data.get('category', 'Технологии'),
                 data.get('published_date', datetime.now().isoformat()),
@@ -99,15 +95,11 @@ def create_news(data: Dict[str, Any]) -> Dict[str, Any]:
             ))
             
             conn.commit()
+            invalidate('news')
             
             columns = [desc[0] for desc in cur.description]
             row = cur.fetchone()
             news_item = dict(zip(columns, row))
-            # Convert datetime objects
-            for date_field in ['published_date', 'created_at', 'updated_at', 'translated_at']:
-                if news_item.get(date_field) and isinstance(news_item[date_field], datetime):
-                    news_item[date_field] = news_item[date_field].isoformat()
-            
             return news_item
     finally:
         conn.close()
@@ -122,7 +114,7 @@ def update_news(news_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
                 SET original_title = %s, translated_title = %s,
                     original_excerpt = %s, translated_excerpt = %s,
                     original_content = %s, translated_content = %s,
-                    source = %s, source_url = %s, link = %s,
+                    source = %s, source_url = %s, link = %s, canonical_link = %s,
                     image_url = %s, category = %s, published_date = %s,
                     is_active = %s, updated_at = CURRENT_TIMESTAMP
                 WHERE id = %s
@@ -139,6 +131,7 @@ def update_news(news_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
                 data.get('source', ''),
                 data.get('source_url', ''),
                 data.get('link', ''),
+                canonicalize_url(data.get('link', '')) or None,
                 data.get('image_url', ''),
                 data.get('category', 'Технологии'),
                 data.get('published_date', datetime.now().isoformat()),
@@ -147,6 +140,7 @@ def update_news(news_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
             ))
             
             conn.commit()
+            invalidate('news')
             
             columns = [desc[0] for desc in cur.description]
             row = cur.fetchone()
@@ -154,11 +148,6 @@ def update_news(news_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
                 return None
             
             news_item = dict(zip(columns, row))
-            # Convert datetime objects
-            for date_field in ['published_date', 'created_at', 'updated_at', 'translated_at']:
-                if news_item.get(date_field) and isinstance(news_item[date_field], datetime):
-                    news_item[date_field] = news_item[date_field].isoformat()
-            
             return news_item
     finally:
         conn.close()
@@ -190,6 +179,7 @@ def patch_news(news_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
             """, tuple(values))
             
             conn.commit()
+            invalidate('news')
             
             columns = [desc[0] for desc in cur.description]
             row = cur.fetchone()
@@ -212,6 +202,7 @@ def delete_news(news_id: int) -> bool:
             """, (news_id,))
             
             conn.commit()
+            invalidate('news')
             return cur.rowcount > 0
     finally:
         conn.close()
@@ -229,6 +220,7 @@ def validate_text(value: str, default: str = '') -> str:
     return sanitize_text(value or default)
 
 
+@statement_budget(30000)
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method = event.get('httpMethod', 'GET')
 
@@ -273,7 +265,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 200,
                 'headers': headers,
-                'body': json.dumps(news),
+                'body': json_body(news),
                 'isBase64Encoded': False
             }
         
@@ -285,7 +277,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 201,
                 'headers': headers,
-                'body': json.dumps(news_item),
+                'body': json_body(news_item),
                 'isBase64Encoded': False
             }
         
@@ -314,7 +306,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 200,
                 'headers': headers,
-                'body': json.dumps(news_item),
+                'body': json_body(news_item),
                 'isBase64Encoded': False
             }
         
@@ -343,7 +335,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 200,
                 'headers': headers,
-                'body': json.dumps(news_item),
+                'body': json_body(news_item),
                 'isBase64Encoded': False
             }
         
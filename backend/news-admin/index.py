@@ -5,7 +5,6 @@ from typing import Dict, Any, List, Optional
 import re
 from html import unescape
 import os
-import http.client
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import requests
@@ -14,18 +13,46 @@ from readability import Document
 import time
 from functools import wraps
 
+from backend._shared.cache import invalidate
+from backend._shared.db import connect, statement_budget
+from backend._shared.feeds import FeedResult, fetch_feeds, load_feed_states, save_feed_states
+from backend._shared.http import CircuitOpenError, backoff_delay, http_get
 from backend._shared.logging import log_event
+from backend._shared.news_dedup import canonicalize_url, known_links
+from backend._shared.ollama import (
+    generate_stream,
+    get_generate_stats,
+    get_pool_stats,
+    is_available,
+    parallel_map,
+    reset_generate_stats,
+    warm_up_in_background,
+)
 from backend._shared.security import (
     ensure_admin_authorized,
     enforce_rate_limit,
     is_valid_image_url,
 )
+from backend._shared.translation_batch import make_batches, translate_batch
+from backend._shared.translation_cache import (
+    get_translation_cache_stats,
+    lookup_translation,
+    lookup_translations,
+    reset_translation_cache_stats,
+    store_translation,
+    store_translations,
+)
+from backend._shared.translation_memory import SENTENCE_SPLIT_RE, split_segments, translate_segments
+
+OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3.2')
+# Версия промпта перевода - входит в ключ кэша переводов, повышать при каждой правке промпта
+TRANSLATION_PROMPT_VERSION = '1'
 
 def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise Exception('DATABASE_URL not set')
-    return psycopg2.connect(dsn)
+    return connect(dsn)
 
 def timing_decorator(func):
     """Decorator that logs function runtime."""
@@ -409,6 +436,30 @@ def post_process_translation(text: str) -> str:
     
     return text.strip()
 
+def is_valid_translation(source: str, translated: str) -> bool:
+    """Проверка качества перевода: непустой, не слишком короткий и отличается от оригинала"""
+    return bool(translated) and len(translated) > 10 and translated != source
+
+# Стоп-строки, после которых модель уже не переводит, а комментирует; проверяются по мере генерации
+TRANSLATION_STOP = [
+    '\n\nText to translate:', 'English text:', '---',
+    '\n\nNote:', '\n\n(Note', '\n\nПримечание', '\n\nExplanation',
+]
+# Потолок длины перевода относительно оригинала (русский текст обычно длиннее английского на 10-30%)
+TRANSLATION_MAX_LENGTH_RATIO = float(os.environ.get('TRANSLATION_MAX_LENGTH_RATIO', '2.5'))
+
+# Промпт пакетного перевода коротких текстов; за ним следует JSON-объект {"1": текст, ...}
+BATCH_TRANSLATION_INSTRUCTIONS = """Translate every value of the JSON object below from English to Russian.
+Rules:
+- Return ONLY a JSON object with exactly the same keys
+- Each value must contain ONLY the Russian translation of the original value
+- Do NOT add any explanations, comments, or meta-text
+- Preserve the original meaning and tone
+- Do NOT translate proper names and technical terms
+
+JSON object:
+"""
+
 def translate_text(text: str, max_retries: int = 2) -> str:
     """
     Переводит текст с английского на русский через Ollama.
@@ -426,10 +477,12 @@ def translate_text(text: str, max_retries: int = 2) -> str:
     # Ограничиваем длину для одного запроса
     text_to_translate = text[:1500]
     
+    cached = lookup_translation(text_to_translate, OLLAMA_MODEL, TRANSLATION_PROMPT_VERSION)
+    if cached is not None:
+        return cached
+    
     for attempt in range(max_retries):
         try:
-            conn = http.client.HTTPConnection('localhost', 11434, timeout=45)
-            
             # Улучшенный промпт с четкими инструкциями
             prompt = f"""Translate the following English text to Russian.
 Rules:
@@ -444,10 +497,9 @@ Text to translate:
 
 Russian translation:"""
             
-            payload = json.dumps({
-                'model': 'llama3.2',
+            payload = {
+                'model': OLLAMA_MODEL,
                 'prompt': prompt,
-                'stream': False,
                 'options': {
                     'temperature': 0.3,  # Увеличено для более естественного перевода
                     'top_p': 0.9,
@@ -455,42 +507,50 @@ Russian translation:"""
                     'num_predict': 2000,  # Увеличено для длинных текстов
                     'stop': ['\n\nText to translate:', 'English text:', '---']
                 }
-            })
+            }
             
-            headers = {'Content-Type': 'application/json'}
-            conn.request('POST', '/api/generate', payload, headers)
-            response = conn.getresponse()
-            data = response.read().decode('utf-8')
+            # Ответ читается потоком: генерация обрывается на стоп-строке или при превышении
+            # длины относительно оригинала; запрос уходит на наименее загруженный сервер из OLLAMA_URLS,
+            # на каждом не больше OLLAMA_NUM_PARALLEL запросов одновременно
+            result = generate_stream(
+                payload,
+                stop=TRANSLATION_STOP,
+                max_chars=int(len(text_to_translate) * TRANSLATION_MAX_LENGTH_RATIO) + 100,
+            )
             
-            if response.status == 200:
-                result = json.loads(data)
-                translated = result.get('response', '').strip()
+            if result.status_code == 200:
+                translated = result.text.strip()
+                if result.done_reason == 'client_length' and '\n\n' in translated:
+                    # Модель продолжила писать после перевода - отбрасываем оборванный абзац
+                    translated = translated.rsplit('\n\n', 1)[0].strip()
                 
                 # Пост-обработка перевода
                 translated = post_process_translation(translated)
                 
                 # Проверка качества перевода
-                if translated and len(translated) > 10 and translated != text_to_translate:
-                    conn.close()
+                if is_valid_translation(text_to_translate, translated):
                     print(f"Translation successful: {len(text_to_translate)} -> {len(translated)} chars")
+                    store_translation(text_to_translate, translated, OLLAMA_MODEL, TRANSLATION_PROMPT_VERSION)
                     return translated
                 else:
                     print(f"Translation attempt {attempt + 1} produced invalid result")
             else:
-                print(f"Ollama returned status {response.status}")
+                print(f"Ollama returned status {result.status_code}")
             
-            conn.close()
-            
-        except http.client.HTTPException as e:
+        except CircuitOpenError as e:
+            # Ollama недавно падал - не ждём таймаутов, сразу отдаём оригинал
+            print(f'Ollama circuit open, skipping translation: {e}')
+            return text
+        except requests.RequestException as e:
             print(f'Ollama HTTP error (attempt {attempt + 1}): {e}')
         except json.JSONDecodeError as e:
             print(f'Ollama JSON decode error (attempt {attempt + 1}): {e}')
         except Exception as e:
             print(f'Ollama translation error (attempt {attempt + 1}): {e}')
         
-        # Задержка перед повторной попыткой
+        # Задержка перед повторной попыткой - экспоненциальная с джиттером вместо фиксированной
         if attempt < max_retries - 1:
-            time.sleep(2)
+            time.sleep(backoff_delay(attempt))
     
     # Если все попытки неудачны, возвращаем оригинал
     print(f'All translation attempts failed, returning original text')
@@ -511,10 +571,14 @@ def translate_long_text(text: str, chunk_size: int = 1500) -> str:
     if not text or len(text) <= chunk_size:
         return translate_text(text)
     
+    cached = lookup_translation(text, OLLAMA_MODEL, TRANSLATION_PROMPT_VERSION)
+    if cached is not None:
+        return cached
+    
     print(f"Translating long text ({len(text)} chars) in chunks...")
     
     # Разбиваем текст на части по предложениям
-    sentences = re.split(r'([.!?]+\s+)', text)
+    sentences = SENTENCE_SPLIT_RE.split(text)
     
     chunks = []
     current_chunk = ""
@@ -533,19 +597,24 @@ def translate_long_text(text: str, chunk_size: int = 1500) -> str:
     if current_chunk:
         chunks.append(current_chunk)
     
-    # Переводим каждую часть
-    translated_chunks = []
-    for i, chunk in enumerate(chunks[:5]):  # Ограничиваем 5 частями
-        print(f"Translating chunk {i + 1}/{min(len(chunks), 5)}...")
+    def translate_run(chunk: str) -> Optional[str]:
+        print(f"Translating chunk ({len(chunk)} chars)...")
         translated = translate_text(chunk)
-        translated_chunks.append(translated)
-        
-        # Задержка между частями
-        if i < len(chunks) - 1:
-            time.sleep(1)
-    
-    result = ' '.join(translated_chunks)
-    print(f"Long text translation complete: {len(result)} chars")
+        # Вернувшийся без изменений текст означает ошибку Ollama
+        return translated if translated != chunk else None
+    
+    # Ограничиваем 5 частями; уже переведённые ранее предложения берутся из памяти переводов,
+    # в Ollama параллельно уходят только подряд идущие новые предложения
+    memory = translate_segments(
+        split_segments(''.join(chunks[:5])), translate_run,
+        OLLAMA_MODEL, TRANSLATION_PROMPT_VERSION, max_chars=chunk_size,
+    )
+    result = memory.text
+    print(f"Long text translation complete: {len(result)} chars, "
+          f"{memory.reused}/{memory.segments} sentences reused, {memory.calls} Ollama requests")
+    # Часть, вернувшаяся без перевода, не кэшируется целиком
+    if memory.complete:
+        store_translation(text, result, OLLAMA_MODEL, TRANSLATION_PROMPT_VERSION)
     
     return result
 
@@ -625,7 +694,7 @@ def fetch_article_content(url: str, timeout: int = 10) -> tuple:
         print(f"Fetching article from: {url}")
         
         # Запрос страницы
-        response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
+        response = http_get(url, headers=headers, timeout=timeout, allow_redirects=True, retries=0)
         response.raise_for_status()
         
         # Проверка типа контента
@@ -708,7 +777,7 @@ def translate_full_content(text: str) -> str:
     if not text or len(text.strip()) < 10:
         return text
     
-    # Ограничиваем общую длину
+    # Ограничиваем общую длину; кэш переводов проверяется в translate_long_text / translate_text уже по обрезанному тексту
     text = text[:5000]
     
     # Используем перевод по частям для длинных текстов
@@ -717,33 +786,135 @@ def translate_full_content(text: str) -> str:
     else:
         return translate_text(text)
 
-@timing_decorator
-def fetch_and_translate_news() -> List[Dict[str, Any]]:
-    feeds = [
-        {
-            'url': 'https://hnrss.org/newest',
-            'source': 'Hacker News',
-            'sourceUrl': 'https://news.ycombinator.com/',
-            'category': 'Технологии',
-            'limit': 4
-        },
-        {
-            'url': 'https://news.ycombinator.com/rss',
-            'source': 'Hacker News RSS',
-            'sourceUrl': 'https://news.ycombinator.com/',
-            'category': 'Технологии',
-            'limit': 3
-        },
-        {
-            'url': 'https://www.netlify.com/blog/rss/',
-            'source': 'Netlify Blog',
-            'sourceUrl': 'https://www.netlify.com/blog/',
-            'category': 'Веб-разработка',
-            'limit': 3
-        }
-    ]
+
+NEWS_FEEDS = [
+    {
+        'url': 'https://hnrss.org/newest',
+        'source': 'Hacker News',
+        'sourceUrl': 'https://news.ycombinator.com/',
+        'category': 'Технологии',
+        'limit': 4
+    },
+    {
+        'url': 'https://news.ycombinator.com/rss',
+        'source': 'Hacker News RSS',
+        'sourceUrl': 'https://news.ycombinator.com/',
+        'category': 'Технологии',
+        'limit': 3
+    },
+    {
+        'url': 'https://www.netlify.com/blog/rss/',
+        'source': 'Netlify Blog',
+        'sourceUrl': 'https://www.netlify.com/blog/',
+        'category': 'Веб-разработка',
+        'limit': 3
+    }
+]
+
+
+def parse_feeds(results: List[FeedResult]) -> List[tuple]:
+    """Парсит скачанные ленты; ленты с ошибкой загрузки и неизменившиеся ленты пропускаются"""
+    parsed = []
+    for result in results:
+        if not result.ok:
+            print(f"Feed {result.feed['url']} skipped: {result.error}")
+            continue
+        if not result.changed:
+            print(f"Feed {result.feed['url']} not modified (HTTP {result.status}), skipping")
+            continue
+        feed = feedparser.parse(result.content)
+        if feed.bozo and not feed.entries:
+            print(f"Feed {result.feed['url']} could not be parsed: {feed.get('bozo_exception')}")
+            continue
+        parsed.append((result.feed, feed))
+    return parsed
+
+
+def translate_short_texts(texts: List[str]) -> Dict[str, str]:
+    """
+    Переводит короткие тексты (заголовки и анонсы всех статей запуска) пачками:
+    несколько текстов в одном запросе к Ollama с format=json. Тексты, для которых пачка
+    не вернула корректный перевод, переводятся по одному через translate_text.
+    
+    Returns:
+        Словарь оригинал -> перевод
+    """
+    unique = [text for text in dict.fromkeys(texts) if text and len(text.strip()) >= 3]
+    translated = lookup_translations(unique, OLLAMA_MODEL, TRANSLATION_PROMPT_VERSION)
+    pending = [text for text in unique if text not in translated]
+    batches = make_batches(pending)
+    results = parallel_map(
+        lambda batch: translate_batch(batch, BATCH_TRANSLATION_INSTRUCTIONS, OLLAMA_MODEL),
+        batches,
+    )
     
+    fallback = []
+    batched = []
+    for batch, values in zip(batches, results):
+        for text, value in zip(batch, values or [None] * len(batch)):
+            value = post_process_translation(value) if value else ''
+            if is_valid_translation(text, value):
+                batched.append((text, value))
+            else:
+                fallback.append(text)
+    store_translations(batched, OLLAMA_MODEL, TRANSLATION_PROMPT_VERSION)
+    translated.update(batched)
+    translated.update(zip(fallback, parallel_map(translate_text, fallback)))
+    
+    log_event('news-admin.translation_batches', {
+        'texts': len(unique),
+        'cached': len(unique) - len(pending),
+        'batches': len(batches),
+        'batched': len(batched),
+        'fallback': len(fallback),
+        # запросов было бы по одному на текст; пачки заменили их len(batches) запросами
+        'round_trips_saved': len(batched) - len(batches),
+    })
+    return translated
+
+
+def translate_news_item(job: tuple, short_translations: Dict[str, str]) -> None:
+    """Записывает в news_item переводы заголовка и анонса и переводит контент"""
+    news_item, excerpt_text, content_to_translate = job
+    news_item['translated_title'] = short_translations.get(news_item['original_title'], news_item['original_title'])
+    excerpt_ru = short_translations.get(excerpt_text, excerpt_text)
+    if len(excerpt_text) >= 120:
+        excerpt_ru = excerpt_ru + '...'
+    news_item['translated_excerpt'] = excerpt_ru
+    
+    if content_to_translate:
+        translated_content = translate_full_content(content_to_translate)
+        translated_content = clean_html(translated_content)
+        translated_content = remove_promotional_content(translated_content)
+    else:
+        translated_content = excerpt_ru
+    news_item['translated_content'] = translated_content
+    
+    print(f"Final original content: {len(news_item['original_content'])} chars")
+    print(f'Final translated content: {len(translated_content)} chars')
+    log_event('news-admin.content_translated', {
+        'original_length': len(news_item['original_content']),
+        'translated_length': len(translated_content),
+        'link': news_item['link']
+    })
+
+
+@timing_decorator
+def fetch_and_translate_news(
+    feeds: Optional[List[Dict[str, Any]]] = None,
+    results: Optional[List[FeedResult]] = None,
+) -> List[Dict[str, Any]]:
+    """results - уже скачанные ленты (например, условными запросами); иначе ленты скачиваются здесь"""
+    feeds = NEWS_FEEDS if feeds is None else feeds
+    if results is None:
+        results = fetch_feeds(feeds)
+    
+    reset_translation_cache_stats()
+    reset_generate_stats()
     all_news = []
+    translation_jobs = []
+    skipped_known = 0
+    seen_links = set()
     web_fetch_count = 0
     MAX_WEB_FETCHES = 5  # Ограничение для безопасности
     
@@ -751,11 +922,25 @@ def fetch_and_translate_news() -> List[Dict[str, Any]]:
     print(f"Starting to fetch news from {len(feeds)} feeds...")
     log_event('news-admin.fetch_started', {'feeds_count': len(feeds)})
     
-    for feed_info in feeds:
-        feed = feedparser.parse(feed_info['url'])
+    # Все ленты скачиваются параллельно, парсинг идёт после загрузки
+    parsed = parse_feeds(results)
+    # Уже сохранённые с переводом статьи отсекаются до перевода: фильтр Блума + один запрос к БД
+    known = known_links([
+        entry.get('link', '')
+        for feed_info, feed in parsed
+        for entry in feed.entries[:feed_info.get('limit', 4)]
+    ])
+    for feed_info, feed in parsed:
         limit = feed_info.get('limit', 4)
         
         for entry in feed.entries[:limit]:
+            canonical_link = canonicalize_url(entry.get('link', ''))
+            if canonical_link in known or canonical_link in seen_links:
+                skipped_known += 1
+                continue
+            if canonical_link:
+                seen_links.add(canonical_link)
+            
             category = feed_info['category']
             # Попробуем определить подкатегорию из тегов
             if hasattr(entry, 'tags') and entry.tags:
@@ -784,12 +969,7 @@ def fetch_and_translate_news() -> List[Dict[str, Any]]:
                     published_date = datetime.now()
             
             clean_summary = clean_html(entry.summary if hasattr(entry, 'summary') else '')
-            
-            title_ru = translate_text(entry.title)
             excerpt_text = clean_summary[:120]
-            excerpt_ru = translate_text(excerpt_text)
-            if len(excerpt_text) >= 120:
-                excerpt_ru = excerpt_ru + '...'
             
             # Извлекаем полный контент из всех доступных источников RSS
             original_content = extract_full_content(entry)
@@ -822,23 +1002,11 @@ def fetch_and_translate_news() -> List[Dict[str, Any]]:
             content_to_translate = original_content[:5000] if len(original_content) > 5000 else original_content
             
             # Переводим только если есть контент
-            if len(content_to_translate) > 50:
-                translated_content = translate_full_content(content_to_translate)
-                translated_content = clean_html(translated_content)
-                translated_content = remove_promotional_content(translated_content)
-            else:
-                # Если контента мало, используем excerpt
-                translated_content = excerpt_ru
+            if len(content_to_translate) <= 50:
+                # Если контента мало, вместо перевода контента используем excerpt
+                content_to_translate = ''
                 original_content = clean_summary
             
-            print(f'Final original content: {len(original_content)} chars')
-            print(f'Final translated content: {len(translated_content)} chars')
-            log_event('news-admin.content_translated', {
-                'original_length': len(original_content),
-                'translated_length': len(translated_content),
-                'link': entry.get('link', 'unknown')
-            })
-            
             # Извлекаем изображение (используя HTML страницы если доступен)
             image_url = extract_featured_image(entry, article_html)
             
@@ -847,11 +1015,11 @@ def fetch_and_translate_news() -> List[Dict[str, Any]]:
             
             news_item = {
                 'original_title': entry.title,
-                'translated_title': title_ru,
+                'translated_title': '',
                 'original_excerpt': clean_summary,
-                'translated_excerpt': excerpt_ru,
+                'translated_excerpt': '',
                 'original_content': original_content,
-                'translated_content': translated_content,
+                'translated_content': '',
                 'source': feed_info['source'],
                 'source_url': feed_info['sourceUrl'],
                 'link': entry.link,
@@ -862,7 +1030,21 @@ def fetch_and_translate_news() -> List[Dict[str, Any]]:
                 'formatted_date': formatted_date
             }
             all_news.append(news_item)
-    
+            translation_jobs.append((news_item, excerpt_text, content_to_translate))
+    
+    # Заголовки и анонсы всех статей переводятся пачками (несколько текстов в одном запросе)
+    short_translations = translate_short_texts([
+        text for news_item, excerpt_text, _content in translation_jobs
+        for text in (news_item['original_title'], excerpt_text)
+    ])
+    # Контент статей переводится параллельно (не больше OLLAMA_NUM_PARALLEL запросов одновременно на каждый сервер),
+    # результаты раскладываются по своим статьям, порядок all_news не меняется
+    parallel_map(lambda job: translate_news_item(job, short_translations), translation_jobs)
+    
+    print(f"Skipped {skipped_known} already stored or duplicate entries before translation")
+    log_event('news-admin.entries_selected', {'translated': len(all_news), 'skipped_known': skipped_known})
+    log_event('news-admin.translation_cache', get_translation_cache_stats())
+    log_event('news-admin.ollama_stats', {**get_generate_stats(), 'endpoints': get_pool_stats()})
     return all_news
 
 MAX_NEWS_PER_RUN = 80
@@ -877,16 +1059,20 @@ def save_news_to_db(news_items: List[Dict[str, Any]], auth_payload: Dict[str, An
     new_items: List[Dict[str, Any]] = []
     update_items: List[tuple] = []
     
+    for item in news_items:
+        item['canonical_link'] = canonicalize_url(item['link'])
     links = [item['link'] for item in news_items]
+    canonical_links = [item['canonical_link'] for item in news_items]
+    # canonical_link может быть ещё не заполнен у старых записей - они находятся по link
     cur.execute(
-        "SELECT link, id, translated_content FROM news WHERE link = ANY(%s)",
-        (links,)
+        "SELECT link, canonical_link, id, translated_content FROM news WHERE canonical_link = ANY(%s) OR link = ANY(%s)",
+        (canonical_links, links)
     )
-    existing_map = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+    existing_map = {(row[1] or canonicalize_url(row[0])): (row[2], row[3]) for row in cur.fetchall()}
     
     for item in news_items:
-        if item['link'] in existing_map:
-            news_id, trans_content = existing_map[item['link']]
+        if item['canonical_link'] in existing_map:
+            news_id, trans_content = existing_map[item['canonical_link']]
             if not trans_content or trans_content.strip() == '':
                 update_items.append((item, news_id))
         else:
@@ -898,15 +1084,15 @@ def save_news_to_db(news_items: List[Dict[str, Any]], auth_payload: Dict[str, An
         if new_items:
             insert_query = """INSERT INTO news
                 (original_title, translated_title, original_excerpt, translated_excerpt,
-                 original_content, translated_content, source, source_url, link, image_url, video_embed_url, category,
+                 original_content, translated_content, source, source_url, link, canonical_link, image_url, video_embed_url, category,
                  published_date, translated_at, created_at, updated_at, is_active)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, TRUE)"""
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, TRUE)"""
             insert_data = [
                 (
                     item['original_title'], item['translated_title'],
                     item['original_excerpt'], item['translated_excerpt'],
                     item['original_content'], item['translated_content'],
-                    item['source'], item['source_url'], item['link'],
+                    item['source'], item['source_url'], item['link'], item['canonical_link'] or None,
                     normalize_image_url(item.get('image_url', '')),
                     item.get('video_embed_url', ''),
                     item['category'], item['published_date']
@@ -945,6 +1131,8 @@ def save_news_to_db(news_items: List[Dict[str, Any]], auth_payload: Dict[str, An
                 log_event('news-admin.update', {'link': item['link'], 'user': auth_payload.get('sub')})
         
         conn.commit()
+        if inserted or updated:
+            invalidate('news')
     except Exception as exc:
         print(f"Batch save error: {exc}")
         conn.rollback()
@@ -1002,6 +1190,8 @@ def cleanup_old_news(days_to_keep: int = 90):
     
     deactivated = cur.rowcount
     conn.commit()
+    if deactivated:
+        invalidate('news')
     cur.close()
     conn.close()
     
@@ -1015,18 +1205,10 @@ def test_news_pipeline():
     print("=" * 60)
     
     print("\n1. Checking Ollama...")
-    try:
-        conn = http.client.HTTPConnection('localhost', 11434, timeout=5)
-        conn.request('GET', '/api/tags')
-        response = conn.getresponse()
-        conn.close()
-        if response.status == 200:
-            print("✓ Ollama is available")
-        else:
-            print("✗ Ollama is unavailable - run: ollama serve")
-            return
-    except Exception as e:
-        print(f"✗ Ollama check failed: {e}")
+    if check_ollama_available():
+        print("✓ Ollama is available")
+    else:
+        print("✗ Ollama is unavailable - run: ollama serve")
         return
     
     print("\n2. Translation test...")
@@ -1075,17 +1257,10 @@ def test_news_pipeline():
     print("=" * 60)
 
 def check_ollama_available() -> bool:
-    """Проверяет доступность Ollama API"""
-    try:
-        conn = http.client.HTTPConnection('localhost', 11434, timeout=5)
-        conn.request('GET', '/api/tags')
-        response = conn.getresponse()
-        conn.close()
-        return response.status == 200
-    except Exception as e:
-        print(f"Ollama not available: {e}")
-        return False
+    """Проверяет доступность Ollama API и наличие модели (ответ кэшируется на OLLAMA_AVAILABILITY_TTL)"""
+    return is_available(OLLAMA_MODEL)
 
+@statement_budget(30000)
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Административный эндпоинт для обновления новостей (перевод и сохранение в БД)
@@ -1140,6 +1315,44 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'body': json.dumps({'error': 'Too many requests'})
             }
         
+        # Условные запросы по сохранённым ETag / Last-Modified: если ни одна лента
+        # не изменилась, запуск заканчивается без парсинга, перевода и проверки Ollama
+        force = str((event.get('queryStringParameters') or {}).get('force', '')).lower() in ('1', 'true', 'yes')
+        states = {} if force else load_feed_states([feed['url'] for feed in NEWS_FEEDS])
+        feed_results = fetch_feeds(NEWS_FEEDS, states=states)
+        if not any(result.changed for result in feed_results):
+            feed_errors = {result.feed['url']: result.error for result in feed_results if result.error}
+            # ни одна лента не скачалась — это сбой, а не «ничего нового»
+            if feed_errors and len(feed_errors) == len(feed_results):
+                print(f'All feeds failed: {feed_errors}')
+                return {
+                    'statusCode': 502,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'success': False,
+                        'error': 'All feeds failed',
+                        'feed_errors': feed_errors
+                    })
+                }
+            save_feed_states(feed_results)
+            print('No feed changed since the last run')
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'success': True,
+                    'message': 'Feeds not modified' if not feed_errors else 'Feeds not modified, some failed',
+                    'feed_errors': feed_errors,
+                    'result': {'inserted': 0, 'updated': 0, 'errors': len(feed_errors), 'total_processed': 0}
+                })
+            }
+        
         # Проверка доступности Ollama
         if not check_ollama_available():
             return {
@@ -1154,8 +1367,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 })
             }
         
-        news_items = fetch_and_translate_news()
+        # Модель загружается в фоне, пока идут разбор лент, дедупликация и загрузка статей
+        warmup = warm_up_in_background(OLLAMA_MODEL)
+        news_items = fetch_and_translate_news(results=feed_results)
         print(f'Fetched {len(news_items)} news items')
+        for warmup_result in warmup.result():
+            print(f'Ollama warmup {warmup_result.endpoint}: load {warmup_result.load_ms} ms, '
+                  f'warm latency {warmup_result.warm_latency_ms} ms')
         
         if len(news_items) > MAX_NEWS_PER_RUN:
             news_items = news_items[:MAX_NEWS_PER_RUN]
@@ -1163,6 +1381,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         result = save_news_to_db(news_items, auth_payload)
         print(f'Save result: {result}')
+        # Валидаторы сохраняются только после успешной записи, иначе сбойный запуск посчитался бы неизменившимся
+        if not result['errors']:
+            save_feed_states(feed_results)
         
         return {
             'statusCode': 200,
@@ -1,25 +1,49 @@
 import json
 import os
-import psycopg2
+import psycopg2.errors
 from psycopg2.extras import RealDictCursor
-from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from backend._shared.security import get_redis_client
+from backend._shared.cache import get_or_set
+from backend._shared.db import fetch_all, register_statement, statement_budget
+from backend._shared.serialization import dumps
 
-cache: Dict[str, Any] = {}
-cache_timestamp = None
+# браузерный кэш короткий, серверный живёт долго и сбрасывается через invalidate('news')
 CACHE_MINUTES = 5
+CACHE_TTL_SECONDS = int(os.environ.get('NEWS_FEED_CACHE_TTL', str(24 * 3600)))
+NEWS_CACHE_TAG = 'news'
 PAGE_SIZE_DEFAULT = 12
 REDIS_PREFIX = 'news-feed'
 CDN_HOST = os.environ.get('CDN_HOST', '').rstrip('/')
 
 
-def get_db_connection():
-    dsn = os.environ.get('DATABASE_URL')
-    if not dsn:
-        raise Exception('DATABASE_URL not set')
-    return psycopg2.connect(dsn)
+NEWS_SEARCH_CLAUSE = '(COALESCE(translated_title, original_title) ILIKE %s OR COALESCE(translated_excerpt, original_excerpt) ILIKE %s)'
+NEWS_LIST_SQL = """SELECT id, COALESCE(translated_title, original_title) AS title, COALESCE(translated_excerpt, original_excerpt) AS excerpt,
+                      COALESCE(translated_content, original_content) AS content, source, source_url AS sourceUrl,
+                      link, image_url AS image, video_embed_url, category, published_date
+               FROM news
+               WHERE {where}
+               ORDER BY published_date DESC, created_at DESC
+               LIMIT %s OFFSET %s"""
+
+
+def _news_list_statement(category: bool, search: bool) -> str:
+    name = 'news_feed_list' + ('_category' if category else '') + ('_search' if search else '')
+    clauses = ['is_active = TRUE']
+    if category:
+        clauses.append('category = %s')
+    if search:
+        clauses.append(NEWS_SEARCH_CLAUSE)
+    register_statement(name, NEWS_LIST_SQL.format(where=' AND '.join(clauses)))
+    return name
+
+
+# one prepared statement per filter combination
+NEWS_LIST_STATEMENTS = {
+    (category, search): _news_list_statement(category, search)
+    for category in (False, True)
+    for search in (False, True)
+}
 
 
 def translate_image(image: str) -> str:
@@ -31,33 +55,16 @@ def translate_image(image: str) -> str:
 
 
 def fetch_news_from_db(limit: int, offset: int, category: Optional[str], search: Optional[str]) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    clauses = ['is_active = TRUE']
     params: List[Any] = []
-
     if category:
-        clauses.append('category = %s')
         params.append(category)
     if search:
-        clauses.append('(COALESCE(translated_title, original_title) ILIKE %s OR COALESCE(translated_excerpt, original_excerpt) ILIKE %s)')
         search_param = f"%{search}%"
         params.extend([search_param, search_param])
-
-    where = ' AND '.join(clauses)
-    query = f"""SELECT id, COALESCE(translated_title, original_title) AS title, COALESCE(translated_excerpt, original_excerpt) AS excerpt,
-                      COALESCE(translated_content, original_content) AS content, source, source_url AS sourceUrl,
-                      link, image_url AS image, video_embed_url, category, published_date
-               FROM news
-               WHERE {where}
-               ORDER BY published_date DESC, created_at DESC
-               LIMIT %s OFFSET %s"""
     params.extend([limit, offset])
-    cur.execute(query, tuple(params))
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    statement = NEWS_LIST_STATEMENTS[(bool(category), bool(search))]
+    # результат кэшируется на сутки, поэтому читаем с primary: отстающая реплика вернула бы строки до invalidate('news')
+    rows = fetch_all(statement, params, cursor_factory=RealDictCursor)
 
     news_list = []
     months = {
@@ -93,9 +100,8 @@ def fetch_news_from_db(limit: int, offset: int, category: Optional[str], search:
     return news_list
 
 
+@statement_budget(200)
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    global cache, cache_timestamp
-
     method = event.get('httpMethod', 'GET')
     if method == 'OPTIONS':
         return {
@@ -123,42 +129,15 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     limit = int(query_params.get('limit', PAGE_SIZE_DEFAULT))
     offset = (page - 1) * limit
 
-    redis_key = f"{REDIS_PREFIX}:{page}:{category or 'all'}:{search or 'all'}"
-    redis_client = get_redis_client()
-    cached_payload = redis_client.get(redis_key)
-    if cached_payload:
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Cache-Control': f'public, max-age={CACHE_MINUTES * 60}'
-            },
-            'isBase64Encoded': False,
-            'body': cached_payload
-        }
-
-    now = datetime.now()
-    if cache_timestamp and (now - cache_timestamp) < timedelta(minutes=CACHE_MINUTES):
-        corr_payload = json.dumps(cache)
-        redis_client.setex(redis_key, CACHE_MINUTES * 60, corr_payload)
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Cache-Control': f'public, max-age={CACHE_MINUTES * 60}'
-            },
-            'isBase64Encoded': False,
-            'body': corr_payload
-        }
-
+    cache_key = f"{REDIS_PREFIX}:{page}:{limit}:{category or 'all'}:{search or 'all'}"
     try:
-        news = fetch_news_from_db(limit, offset, category, search)
-        cache = {'news': news, 'page': page}
-        cache_timestamp = datetime.now()
-        payload = json.dumps(cache)
-        redis_client.setex(redis_key, CACHE_MINUTES * 60, payload)
+        # записи помечены тегом news: news-admin и news-admin-crud сбрасывают их после изменений
+        payload = get_or_set(
+            cache_key,
+            lambda: dumps({'news': fetch_news_from_db(limit, offset, category, search), 'page': page}),
+            tags=[NEWS_CACHE_TAG],
+            ttl=CACHE_TTL_SECONDS,
+        )
 
         return {
             'statusCode': 200,
@@ -170,6 +149,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False,
             'body': payload
         }
+    except psycopg2.errors.QueryCanceled:
+        # statement_budget отвечает 503, пустой список тут выглядел бы как «новостей нет»
+        raise
     except Exception as e:
         print(f'Error fetching news from DB: {e}')
         return {
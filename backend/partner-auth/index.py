@@ -1,8 +1,9 @@
 import json
 import os
-import psycopg2
 from typing import Dict, Any
 
+from backend._shared.db import connect
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Авторизация партнёра по логину и паролю
@@ -63,7 +64,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
-    conn = psycopg2.connect(database_url)
+    conn = connect(database_url)
     cursor = conn.cursor()
     
     try:
@@ -1,8 +1,43 @@
 import json
 import os
-import psycopg2
 from typing import Dict, Any
 
+from backend._shared.cache import get_or_set
+from backend._shared.db import fetch_all, register_statement
+from backend._shared.serialization import dumps
+
+PARTNERS_CACHE_KEY = 'partners:active'
+PARTNERS_CACHE_TAG = 'partners'
+PARTNERS_CACHE_TTL = int(os.environ.get('PARTNERS_CACHE_TTL', str(24 * 3600)))
+
+register_statement('partners_active', '''
+    SELECT id, name, logo_url, website, sort_order, is_active, created_at
+    FROM partners
+    WHERE is_active = true
+    ORDER BY sort_order ASC
+''')
+
+
+def load_partners() -> str:
+    '''Активные партнёры в формате frontend, сериализованные в JSON'''
+    # Получить только активные партнёры, отсортированные по порядку
+    # читаем с primary: список кэшируется на сутки, отстающая реплика вернула бы его до сброса тега
+    rows = fetch_all('partners_active')
+    
+    # Маппинг на frontend формат
+    partners = []
+    for row in rows:
+        partners.append({
+            'id': row[0],
+            'name': row[1],
+            'logo_url': row[2],
+            'website_url': row[3],  # website → website_url
+            'display_order': row[4],  # sort_order → display_order
+            'is_active': row[5]
+        })
+    return dumps(partners)
+
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Public API для получения списка активных партнёров
@@ -50,34 +85,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
-    conn = None
-    cur = None
-    
     try:
-        conn = psycopg2.connect(database_url)
-        cur = conn.cursor()
-        
-        # Получить только активные партнёры, отсортированные по порядку
-        cur.execute('''
-            SELECT id, name, logo_url, website, sort_order, is_active, created_at
-            FROM partners
-            WHERE is_active = true
-            ORDER BY sort_order ASC
-        ''')
-        
-        rows = cur.fetchall()
-        
-        # Маппинг на frontend формат
-        partners = []
-        for row in rows:
-            partners.append({
-                'id': row[0],
-                'name': row[1],
-                'logo_url': row[2],
-                'website_url': row[3],  # website → website_url
-                'display_order': row[4],  # sort_order → display_order
-                'is_active': row[5]
-            })
+        # Список кэшируется надолго: admin-partner-logos сбрасывает тег partners после изменений
+        payload = get_or_set(PARTNERS_CACHE_KEY, load_partners, tags=[PARTNERS_CACHE_TAG], ttl=PARTNERS_CACHE_TTL)
         
         return {
             'statusCode': 200,
@@ -86,7 +96,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'Access-Control-Allow-Origin': '*',
                 'Cache-Control': 'public, max-age=300'  # Кэш на 5 минут
             },
-            'body': json.dumps(partners),
+            'body': payload,
             'isBase64Encoded': False
         }
         
@@ -100,8 +110,4 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': str(e)}),
             'isBase64Encoded': False
         }
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
+
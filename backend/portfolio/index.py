@@ -8,43 +8,50 @@ Returns: HTTP response dict with statusCode, headers, body
 
 import json
 import os
-import psycopg2
 from typing import Dict, Any, List
 
+from backend._shared.cache import get_or_set, invalidate
+from backend._shared.db import connect, execute_prepared, get_connection, register_statement
+from backend._shared.serialization import dumps, json_body
+
+PORTFOLIO_CACHE_KEY = 'portfolio:active'
+PORTFOLIO_CACHE_TAG = 'portfolio'
+PORTFOLIO_CACHE_TTL = int(os.environ.get('PORTFOLIO_CACHE_TTL', str(24 * 3600)))
+
+register_statement('portfolio_active', """
+    SELECT
+        id,
+        title,
+        description,
+        image_url,
+        project_url AS website_url,
+        technologies,
+        sort_order AS display_order,
+        is_active,
+        created_at
+    FROM public.portfolio
+    WHERE is_active = true
+    ORDER BY display_order ASC, created_at DESC
+""")
+
 def get_db_connection():
     """Create database connection"""
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise Exception('DATABASE_URL not found in environment')
-    return psycopg2.connect(dsn)
+    return connect(dsn)
 
 def get_all_projects() -> List[Dict[str, Any]]:
     """Get all active portfolio projects sorted by display_order"""
-    conn = get_db_connection()
-    try:
+    # список кэшируется на сутки, поэтому читаем с primary: отстающая реплика вернула бы его до сброса тега
+    with get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT
-                    id,
-                    title,
-                    description,
-                    image_url,
-                    project_url AS website_url,
-                    technologies,
-                    sort_order AS display_order,
-                    is_active,
-                    created_at
-                FROM public.portfolio
-                WHERE is_active = true
-                ORDER BY display_order ASC, created_at DESC
-            """)
+            execute_prepared(cur, 'portfolio_active')
             
             columns = [desc[0] for desc in cur.description]
             projects = []
             for row in cur.fetchall():
                 project = dict(zip(columns, row))
-                if project.get('created_at'):
-                    project['created_at'] = project['created_at'].isoformat()
                 # Parse technologies JSON to extract additional image fields
                 tech_json = {}
                 try:
@@ -58,8 +65,6 @@ def get_all_projects() -> List[Dict[str, Any]]:
                 projects.append(project)
             
             return projects
-    finally:
-        conn.close()
 
 def create_project(data: Dict[str, Any]) -> Dict[str, Any]:
     """Create new portfolio project"""
@@ -92,6 +97,7 @@ def create_project(data: Dict[str, Any]) -> Dict[str, Any]:
             ))
             
             conn.commit()
+            invalidate(PORTFOLIO_CACHE_TAG)
             
             columns = [desc[0] for desc in cur.description]
             row = cur.fetchone()
@@ -109,8 +115,6 @@ def create_project(data: Dict[str, Any]) -> Dict[str, Any]:
             project['carousel_image_url'] = tech_json.get('carousel_image_url')
             project['preview_image_url'] = tech_json.get('preview_image_url')
             project['gallery_images'] = tech_json.get('gallery_images', [])
-            if project.get('created_at'):
-                project['created_at'] = project['created_at'].isoformat()
             
             return project
     finally:
@@ -149,6 +153,7 @@ def update_project(project_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
             ))
             
             conn.commit()
+            invalidate(PORTFOLIO_CACHE_TAG)
             
             columns = [desc[0] for desc in cur.description]
             row = cur.fetchone()
@@ -169,8 +174,6 @@ def update_project(project_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
             project['carousel_image_url'] = tech_json.get('carousel_image_url')
             project['preview_image_url'] = tech_json.get('preview_image_url')
             project['gallery_images'] = tech_json.get('gallery_images', [])
-            if project.get('created_at'):
-                project['created_at'] = project['created_at'].isoformat()
             
             return project
     finally:
@@ -187,6 +190,7 @@ def delete_project(project_id: int) -> bool:
             """, (project_id,))
             
             conn.commit()
+            invalidate(PORTFOLIO_CACHE_TAG)
             return cur.rowcount > 0
     finally:
         conn.close()
@@ -214,11 +218,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     try:
         if method == 'GET':
-            projects = get_all_projects()
+            # список кэшируется под тегом portfolio, POST/PUT/DELETE его сбрасывают
+            body = get_or_set(PORTFOLIO_CACHE_KEY, lambda: dumps(get_all_projects()),
+                              tags=[PORTFOLIO_CACHE_TAG], ttl=PORTFOLIO_CACHE_TTL)
             return {
                 'statusCode': 200,
                 'headers': headers,
-                'body': json.dumps(projects),
+                'body': body,
                 'isBase64Encoded': False
             }
         
@@ -228,7 +234,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 201,
                 'headers': headers,
-                'body': json.dumps(project),
+                'body': json_body(project),
                 'isBase64Encoded': False
             }
         
@@ -257,7 +263,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 200,
                 'headers': headers,
-                'body': json.dumps(project),
+                'body': json_body(project),
                 'isBase64Encoded': False
             }
         
@@ -12,6 +12,8 @@ from dataclasses import dataclass
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from backend._shared.db import connect
+
 @dataclass
 class SecureSetting:
     key: str
@@ -41,7 +43,7 @@ def get_cipher():
 def get_db_connection():
     '''Создает подключение к БД'''
     dsn = os.environ.get('DATABASE_URL')
-    return psycopg2.connect(dsn)
+    return connect(dsn)
 
 def encrypt_value(value: str) -> str:
     '''Шифрует значение (временно отключено для отладки)'''
@@ -3,9 +3,10 @@ import os
 from typing import Dict, Any, List
 from pydantic import BaseModel, Field
 import openai
-import psycopg2
 import base64
 
+from backend._shared.db import connect
+
 _secret_cache = {}
 
 def get_secret(key: str) -> str:
@@ -15,7 +16,7 @@ def get_secret(key: str) -> str:
     
     try:
         dsn = os.environ.get('DATABASE_URL')
-        conn = psycopg2.connect(dsn)
+        conn = connect(dsn)
         cur = conn.cursor()
         key_escaped = key.replace("'", "''")
         cur.execute(f"SELECT encrypted_value FROM secure_settings WHERE key = '{key_escaped}'")
@@ -4,6 +4,8 @@ from typing import Any, Dict, List, Optional
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from backend._shared.cache import invalidate
+from backend._shared.db import connect
 from backend._shared.logging import log_event
 from backend._shared.security import (
     ensure_admin_authorized,
@@ -93,7 +95,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         body_data = json.loads(body_str) if body_str and body_str.strip() else {}
         sanitized = {k: sanitize_text(str(v)) if isinstance(v, str) else v for k, v in body_data.items()}
         
-        conn = psycopg2.connect(dsn)
+        conn = connect(dsn)
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
         if method == 'GET':
@@ -175,6 +177,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             new_id = cur.fetchone()['id']
             conn.commit()
+            invalidate('services')
             cur.close()
             conn.close()
             
@@ -228,6 +231,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             log_event('services-admin.update', {'service_id': service_id, 'user': auth_payload.get('sub')})
 
             conn.commit()
+            invalidate('services')
             cur.close()
             conn.close()
             return {
@@ -256,6 +260,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             cur.execute("DELETE FROM services WHERE service_id = %s", (service_id,))
             
             conn.commit()
+            invalidate('services')
             cur.close()
             conn.close()
             
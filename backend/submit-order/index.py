@@ -1,47 +1,26 @@
 import json
 import os
-import urllib.request
-import urllib.parse
 from typing import Dict, Any, List
-import psycopg2
-import base64
 
-from _shared.security import (
-    sanitize_text,
-    is_valid_phone,
-    is_valid_email,
+from backend._shared.db_secrets import get_secret
+from backend._shared.security import (
     rate_limited,
     validate_origin,
     check_honeypot,
 )
+from backend._shared.validation import FieldSpec, is_valid_email, is_valid_phone, validate_form
+from backend._shared.http import http_post
+from backend._shared.notifications import enqueue_telegram
 
-_secret_cache = {}
-
-def get_secret(key: str) -> str:
-    '''Reads secret from database with caching'''
-    if key in _secret_cache:
-        return _secret_cache[key]
-    
-    try:
-        dsn = os.environ.get('DATABASE_URL')
-        conn = psycopg2.connect(dsn)
-        cur = conn.cursor()
-        key_escaped = key.replace("'", "''")
-        cur.execute(f"SELECT encrypted_value FROM secure_settings WHERE key = '{key_escaped}'")
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
-        
-        if row:
-            value = base64.b64decode(row[0].encode()).decode()
-            _secret_cache[key] = value
-            return value
-    except Exception as e:
-        print(f'DB secret read error for {key}: {str(e)}')
-    
-    env_value = os.environ.get(key, '')
-    _secret_cache[key] = env_value
-    return env_value
+ORDER_FORM_SPEC = {
+    'total': FieldSpec(default=0, sanitize=False),
+    'services': FieldSpec(default=[], sanitize=False),
+    'isPartner': FieldSpec(default=False, sanitize=False),
+    'discount': FieldSpec(default=0, sanitize=False),
+    'name': FieldSpec(default='Не указано'),
+    'phone': FieldSpec(default='Не указано', required=True, validator=is_valid_phone, error='Неверный формат телефона'),
+    'email': FieldSpec(default='Не указано', validator=is_valid_email, error='Неверный формат email'),
+}
 
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -112,27 +91,21 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Rate limit exceeded'})
         }
 
-    total: float = body_data.get('total', 0)
-    services: List[str] = body_data.get('services', [])
-    is_partner: bool = body_data.get('isPartner', False)
-    discount: int = body_data.get('discount', 0)
-    contact_name: str = sanitize_text(body_data.get('name', 'Не указано'))
-    contact_phone: str = sanitize_text(body_data.get('phone', 'Не указано'))
-    contact_email: str = sanitize_text(body_data.get('email', 'Не указано'))
-
-    if not is_valid_phone(contact_phone):
+    form, errors = validate_form(body_data, ORDER_FORM_SPEC)
+    if errors:
         return {
             'statusCode': 400,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Неверный формат телефона'})
+            'body': json.dumps({'error': errors[0]})
         }
 
-    if contact_email and not is_valid_email(contact_email):
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Неверный формат email'})
-        }
+    total: float = form['total']
+    services: List[str] = form['services']
+    is_partner: bool = form['isPartner']
+    discount: int = form['discount']
+    contact_name: str = form['name']
+    contact_phone: str = form['phone']
+    contact_email: str = form['email']
     
     bitrix_webhook = get_secret('BITRIX24_WEBHOOK_URL') or get_secret('bitrix24_webhook_url') or 'https://itpood.ru/rest/1/ben0wm7xdr8zsore/'
     
@@ -152,24 +125,14 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     bitrix_success = False
     try:
         bitrix_url = f'{bitrix_webhook}crm.lead.add.json'
-        bitrix_request = urllib.request.Request(
-            bitrix_url,
-            data=json.dumps({'fields': bitrix_data}).encode('utf-8'),
-            headers={'Content-Type': 'application/json'}
-        )
-        with urllib.request.urlopen(bitrix_request, timeout=10) as response:
-            bitrix_result = json.loads(response.read().decode('utf-8'))
-            bitrix_success = bitrix_result.get('result', False)
+        response = http_post(bitrix_url, json={'fields': bitrix_data}, timeout=10)
+        bitrix_success = response.json().get('result', False)
     except Exception as e:
         print(f'Bitrix24 error: {str(e)}')
     
     telegram_success = False
-    telegram_bot_token = get_secret('TELEGRAM_BOT_TOKEN') or ''
-    telegram_chat_id = get_secret('TELEGRAM_CHAT_ID') or ''
-    
-    if telegram_bot_token and telegram_chat_id:
-        try:
-            telegram_message = f'''
+    try:
+        telegram_message = f'''
 🆕 Новая заявка с сайта
 
 💰 Сумма: {total} ₽{partner_info}
@@ -182,25 +145,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 📋 Услуги:
 {services_text}
 '''
-            
-            telegram_url = f'https://api.telegram.org/bot{telegram_bot_token}/sendMessage'
-            telegram_data = {
-                'chat_id': telegram_chat_id,
-                'text': telegram_message,
-                'parse_mode': 'HTML'
-            }
-            
-            telegram_request = urllib.request.Request(
-                telegram_url,
-                data=json.dumps(telegram_data).encode('utf-8'),
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            with urllib.request.urlopen(telegram_request, timeout=10) as response:
-                telegram_result = json.loads(response.read().decode('utf-8'))
-                telegram_success = telegram_result.get('ok', False)
-        except Exception as e:
-            print(f'Telegram error: {str(e)}')
+        # заказы не ждут окна сводки
+        enqueue_telegram(telegram_message, chat_id=get_secret('TELEGRAM_CHAT_ID'), parse_mode='HTML', urgent=True)
+        telegram_success = True
+    except Exception as e:
+        print(f'Telegram enqueue error: {str(e)}')
     
     return {
         'statusCode': 200,
@@ -1,15 +1,15 @@
 import json
 import os
 import bcrypt
-import requests
 import secrets
 import string
-import psycopg2
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from backend._shared.db import connect
+from backend._shared.notifications import enqueue_telegram, send_telegram_now
 
 # Конфигурация
-TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
 ALLOWED_CHAT_ID = '500136108'  # Идентификатор чата, указанный в задании
 TEMP_PASSWORD_LENGTH = 12
 TEMP_PASSWORD_EXPIRY_MINUTES = 10
@@ -19,30 +19,12 @@ def generate_temp_password(length: int = TEMP_PASSWORD_LENGTH) -> str:
     alphabet = string.ascii_letters + string.digits + '!@#$%^&*'
     return ''.join(secrets.choice(alphabet) for _ in range(length))
 
-# Отправка сообщения в Telegram
-def send_telegram_message(chat_id: str, text: str) -> bool:
-    if not TELEGRAM_BOT_TOKEN:
-        print('TELEGRAM_BOT_TOKEN not set')
-        return False
-    url = f'https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage'
-    payload = {
-        'chat_id': chat_id,
-        'text': text,
-        'parse_mode': 'HTML'
-    }
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        return response.status_code == 200
-    except Exception as e:
-        print(f'Telegram send error: {e}')
-        return False
-
 # Получение хеша пароля из базы данных
 def get_password_hash_from_db(user_id: int = 2) -> str:
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
         return ''
-    conn = psycopg2.connect(database_url)
+    conn = connect(database_url)
     cursor = conn.cursor()
     cursor.execute(
         'SELECT password_hash FROM users WHERE id = %s', (user_id,)
@@ -52,22 +34,31 @@ def get_password_hash_from_db(user_id: int = 2) -> str:
     conn.close()
     return row[0] if row else ''
 
-# Обновление хеша пароля в базе данных
-def update_password_hash_in_db(new_hash: str, user_id: int = 2) -> bool:
+# Обновление хеша пароля в базе данных. Уведомление ставится в outbox в той же транзакции;
+# с deliver_first оно отправляется сразу, и хеш сохраняется только после успешной отправки
+def update_password_hash_in_db(new_hash: str, user_id: int = 2, notification: Optional[str] = None,
+                               urgent: bool = False, deliver_first: bool = False) -> bool:
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
         return False
-    conn = psycopg2.connect(database_url)
+    conn = connect(database_url)
     cursor = conn.cursor()
     try:
         cursor.execute(
             'UPDATE users SET password_hash = %s WHERE id = %s',
             (new_hash, user_id)
         )
-        conn.commit()
         success = cursor.rowcount > 0
+        if success and notification:
+            if deliver_first:
+                send_telegram_now(notification, ALLOWED_CHAT_ID, parse_mode='HTML')
+            else:
+                enqueue_telegram(notification, chat_id=ALLOWED_CHAT_ID, parse_mode='HTML',
+                                 urgent=urgent, conn=conn)
+        conn.commit()
     except Exception as e:
         print(f'Update password error: {e}')
+        conn.rollback()
         success = False
     finally:
         cursor.close()
@@ -151,21 +142,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Сохраняем временный хеш в базе (можно в отдельной таблице, но для простоты обновим основной)
         # В реальном проекте лучше использовать отдельную таблицу временных паролей
-        # Здесь для демонстрации просто обновляем основной пароль
-        update_success = update_password_hash_in_db(temp_hash_str)
-        
-        if not update_success:
-            return {
-                'statusCode': 500,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Failed to update password'}),
-                'isBase64Encoded': False
-            }
-        
-        # Отправляем пароль в Telegram
+        # Здесь для демонстрации просто обновляем основной пароль.
+        # Пароль отправляется в Telegram сразу, до фиксации хеша: если сообщение не дошло,
+        # транзакция откатывается и старый пароль продолжает работать
         message = (
             f'🔐 <b>Временный пароль для админ-панели</b>\n'
             f'Пароль: <code>{temp_password}</code>\n'
@@ -173,32 +152,32 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             f'Используйте его для входа в админ-панель.\n'
             f'После входа рекомендуется сменить пароль.'
         )
-        sent = send_telegram_message(ALLOWED_CHAT_ID, message)
+        update_success = update_password_hash_in_db(temp_hash_str, notification=message, deliver_first=True)
         
-        if sent:
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'success': True,
-                    'message': 'Temporary password generated and sent to Telegram',
-                    'expires_at': expiry_str
-                }),
-                'isBase64Encoded': False
-            }
-        else:
+        if not update_success:
             return {
                 'statusCode': 500,
                 'headers': {
                     'Content-Type': 'application/json',
                     'Access-Control-Allow-Origin': '*'
                 },
-                'body': json.dumps({'error': 'Failed to send Telegram message'}),
+                'body': json.dumps({'error': 'Failed to set or deliver the temporary password; the old password still works'}),
                 'isBase64Encoded': False
             }
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'success': True,
+                'message': 'Temporary password generated and sent to Telegram',
+                'expires_at': expiry_str
+            }),
+            'isBase64Encoded': False
+        }
     
     elif action == 'confirm':
         # Подтверждение смены пароля (например, после ввода временного пароля)
@@ -220,18 +199,15 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         new_hash = bcrypt.hashpw(password_bytes, salt)
         new_hash_str = new_hash.decode('utf-8')
         
-        # Обновляем пароль в базе
-        update_success = update_password_hash_in_db(new_hash_str)
+        # Обновляем пароль в базе и ставим уведомление в Telegram
+        message = (
+            f'✅ <b>Пароль успешно изменен</b>\n'
+            f'Новый пароль установлен для админ-панели.\n'
+            f'Время изменения: {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")}'
+        )
+        update_success = update_password_hash_in_db(new_hash_str, notification=message, urgent=True)
         
         if update_success:
-            # Отправляем уведомление в Telegram
-            message = (
-                f'✅ <b>Пароль успешно изменен</b>\n'
-                f'Новый пароль установлен для админ-панели.\n'
-                f'Время изменения: {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")}'
-            )
-            send_telegram_message(ALLOWED_CHAT_ID, message)
-            
             return {
                 'statusCode': 200,
                 'headers': {
@@ -0,0 +1,316 @@
+'''
+Synthetic dataset generator and SQL benchmark for the DB-heavy endpoints.
+
+seed   recreates site_visits, daily_stats, bot_logs, news and admin_login_logs in
+       BENCH_DATABASE_URL with realistic volumes (scale 1.0 = 2M visits, 2M bot logs,
+       50k news with long content, 500k admin login logs).
+run    calls the real handler code (get-analytics, bot-stats, news-feed
+       fetch_news_from_db, admin-login-logs fetch_logs) against that database and
+       reports p50/p95 per scenario and per SQL statement.
+
+The tables are dropped and refilled, so only BENCH_DATABASE_URL is used, never
+DATABASE_URL. Statement timeouts are disabled unless --keep-budgets is given.
+
+Run from backend/:
+    BENCH_DATABASE_URL=postgresql://localhost/bench python -m tests.bench_db seed --scale 0.1
+    BENCH_DATABASE_URL=... python -m tests.bench_db run --repeat 30
+    BENCH_DATABASE_URL=... python -m tests.bench_db sweep --scales 0.05,0.2,1 --migrate
+'''
+
+import argparse
+import importlib.util
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(BACKEND_DIR)
+# handlers import backend._shared.*, like under python-gatevey
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+BASE_ROWS = {
+    'site_visits': 2_000_000,
+    'bot_logs': 2_000_000,
+    'news': 50_000,
+    'admin_login_logs': 500_000,
+}
+
+SCHEMA_SQL = '''
+    DROP TABLE IF EXISTS site_visits, daily_stats, bot_logs, news, admin_login_logs, schema_migrations;
+    CREATE TABLE site_visits (
+        id BIGSERIAL PRIMARY KEY,
+        visit_date DATE NOT NULL DEFAULT CURRENT_DATE,
+        page_path TEXT, user_agent TEXT, referrer TEXT, session_id TEXT, ip_address TEXT,
+        device_type TEXT, browser TEXT, is_admin BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE daily_stats (
+        stat_date DATE PRIMARY KEY,
+        total_visits INTEGER DEFAULT 0, unique_visitors INTEGER DEFAULT 0, page_views INTEGER DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE bot_logs (
+        id BIGSERIAL PRIMARY KEY,
+        user_agent TEXT, is_blocked BOOLEAN, ip_address TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE news (
+        id SERIAL PRIMARY KEY,
+        original_title TEXT, translated_title TEXT, original_excerpt TEXT, translated_excerpt TEXT,
+        original_content TEXT, translated_content TEXT, source TEXT, source_url TEXT, link TEXT,
+        image_url TEXT, video_embed_url TEXT, category TEXT, published_date TIMESTAMP,
+        is_active BOOLEAN DEFAULT TRUE, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, translated_at TIMESTAMP
+    );
+    CREATE TABLE admin_login_logs (
+        id BIGSERIAL PRIMARY KEY,
+        ip_address TEXT, user_agent TEXT, success BOOLEAN,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+# rows are generated server-side; visits and logs are inserted in time order like the real append-only tables
+SEED_SQL = {
+    'site_visits': '''
+        INSERT INTO site_visits (visit_date, page_path, user_agent, referrer, session_id, ip_address, device_type, browser, is_admin, created_at)
+        SELECT CURRENT_DATE - (365 - g * 365 / %(rows)s)::int,
+               (ARRAY['/', '/services', '/portfolio', '/news', '/contacts', '/about'])[1 + (g * 7 %% 6)]
+                   || CASE WHEN g %% 5 = 0 THEN '/' || (g %% 300) ELSE '' END,
+               'Mozilla/5.0 bench', 'https://yandex.ru/', 's' || (g / 4), '10.' || (g %% 250) || '.' || (g %% 97) || '.1',
+               (ARRAY['desktop', 'mobile', 'tablet'])[1 + (g %% 3)],
+               (ARRAY['Chrome', 'Safari', 'Firefox', 'Edge', 'Other'])[1 + (g * 3 %% 5)],
+               g %% 20 = 0,
+               now() - (365 - g * 365 / %(rows)s) * interval '1 day'
+        FROM generate_series(1, %(rows)s) g
+    ''',
+    'daily_stats': '''
+        INSERT INTO daily_stats (stat_date, total_visits, unique_visitors, page_views)
+        SELECT visit_date, COUNT(*), COUNT(DISTINCT session_id), COUNT(*)
+        FROM site_visits WHERE is_admin = FALSE GROUP BY visit_date
+    ''',
+    'bot_logs': '''
+        INSERT INTO bot_logs (user_agent, is_blocked, ip_address, created_at)
+        SELECT CASE WHEN g %% 3 = 0 THEN 'python-requests/2.31' ELSE 'Mozilla/5.0 bench' END,
+               g %% 3 = 0, '172.16.' || (g %% 250) || '.' || (g %% 31),
+               now() - (%(rows)s - g) * interval '7 seconds'
+        FROM generate_series(1, %(rows)s) g
+    ''',
+    'news': '''
+        INSERT INTO news (original_title, translated_title, original_excerpt, translated_excerpt,
+                          original_content, translated_content, source, source_url, link, image_url,
+                          category, published_date, is_active, created_at, updated_at, translated_at)
+        SELECT 'Original title ' || g, 'Заголовок новости ' || g, body.text_value, body.text_value,
+               body.text_value || body.text_value, body.text_value || body.text_value,
+               'TechCrunch', 'https://techcrunch.com', 'https://techcrunch.com/bench/' || g,
+               'https://cdn.example.com/' || g || '.jpg',
+               (ARRAY['Технологии', 'Веб-разработка', 'AI', 'Дизайн', 'Бизнес'])[1 + (g %% 5)],
+               now() - (%(rows)s - g) * interval '15 minutes', g %% 10 <> 0,
+               now() - (%(rows)s - g) * interval '15 minutes', now(), now()
+        FROM generate_series(1, %(rows)s) g
+        CROSS JOIN LATERAL (
+            SELECT string_agg(md5(g::text || i::text), ' ') AS text_value FROM generate_series(1, 60) i
+        ) body
+    ''',
+    'admin_login_logs': '''
+        INSERT INTO admin_login_logs (ip_address, user_agent, success, created_at)
+        SELECT '192.168.' || (g %% 250) || '.' || (g %% 13), 'Mozilla/5.0 admin ' || (g %% 40),
+               g %% 4 <> 0, now() - (%(rows)s - g) * interval '60 seconds'
+        FROM generate_series(1, %(rows)s) g
+    ''',
+}
+
+
+def _dsn() -> str:
+    dsn = os.environ.get('BENCH_DATABASE_URL')
+    if not dsn:
+        raise SystemExit('BENCH_DATABASE_URL is not set (the benchmark never touches DATABASE_URL)')
+    return dsn
+
+
+def _prepare_environment(keep_budgets: bool) -> None:
+    os.environ['DATABASE_URL'] = _dsn()
+    os.environ.pop('DATABASE_REPLICA_URL', None)
+    if not keep_budgets:
+        os.environ['DB_STATEMENT_TIMEOUT_MS'] = '0'
+
+
+def seed(scale: float, migrate: bool = False) -> Dict[str, int]:
+    import psycopg2
+
+    counts = {table: max(int(rows * scale), 1) for table, rows in BASE_ROWS.items()}
+    conn = psycopg2.connect(_dsn())
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        cur.execute(SCHEMA_SQL)
+        for table in ('site_visits', 'daily_stats', 'bot_logs', 'news', 'admin_login_logs'):
+            started = time.perf_counter()
+            cur.execute(SEED_SQL[table], {'rows': counts.get(table, 0)})
+            print(f'  seeded {table}: {cur.rowcount} rows in {time.perf_counter() - started:.1f}s')
+        cur.execute('VACUUM ANALYZE')
+    finally:
+        conn.close()
+    if migrate:
+        from backend._shared.migrations import migrate as apply_migrations
+        print(f'  migrations applied: {apply_migrations(_dsn()) or "none"}')
+    return counts
+
+
+def _load_handler(name: str):
+    path = os.path.join(BACKEND_DIR, name, 'index.py')
+    spec = importlib.util.spec_from_file_location(f'bench_{name.replace("-", "_")}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _unbudgeted(handler: Callable, keep_budgets: bool) -> Callable:
+    return handler if keep_budgets else getattr(handler, '__wrapped__', handler)
+
+
+def build_scenarios(keep_budgets: bool) -> List[Tuple[str, Callable[[], Any]]]:
+    analytics = _load_handler('get-analytics')
+    bot_stats = _load_handler('bot-stats')
+    news_feed = _load_handler('news-feed')
+    login_logs = _load_handler('admin-login-logs')
+
+    analytics_handler = _unbudgeted(analytics.handler, keep_budgets)
+    bot_stats_handler = _unbudgeted(bot_stats.handler, keep_budgets)
+
+    def analytics_call(days: int) -> Callable[[], Any]:
+        event = {'httpMethod': 'GET', 'queryStringParameters': {'days': str(days)}}
+        return lambda: _check(analytics_handler(event, None))
+
+    def bot_stats_call(offset: int) -> Callable[[], Any]:
+        event = {'httpMethod': 'GET', 'queryStringParameters': {'limit': '50', 'offset': str(offset)}}
+        return lambda: _check(bot_stats_handler(event, None))
+
+    def login_logs_call(params: Dict[str, str], sort: str = 'created_at') -> Callable[[], Any]:
+        filters, args = login_logs.build_filters(params)
+        return lambda: login_logs.fetch_logs(50, 0, filters, args, sort, 'DESC')
+
+    week_ago = time.strftime('%Y-%m-%d', time.localtime(time.time() - 7 * 86400))
+    return [
+        ('get-analytics days=14', analytics_call(14)),
+        ('get-analytics days=90', analytics_call(90)),
+        ('bot-stats offset=0', bot_stats_call(0)),
+        ('bot-stats offset=5000', bot_stats_call(5000)),
+        ('news-feed page=1', lambda: news_feed.fetch_news_from_db(12, 0, None, None)),
+        ('news-feed category', lambda: news_feed.fetch_news_from_db(12, 0, 'AI', None)),
+        ('news-feed page=50', lambda: news_feed.fetch_news_from_db(12, 588, None, None)),
+        ('news-feed search', lambda: news_feed.fetch_news_from_db(12, 0, None, 'новости 42')),
+        ('admin-login-logs default', login_logs_call({})),
+        ('admin-login-logs last week', login_logs_call({'start_date': week_ago})),
+        ('admin-login-logs failed by ip', login_logs_call({'success': 'false'}, sort='ip_address')),
+    ]
+
+
+def _check(response: Dict[str, Any]) -> Dict[str, Any]:
+    if response.get('statusCode') != 200:
+        raise RuntimeError(f"status {response.get('statusCode')}: {str(response.get('body'))[:200]}")
+    return response
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    # nearest-rank percentile
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class StatementRecorder:
+    '''Collects every statement's duration from the instrumented cursor of backend._shared.db.'''
+
+    def __init__(self):
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self._original = None
+
+    def __enter__(self) -> 'StatementRecorder':
+        from backend._shared import db
+
+        self._original = original = db._observe
+
+        def observe(cur, query, params, elapsed_ms, error):
+            sql = db.normalize_sql(db._source_sql(db._query_text(cur, query)))
+            self.timings[sql].append(elapsed_ms)
+            return original(cur, query, params, elapsed_ms, error)
+
+        db._observe = observe
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        from backend._shared import db
+
+        db._observe = self._original
+
+
+def run(repeat: int, warmup: int, keep_budgets: bool, label: str = '') -> None:
+    scenarios = build_scenarios(keep_budgets)
+    print(f'\n== {label or "current data"}: {repeat} runs per scenario, {warmup} warm-up')
+    print(f'{"scenario":<34}{"p50 ms":>10}{"p95 ms":>10}{"max ms":>10}  errors')
+    statements: Dict[str, List[float]] = defaultdict(list)
+    for name, call in scenarios:
+        for _ in range(warmup):
+            try:
+                call()
+            except Exception:
+                pass
+        durations: List[float] = []
+        errors: List[str] = []
+        with StatementRecorder() as recorder:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                try:
+                    call()
+                    durations.append((time.perf_counter() - started) * 1000)
+                except Exception as exc:
+                    errors.append(str(exc))
+        for sql, timings in recorder.timings.items():
+            statements[sql].extend(timings)
+        print(f'{name:<34}{percentile(durations, 50):>10.2f}{percentile(durations, 95):>10.2f}'
+              f'{max(durations, default=0):>10.2f}  {len(errors)}{" " + errors[0][:60] if errors else ""}')
+
+    print(f'\n{"p50 ms":>10}{"p95 ms":>10}{"calls":>8}  statement')
+    ranked = sorted(statements.items(), key=lambda item: percentile(item[1], 95), reverse=True)
+    for sql, timings in ranked:
+        print(f'{percentile(timings, 50):>10.2f}{percentile(timings, 95):>10.2f}{len(timings):>8}  {sql[:110]}')
+
+
+def main(argv: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    seed_parser = sub.add_parser('seed', help='recreate and fill the benchmark tables')
+    seed_parser.add_argument('--scale', type=float, default=0.1)
+    seed_parser.add_argument('--migrate', action='store_true', help='apply backend/_shared/migrations after seeding')
+    for name in ('run', 'sweep'):
+        command = sub.add_parser(name)
+        command.add_argument('--repeat', type=int, default=20)
+        command.add_argument('--warmup', type=int, default=2)
+        command.add_argument('--keep-budgets', action='store_true', help='keep the handlers\' statement budgets')
+    sub.choices['sweep'].add_argument('--scales', default='0.05,0.2,1')
+    sub.choices['sweep'].add_argument('--migrate', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.command == 'seed':
+        print(f'seeding scale {args.scale}')
+        seed(args.scale, args.migrate)
+        return
+    _prepare_environment(args.keep_budgets)
+    if args.command == 'run':
+        run(args.repeat, args.warmup, args.keep_budgets)
+        return
+    for scale in (float(value) for value in args.scales.split(',')):
+        print(f'\nseeding scale {scale}')
+        counts = seed(scale, args.migrate)
+        label = f'scale {scale} (' + ', '.join(f'{table}={rows}' for table, rows in counts.items()) + ')'
+        run(args.repeat, args.warmup, args.keep_budgets, label)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+'''
+Benchmark: stdlib isoformat loop + json.dumps + encode vs _shared.serialization.json_body
+on a get_all_news-sized payload.
+Run: python -m backend.tests.bench_serialization [rows] [repeat]
+'''
+
+import json
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from backend._shared.serialization import body_bytes, json_body, orjson
+
+DATE_FIELDS = ['published_date', 'created_at', 'updated_at', 'translated_at']
+
+
+def make_rows(count: int):
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    content = 'Lorem ipsum dolor sit amet, новости технологий. ' * 80
+    return [
+        {
+            'id': i,
+            'original_title': f'Original title {i}',
+            'translated_title': f'Переведённый заголовок {i}',
+            'original_excerpt': content[:300],
+            'translated_excerpt': content[:300],
+            'original_content': content,
+            'translated_content': content,
+            'source': 'TechCrunch',
+            'source_url': 'https://techcrunch.com',
+            'link': f'https://techcrunch.com/2026/01/01/item-{i}',
+            'image_url': f'https://cdn.example.com/{i}.jpg',
+            'category': 'Технологии',
+            'published_date': base - timedelta(hours=i),
+            'is_active': True,
+            'created_at': base - timedelta(hours=i),
+            'updated_at': base,
+            'translated_at': base,
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_path(rows) -> bytes:
+    news_list = []
+    for row in rows:
+        news_item = dict(row)
+        for date_field in DATE_FIELDS:
+            if news_item.get(date_field) and isinstance(news_item[date_field], datetime):
+                news_item[date_field] = news_item[date_field].isoformat()
+        news_list.append(news_item)
+    body = json.dumps(news_list)
+    return body.encode('utf-8')
+
+
+def shared_path(rows) -> bytes:
+    return body_bytes(json_body(rows))
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rows = make_rows(count)
+    assert json.loads(legacy_path(rows)) == json.loads(shared_path(rows))
+    print(f'rows={count} repeat={repeat} encoder={"orjson" if orjson else "json"}')
+    for name, func in (('legacy', legacy_path), ('shared', shared_path)):
+        best = min(timeit.repeat(lambda: func(rows), number=1, repeat=repeat))
+        print(f'{name:>7}: best {best * 1000:.2f} ms, {len(func(rows)) / 1024:.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+'''
+Benchmark: news-admin translation shape against a local Ollama stub.
+sequential - title, excerpt and content chunks one after another, with the old fixed
+             pause between chunks (the pipeline before the parallel executor)
+parallel   - articles, fields and chunks through _shared.ollama.parallel_map,
+             at most --parallel requests in flight
+N endpoints - the same against --endpoints stubs through the endpoint pool
+Each stub answers /api/generate after --latency seconds and, like Ollama with
+OLLAMA_NUM_PARALLEL, serves at most --parallel requests at once. All runs must
+produce identical text. The translation cache is disabled.
+Run: python -m backend.tests.bench_translation [--articles 8] [--chunks 3] [--latency 0.3] [--parallel 4] [--endpoints 2]
+'''
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Sequence
+
+from backend._shared import ollama, translation_cache, translation_memory
+from backend._shared.ollama_pool import EndpointPool
+from backend._shared.translation_memory import split_segments, translate_segments
+
+CHUNK_SIZE = 1500
+SENTENCE = 'The release adds a faster build cache and fixes several long-standing bugs in the CLI. '
+
+
+def start_stub(latency: float, parallel: int) -> ThreadingHTTPServer:
+    busy = threading.Semaphore(parallel)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with busy:
+                time.sleep(latency)
+            body = json.dumps({'response': 'RU ' + payload['prompt'], 'done': True}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def translate(text: str) -> Optional[str]:
+    response = ollama.generate({'model': 'stub', 'prompt': text, 'stream': False})
+    return response.json()['response'] if response.status_code == 200 else None
+
+
+def make_articles(count: int, chunks: int) -> List[dict]:
+    per_chunk = CHUNK_SIZE // len(SENTENCE)
+    return [
+        {
+            'title': f'Article {i}: a new release is out',
+            'excerpt': f'Short summary of article {i}.',
+            'content': ''.join(f'{SENTENCE[:-2]} {i}.{n}. ' for n in range(per_chunk * chunks)),
+        }
+        for i in range(count)
+    ]
+
+
+def translate_article(article: dict, pause: float) -> List[str]:
+    calls = []
+
+    def translate_run(text: str) -> Optional[str]:
+        if calls and pause:
+            time.sleep(pause)
+        calls.append(text)
+        return translate(text)
+
+    content = translate_segments(split_segments(article['content']), translate_run, 'stub', 'bench', CHUNK_SIZE)
+    return [translate(article['title']), translate(article['excerpt']), content.text]
+
+
+def run_sequential(articles: List[dict], pause: float) -> List[List[str]]:
+    original = translation_memory.parallel_map
+    translation_memory.parallel_map = lambda func, items: [func(item) for item in items]
+    try:
+        return [translate_article(article, pause) for article in articles]
+    finally:
+        translation_memory.parallel_map = original
+
+
+def run_parallel(articles: List[dict]) -> List[List[str]]:
+    def translate_fields(article: dict) -> List[str]:
+        runs = [
+            lambda: translate(article['title']),
+            lambda: translate(article['excerpt']),
+            lambda: translate_segments(split_segments(article['content']), translate, 'stub', 'bench', CHUNK_SIZE).text,
+        ]
+        return ollama.parallel_map(lambda job: job(), runs)
+
+    return ollama.parallel_map(translate_fields, articles)
+
+
+def main(argv: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--articles', type=int, default=8)
+    parser.add_argument('--chunks', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--parallel', type=int, default=4)
+    parser.add_argument('--pause', type=float, default=1.0, help='old fixed pause between chunks')
+    parser.add_argument('--endpoints', type=int, default=2, help='stub servers for the pool run')
+    args = parser.parse_args(argv)
+
+    servers = [start_stub(args.latency, args.parallel) for _ in range(max(1, args.endpoints))]
+    urls = [f'http://127.0.0.1:{server.server_address[1]}' for server in servers]
+    translation_cache.TRANSLATION_CACHE_ENABLED = False
+    articles = make_articles(args.articles, args.chunks)
+    requests_total = args.articles * (2 + args.chunks)
+    print(f'{args.articles} articles x (title, excerpt, {args.chunks} chunks) = {requests_total} requests, '
+          f'latency {args.latency}s, parallel {args.parallel}')
+
+    def with_endpoints(count: int, run):
+        def wrapped():
+            ollama._pool = EndpointPool(urls[:count], args.parallel)
+            return run()
+        return wrapped
+
+    runs = [('sequential', with_endpoints(1, lambda: run_sequential(articles, args.pause))),
+            ('parallel', with_endpoints(1, lambda: run_parallel(articles)))]
+    if len(urls) > 1:
+        runs.append((f'{len(urls)} endpoints', with_endpoints(len(urls), lambda: run_parallel(articles))))
+    timings = {}
+    outputs = {}
+    for name, run in runs:
+        started = time.perf_counter()
+        outputs[name] = run()
+        timings[name] = time.perf_counter() - started
+        print(f'{name:<12}{timings[name]:>8.2f}s')
+    for server in servers:
+        server.shutdown()
+
+    for name in timings:
+        assert outputs[name] == outputs['sequential'], f'{name} output differs from sequential'
+    print('identical output, speedup ' + ', '.join(
+        f'{name} x{timings["sequential"] / timings[name]:.1f}' for name in timings if name != 'sequential'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import pytest
+
+from backend._shared import cache
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def record(*args):
+            self.calls.append((name, args))
+            return self
+        return record
+
+    def execute(self):
+        results = [getattr(self.redis, name)(*args) for name, args in self.calls]
+        self.calls = []
+        return results
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.sets = {}
+        self.published = []
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def expire(self, key, ttl):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.sets.pop(key, None)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(cache, '_client', lambda: fake)
+    # the listener thread is replaced by setting the subscribed flag directly
+    monkeypatch.setattr(cache, '_ensure_subscriber', lambda: None)
+    cache._subscribed.set()
+    cache.clear_local()
+    yield fake
+    cache._subscribed.clear()
+    cache.clear_local()
+
+
+def test_get_or_set_loads_once(redis):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return '{"news":[]}'
+
+    assert cache.get_or_set('news-feed:1', loader, tags=['news']) == '{"news":[]}'
+    assert cache.get_or_set('news-feed:1', loader, tags=['news']) == '{"news":[]}'
+    assert calls == [1]
+    assert redis.sets['cache:tag:news'] == {'news-feed:1'}
+
+
+def test_invalidate_drops_tagged_entries_and_publishes(redis):
+    cache.set('news-feed:1', 'a', tags=['news'])
+    cache.set('partners:active', 'b', tags=['partners'])
+
+    assert cache.invalidate('news') is True
+
+    assert 'news-feed:1' not in redis.data
+    assert redis.data['partners:active'] == 'b'
+    assert cache.get('news-feed:1') is None
+    assert cache.get('partners:active') == 'b'
+    assert redis.published == [(cache.CACHE_INVALIDATION_CHANNEL, 'news')]
+
+
+def test_invalidation_during_load_discards_value(redis):
+    def loader():
+        cache.invalidate('news')
+        return 'stale'
+
+    assert cache.get_or_set('news-feed:1', loader, tags=['news']) == 'stale'
+    assert 'news-feed:1' not in redis.data
+    assert cache.get('news-feed:1') is None
+
+
+def test_published_invalidation_clears_local_copy(redis):
+    cache.set('portfolio:active', 'cached', tags=['portfolio'])
+    # another worker invalidated: Redis is already empty, only the message arrives here
+    redis.data.clear()
+    assert cache.get('portfolio:active') == 'cached'
+
+    cache._drop_local('portfolio,services'.split(','))
+
+    assert cache.get('portfolio:active') is None
+
+
+def test_local_copy_unused_without_subscription(redis):
+    cache.set('partners:active', 'cached', tags=['partners'])
+    cache._subscribed.clear()
+    redis.data.clear()
+    assert cache.get('partners:active') is None
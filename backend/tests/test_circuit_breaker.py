@@ -0,0 +1,52 @@
+import pytest
+
+from backend._shared import circuit_breaker
+from backend._shared.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _fail():
+    raise RuntimeError('down')
+
+
+def _trip(breaker):
+    for _ in range(breaker.minimum_calls):
+        with pytest.raises(RuntimeError):
+            breaker.call(_fail)
+
+
+def test_opens_after_failure_rate_and_rejects_fast():
+    breaker = CircuitBreaker('dep', minimum_calls=4, failure_rate_threshold=0.5, open_seconds=60)
+    breaker.call(lambda: 'ok')
+    for _ in range(3):
+        assert breaker.state == circuit_breaker.CLOSED
+        with pytest.raises(RuntimeError):
+            breaker.call(_fail)
+    assert breaker.state == circuit_breaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: pytest.fail('dependency called while open'))
+    assert breaker.snapshot()['rejected'] == 1
+
+
+def test_half_open_probe_closes_or_reopens(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    breaker = CircuitBreaker('dep', minimum_calls=2, open_seconds=10)
+    _trip(breaker)
+    now[0] += 11
+    with pytest.raises(RuntimeError):
+        breaker.call(_fail)
+    assert breaker.state == circuit_breaker.OPEN
+    now[0] += 11
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == circuit_breaker.CLOSED
+
+
+def test_half_open_limits_concurrent_probes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    breaker = CircuitBreaker('dep', minimum_calls=2, open_seconds=10, half_open_max_calls=1)
+    _trip(breaker)
+    now[0] += 11
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
@@ -0,0 +1,106 @@
+import pytest
+
+from backend._shared import db
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.prepared = set()
+
+
+class _FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+
+
+def test_statement_uses_positional_parameters():
+    statement = db.Statement('lookup', "SELECT 1 FROM t WHERE a = %s AND b LIKE 'x%%' LIMIT %s")
+    assert statement.prepared_sql == "SELECT 1 FROM t WHERE a = $1 AND b LIKE 'x%' LIMIT $2"
+    assert statement.execute_sql == 'EXECUTE lookup (%s, %s)'
+
+
+def test_register_rejects_conflicting_sql():
+    db.register_statement('test_conflict', 'SELECT 1')
+    assert db.register_statement('test_conflict', 'SELECT 1').sql == 'SELECT 1'
+    with pytest.raises(ValueError):
+        db.register_statement('test_conflict', 'SELECT 2')
+
+
+def test_statement_is_prepared_once_per_connection_and_counted():
+    db.register_statement('test_hot', 'SELECT * FROM t WHERE id = %s')
+    db.reset_statement_stats()
+    cur = _FakeCursor(_FakeConnection())
+    db.execute_prepared(cur, 'test_hot', (1,))
+    db.execute_prepared(cur, 'test_hot', (2,))
+    assert [sql for sql, _ in cur.statements] == [
+        'PREPARE test_hot AS SELECT * FROM t WHERE id = $1',
+        'EXECUTE test_hot (%s)',
+        'EXECUTE test_hot (%s)',
+    ]
+    assert db.get_statement_stats()['test_hot']['calls'] == 2
+
+
+class _SlowBaseCursor:
+    rowcount = 3
+
+    def execute(self, query, vars=None):
+        return None
+
+
+def test_normalize_sql_groups_literals_and_parameters():
+    assert db.normalize_sql("SELECT *\n  FROM news WHERE id IN (1, 2, 3) AND title ILIKE %s AND src = 'a''b'") == \
+        'SELECT * FROM news WHERE id IN (...) AND title ILIKE ? AND src = ?'
+
+
+def test_slow_statement_is_logged_with_caller(monkeypatch):
+    events = []
+    monkeypatch.setattr(db, 'SLOW_QUERY_THRESHOLD_MS', 0)
+    monkeypatch.setattr(db, 'log_event', lambda name, payload: events.append((name, payload)))
+    cursor = db._instrumented_cursor_class(_SlowBaseCursor)()
+    cursor.execute('SELECT * FROM news LIMIT %s', (10,))
+    name, payload = events[0]
+    assert name == 'db.slow_query'
+    assert payload['sql'] == 'SELECT * FROM news LIMIT ?'
+    assert 'test_slow_statement_is_logged_with_caller' in payload['caller']
+
+
+def test_plan_is_never_captured_for_writes():
+    assert db._capture_plan(None, 'INSERT INTO site_visits VALUES (%s)', (1,)) is None
+
+
+def test_statement_budget_sets_timeout_and_maps_cancel_to_503():
+    seen = []
+
+    @db.statement_budget(200)
+    def handler(event, context):
+        seen.append(db.current_statement_timeout_ms())
+        raise db.psycopg2.errors.QueryCanceled('canceling statement due to statement timeout')
+
+    response = handler({}, None)
+    assert seen == [200]
+    assert response['statusCode'] == 503
+    assert db.current_statement_timeout_ms() == db.STATEMENT_TIMEOUT_MS
+
+
+def test_statement_budget_turns_caught_timeout_500_into_503(monkeypatch):
+    monkeypatch.setattr(db, 'log_event', lambda name, payload: None)
+
+    class _CancelledCursor:
+        rowcount = -1
+
+        def execute(self, query, vars=None):
+            raise db.psycopg2.errors.QueryCanceled('canceling statement due to statement timeout')
+
+    @db.statement_budget(2000)
+    def handler(event, context):
+        try:
+            db._instrumented_cursor_class(_CancelledCursor)().execute('SELECT COUNT(DISTINCT ip_address) FROM bot_logs')
+        except Exception as exc:
+            return {'statusCode': 500, 'body': str(exc)}
+        return {'statusCode': 200}
+
+    assert handler({}, None)['statusCode'] == 503
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from backend._shared import db
+
+PRIMARY_URL = os.environ.get('TEST_DATABASE_URL')
+REPLICA_URL = os.environ.get('TEST_DATABASE_REPLICA_URL')
+
+
+@pytest.fixture
+def replica_env(monkeypatch):
+    monkeypatch.setenv('DATABASE_REPLICA_URL', 'postgresql://replica/db')
+    monkeypatch.setattr(db, '_replica_state', {'checked_at': None, 'healthy': False, 'lag_seconds': None, 'error': None})
+    monkeypatch.setattr(db, 'log_event', lambda name, payload: None)
+    return monkeypatch
+
+
+def test_reads_go_to_fresh_replica_and_writes_to_primary(replica_env):
+    replica_env.setattr(db, 'measure_replica_lag', lambda dsn: 0.5)
+    assert db.route_dsn(readonly=True) == 'postgresql://replica/db'
+    assert db.route_dsn(readonly=False) is None
+    with db.use_primary():
+        assert db.route_dsn(readonly=True) is None
+
+
+def test_lagging_or_unreachable_replica_falls_back_to_primary(replica_env):
+    replica_env.setattr(db, 'measure_replica_lag', lambda dsn: db.REPLICA_MAX_LAG_SECONDS + 1)
+    assert db.route_dsn(readonly=True) is None
+
+    def unreachable(dsn):
+        raise db.psycopg2.OperationalError('connection refused')
+
+    replica_env.setattr(db, 'measure_replica_lag', unreachable)
+    db._replica_state['checked_at'] = None
+    assert db.route_dsn(readonly=True) is None
+    assert db.get_replica_status()['error'] == 'connection refused'
+
+
+@pytest.mark.skipif(not (PRIMARY_URL and REPLICA_URL), reason='TEST_DATABASE_URL and TEST_DATABASE_REPLICA_URL not set')
+def test_routing_against_two_local_instances(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', PRIMARY_URL)
+    monkeypatch.setenv('DATABASE_REPLICA_URL', REPLICA_URL)
+    monkeypatch.setattr(db, '_replica_state', {'checked_at': None, 'healthy': False, 'lag_seconds': None, 'error': None})
+
+    def server_port(**kwargs):
+        with db.get_connection(**kwargs) as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT inet_server_port()')
+            return cur.fetchone()[0]
+
+    assert server_port(readonly=True) != server_port(readonly=False)
+    with db.use_primary():
+        assert server_port(readonly=True) == server_port(readonly=False)
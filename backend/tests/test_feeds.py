@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend._shared import feeds
+from backend._shared import http as shared_http
+
+RSS = b'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title><item><title>a</title></item></channel></rss>'
+
+# path -> (delay seconds, status)
+ROUTES = {
+    '/fast': (0.0, 200),
+    '/slow-a': (0.6, 200),
+    '/slow-b': (0.6, 200),
+    '/hang': (5.0, 200),
+    '/broken': (0.0, 500),
+    '/etag': (0.0, 200),
+}
+
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        delay, status = ROUTES[self.path]
+        time.sleep(delay)
+        if self.path == '/etag' and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        try:
+            self.send_response(status)
+            if self.path == '/etag':
+                self.send_header('ETag', '"v1"')
+            self.send_header('Content-Type', 'application/rss+xml')
+            self.send_header('Content-Length', str(len(RSS)))
+            self.end_headers()
+            self.wfile.write(RSS)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server(monkeypatch):
+    monkeypatch.setattr(feeds, 'FEED_RETRIES', 0)
+    monkeypatch.setattr(shared_http, 'backoff_delay', lambda attempt: 0)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FeedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_feeds_download_concurrently(feed_server):
+    batch = [{'url': feed_server + path} for path in ('/slow-a', '/slow-b', '/fast')]
+    started = time.perf_counter()
+    results = feeds.fetch_feeds(batch, timeout=3)
+    elapsed = time.perf_counter() - started
+
+    assert [result.feed['url'] for result in results] == [feed['url'] for feed in batch]
+    assert all(result.ok and result.content == RSS for result in results)
+    # two 0.6s feeds in parallel, not one after another
+    assert elapsed < 1.1
+
+
+def test_hung_and_failing_feeds_do_not_block_others(feed_server):
+    batch = [{'url': feed_server + path} for path in ('/hang', '/broken', '/fast')]
+    started = time.perf_counter()
+    results = feeds.fetch_feeds(batch, timeout=1)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 2.5
+    hang, broken, fast = results
+    assert not hang.ok and ('Timeout' in hang.error or 'timed out' in hang.error)
+    assert not broken.ok and broken.error == 'HTTP 500'
+    assert fast.ok
+
+
+def test_conditional_requests_report_unchanged_feeds(feed_server):
+    url = feed_server + '/etag'
+    first = feeds.fetch_feed({'url': url})
+    assert first.changed and first.headers['etag'] == '"v1"'
+
+    by_etag = feeds.fetch_feed({'url': url}, state=feeds.FeedState(etag='"v1"'))
+    assert by_etag.status == 304 and by_etag.ok and not by_etag.changed
+
+    same_hash = feeds.FeedState(content_hash=hashlib.sha256(RSS).hexdigest())
+    by_hash = feeds.fetch_feeds([{'url': feed_server + '/fast'}], timeout=3, states={feed_server + '/fast': same_hash})[0]
+    assert by_hash.status == 200 and by_hash.unchanged and not by_hash.changed
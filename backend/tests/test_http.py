@@ -0,0 +1,94 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from backend._shared import http as shared_http
+from backend._shared.circuit_breaker import get_breaker
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    calls = 0
+
+    def _answer(self):
+        type(self).calls += 1
+        status = 503 if type(self).calls == 1 else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _answer
+    do_POST = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_server(monkeypatch):
+    monkeypatch.setattr(shared_http, 'backoff_delay', lambda attempt: 0)
+    _FlakyHandler.calls = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    shared_http.reset_http_metrics()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_is_retried_on_503(flaky_server):
+    response = shared_http.http_get(flaky_server + '/x')
+    assert response.status_code == 200
+    stats = shared_http.get_http_metrics()[flaky_server]
+    assert stats['requests'] == 2
+    assert stats['retries'] == 1
+    assert stats['statuses'] == {503: 1, 200: 1}
+
+
+def test_post_is_not_retried_unless_idempotent(flaky_server):
+    assert shared_http.http_post(flaky_server + '/x', json={}).status_code == 503
+    assert shared_http.http_post(flaky_server + '/x', json={}, idempotent=True).status_code == 200
+
+
+def test_sessions_are_shared_per_host(flaky_server):
+    assert shared_http.get_session(flaky_server + '/a') is shared_http.get_session(flaky_server + '/b')
+
+
+def test_refused_connection_is_retried_for_post(monkeypatch):
+    monkeypatch.setattr(shared_http, 'backoff_delay', lambda attempt: 0)
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        url = f'http://127.0.0.1:{sock.getsockname()[1]}'
+    shared_http.reset_http_metrics()
+    with pytest.raises(requests.ConnectionError):
+        shared_http.http_post(url + '/x', json={}, retries=1, breaker='refused-test')
+    assert shared_http.get_http_metrics()[url]['retries'] == 1
+
+
+def test_unexpected_error_releases_half_open_probe(monkeypatch):
+    class BrokenSession:
+        def request(self, *args, **kwargs):
+            raise ValueError('bad header')
+
+    monkeypatch.setattr(shared_http, 'get_session', lambda url: BrokenSession())
+    breaker = get_breaker('half-open-leak-test', minimum_calls=1, open_seconds=0)
+    breaker.before_call()
+    breaker.record_failure()
+    for _ in range(2):
+        # each call is a half-open probe; a leaked slot would turn the second into CircuitOpenError
+        with pytest.raises(ValueError):
+            shared_http.http_get('http://probe.test/x', retries=0, breaker='half-open-leak-test')
+    # a caller-side error is not a dependency failure: the probe neither closes nor reopens the circuit
+    assert breaker.snapshot()['state'] == 'half_open'
+
+
+def test_metrics_list_named_breakers(flaky_server):
+    shared_http.http_get(flaky_server + '/x', retries=0, breaker='ollama:metrics-test')
+    circuits = shared_http.get_http_metrics()[flaky_server]['circuits']
+    assert circuits['ollama:metrics-test']['calls'] == 1
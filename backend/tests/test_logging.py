@@ -0,0 +1,42 @@
+import json
+
+from backend._shared.logging import LogWriter
+
+
+def test_writer_batches_entries_to_file(tmp_path):
+    path = str(tmp_path / 'requests.log')
+    writer = LogWriter(path, flush_interval=0.05)
+    for index in range(5):
+        writer.submit(json.dumps({'n': index}) + '\n')
+    assert writer.flush(timeout=2.0)
+    with open(path, encoding='utf-8') as log_file:
+        assert [json.loads(line)['n'] for line in log_file] == [0, 1, 2, 3, 4]
+    assert writer.stats()['written'] == 5
+
+
+def test_writer_rotates_by_size(tmp_path):
+    path = str(tmp_path / 'requests.log')
+    writer = LogWriter(path, max_bytes=64, backup_count=2, batch_size=1, flush_interval=0.01)
+    for index in range(6):
+        writer.submit('x' * 40 + f'{index}\n')
+        writer.flush(timeout=2.0)
+    assert (tmp_path / 'requests.log.1').exists()
+    assert (tmp_path / 'requests.log.2').exists()
+    assert not (tmp_path / 'requests.log.3').exists()
+
+
+def test_full_queue_counts_dropped_events(tmp_path, monkeypatch):
+    writer = LogWriter(str(tmp_path / 'requests.log'), queue_size=2, drop_policy='drop_newest')
+    monkeypatch.setattr(writer, '_ensure_started', lambda: None)
+    results = [writer.submit(f'{index}\n') for index in range(5)]
+    assert results == [True, True, False, False, False]
+    assert writer.dropped == 3
+
+
+def test_drop_oldest_keeps_latest_entries(tmp_path, monkeypatch):
+    writer = LogWriter(str(tmp_path / 'requests.log'), queue_size=2, drop_policy='drop_oldest')
+    monkeypatch.setattr(writer, '_ensure_started', lambda: None)
+    for index in range(4):
+        writer.submit(f'{index}\n')
+    assert writer.dropped == 2
+    assert [writer._queue.get_nowait() for _ in range(2)] == ['2\n', '3\n']
@@ -0,0 +1,99 @@
+import os
+import uuid
+
+import pytest
+
+from backend._shared import migrations
+from backend._shared.migrations import Migration, MigrationError, load_migrations
+
+DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+
+def test_bundled_migrations_are_ordered_and_indexes_concurrent():
+    bundled = load_migrations()
+    assert [m.version for m in bundled] == sorted((m.version for m in bundled), key=int)
+    for migration in bundled:
+        for statement in migration.statements():
+            if statement.upper().startswith('CREATE INDEX'):
+                assert not migration.transactional
+                assert 'CONCURRENTLY IF NOT EXISTS' in statement.upper()
+
+
+def test_statements_split_and_drop_comments():
+    migration = Migration('7', 'demo', '-- migrate: no-transaction\n-- note\nCREATE INDEX CONCURRENTLY IF NOT EXISTS a_idx\n    ON a (b);\n\nANALYZE a;\n')
+    assert migration.statements() == ['CREATE INDEX CONCURRENTLY IF NOT EXISTS a_idx\n    ON a (b)', 'ANALYZE a']
+    assert Migration('8', 'plain', 'CREATE TABLE t (id int);').transactional
+
+
+def test_duplicate_versions_rejected(tmp_path):
+    (tmp_path / '0001_a.sql').write_text('SELECT 1;')
+    (tmp_path / '1_b.sql').write_text('SELECT 1;')
+    (tmp_path / 'README.md').write_text('ignored')
+    with pytest.raises(MigrationError):
+        load_migrations(str(tmp_path))
+
+
+SCHEMA_SQL = '''
+    CREATE TABLE news (
+        id SERIAL PRIMARY KEY, link TEXT, category TEXT, is_active BOOLEAN,
+        published_date TIMESTAMP, created_at TIMESTAMP
+    );
+    CREATE TABLE site_visits (
+        id SERIAL PRIMARY KEY, visit_date DATE, session_id TEXT, page_path TEXT,
+        device_type TEXT, browser TEXT, is_admin BOOLEAN
+    );
+    CREATE TABLE bot_logs (id SERIAL PRIMARY KEY, user_agent TEXT, is_blocked BOOLEAN, ip_address TEXT, created_at TIMESTAMP);
+    CREATE TABLE admin_login_logs (id SERIAL PRIMARY KEY, ip_address TEXT, user_agent TEXT, success BOOLEAN, created_at TIMESTAMP);
+    INSERT INTO news (link, category, is_active, published_date, created_at)
+        SELECT 'https://example.com/' || g, 'cat' || (g % 8), g % 10 <> 0,
+               now() - g * interval '1 minute', now() - g * interval '1 minute'
+        FROM generate_series(1, 20000) g;
+    INSERT INTO site_visits (visit_date, session_id, page_path, device_type, browser, is_admin)
+        SELECT CURRENT_DATE - (g / 500), 's' || (g % 3000), '/p' || (g % 40), 'desktop', 'Chrome', g % 20 = 0
+        FROM generate_series(1, 100000) g ORDER BY 1;
+    INSERT INTO bot_logs (user_agent, is_blocked, ip_address, created_at)
+        SELECT 'ua', g % 2 = 0, '10.0.0.' || (g % 200), now() - g * interval '1 second' FROM generate_series(1, 20000) g;
+    INSERT INTO admin_login_logs (ip_address, user_agent, success, created_at)
+        SELECT '10.0.0.' || (g % 200), 'ua', g % 3 <> 0, now() - g * interval '1 second' FROM generate_series(1, 20000) g;
+'''
+
+# handler queries and the index each one is expected to use
+EXPLAIN_CASES = [
+    ("SELECT id FROM news WHERE is_active = TRUE ORDER BY published_date DESC, created_at DESC LIMIT 12", 'news_active_published_idx'),
+    ("SELECT id FROM news WHERE is_active = TRUE AND category = 'cat3' ORDER BY published_date DESC, created_at DESC LIMIT 12", 'news_active_category_published_idx'),
+    ("SELECT link, id FROM news WHERE link = ANY(ARRAY['https://example.com/5', 'https://example.com/6'])", 'news_link_idx'),
+    ("SELECT canonical_link FROM news WHERE canonical_link = ANY(ARRAY['https://example.com/5', 'https://example.com/6'])", 'news_canonical_link_idx'),
+    ("SELECT COUNT(*), COUNT(DISTINCT session_id) FROM site_visits WHERE visit_date = CURRENT_DATE AND is_admin = FALSE", 'site_visits_public_date_session_idx'),
+    ("SELECT id FROM bot_logs ORDER BY created_at DESC LIMIT 50 OFFSET 0", 'bot_logs_created_at_idx'),
+    ("SELECT id FROM admin_login_logs ORDER BY created_at DESC LIMIT 50 OFFSET 0", 'admin_login_logs_created_at_idx'),
+]
+
+
+@pytest.fixture
+def scratch_schema():
+    import psycopg2
+
+    schema = f'migrations_test_{uuid.uuid4().hex[:8]}'
+    conn = psycopg2.connect(DATABASE_URL, options=f'-c search_path={schema}')
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f'CREATE SCHEMA {schema}')
+    cur.execute(SCHEMA_SQL)
+    try:
+        yield conn
+    finally:
+        cur.execute(f'DROP SCHEMA {schema} CASCADE')
+        conn.close()
+
+
+@pytest.mark.skipif(not DATABASE_URL, reason='TEST_DATABASE_URL not set')
+def test_migrations_apply_once_and_queries_use_indexes(scratch_schema):
+    applied = migrations.migrate(conn=scratch_schema)
+    assert applied == [m.version for m in load_migrations()]
+    assert migrations.migrate(conn=scratch_schema) == []
+
+    cur = scratch_schema.cursor()
+    for query, index_name in EXPLAIN_CASES:
+        cur.execute('EXPLAIN ' + query)
+        plan = '\n'.join(row[0] for row in cur.fetchall())
+        assert index_name in plan, f'{index_name} not used:\n{plan}'
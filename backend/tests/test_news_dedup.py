@@ -0,0 +1,98 @@
+import pytest
+
+from backend._shared import news_dedup
+from backend._shared.news_dedup import BloomFilter, KnownLinks, canonicalize_url
+
+
+@pytest.mark.parametrize('url', [
+    'https://example.com/post/1',
+    'http://example.com/post/1/',
+    'HTTPS://Example.com:443/post/1?utm_source=rss&utm_medium=feed',
+    'https://example.com/post/1/?fbclid=abc#comments',
+])
+def test_canonical_variants_match(url):
+    assert canonicalize_url(url) == 'https://example.com/post/1'
+
+
+def test_canonical_keeps_meaningful_query_and_port():
+    assert canonicalize_url('https://example.com/a?b=2&a=1&utm_campaign=x') == 'https://example.com/a?a=1&b=2'
+    assert canonicalize_url('http://example.com:8080/a/') == 'https://example.com:8080/a'
+    assert canonicalize_url('unknown') == 'unknown'
+
+
+def test_bloom_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    stored = [f'https://example.com/{i}' for i in range(2000)]
+    for link in stored:
+        bloom.add(link)
+    assert all(link in bloom for link in stored)
+    false_positives = sum(f'https://other.org/{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, sql, params):
+        self.conn.queries.append((sql, params))
+        if sql.startswith('SELECT id, link'):
+            self.rows = [row[:3] for row in self.conn.news if row[0] > params[0]]
+        else:
+            wanted = set(params[0])
+            self.rows = [(row[2] or canonicalize_url(row[1]),) for row in self.conn.news
+                         if (row[2] or canonicalize_url(row[1])) in wanted and row[3]]
+
+    def executemany(self, sql, rows):
+        self.conn.queries.append((sql, rows))
+        by_id = dict(row[::-1] for row in rows)
+        self.conn.news = [(i, link, by_id.get(i, canonical), translated) for i, link, canonical, translated in self.conn.news]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, news):
+        # (id, link, canonical_link, translated_content)
+        self.news = news
+        self.queries = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_known_links_skips_query_for_bloom_misses_and_backfills():
+    conn = _Conn([
+        (1, 'http://example.com/old/?utm_source=rss', None, 'перевод'),
+        (2, 'https://example.com/untranslated', 'https://example.com/untranslated', ''),
+    ])
+    known = KnownLinks(capacity=100)
+
+    found = known.find(['https://example.com/old', 'https://example.com/untranslated', 'https://example.com/new'], conn)
+    assert found == {'https://example.com/old'}
+    assert conn.news[0][2] == 'https://example.com/old'
+    assert known.last_id == 2
+
+    conn.queries.clear()
+    assert known.find(['https://example.com/brand-new'], conn) == set()
+    # only the incremental refresh; a Bloom miss needs no lookup
+    assert len(conn.queries) == 1 and conn.queries[0][1] == (2,)
+
+
+def test_known_links_fails_open(monkeypatch):
+    def broken():
+        raise RuntimeError('db down')
+
+    monkeypatch.setattr(news_dedup, 'connect', broken)
+    assert KnownLinks(capacity=10).find(['https://example.com/a']) == set()
@@ -0,0 +1,137 @@
+from backend._shared import notifications
+from backend._shared.notifications import DeliveryError
+
+
+class _FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((' '.join(sql.split()), params))
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self, rows):
+        self.cursor_obj = _FakeCursor(rows)
+        self.committed = False
+        self.commits = 0
+
+    def cursor(self):
+        return self.cursor_obj
+
+    def commit(self):
+        self.committed = True
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def _updates(conn):
+    # row outcomes, without the claim that marks the batch 'sending'
+    return [params for sql, params in conn.cursor_obj.statements
+            if sql.startswith('UPDATE') and "SET status = 'sending'" not in sql]
+
+
+def test_retry_delay_grows_and_is_capped():
+    assert notifications.retry_delay(1) == notifications.RETRY_BASE_SECONDS
+    assert notifications.retry_delay(2) == notifications.RETRY_BASE_SECONDS * 2
+    assert notifications.retry_delay(30) == notifications.RETRY_MAX_SECONDS
+
+
+def test_drain_sends_once_per_chat_and_defers_the_rest(monkeypatch):
+    sent = []
+    monkeypatch.setattr(notifications, '_last_sent_at', {})
+    monkeypatch.setitem(notifications.SENDERS, 'telegram', lambda recipient, payload: sent.append(payload['text']))
+    conn = _FakeConnection([
+        (1, 'telegram', '42', {'text': 'first'}, 0),
+        (2, 'telegram', '42', {'text': 'second'}, 0),
+    ])
+    result = notifications.drain_outbox(conn=conn)
+    assert sent == ['first']
+    assert result == {'sent': 1, 'retried': 0, 'failed': 0, 'deferred': 1}
+    assert conn.committed
+
+
+def test_drain_uses_retry_after_and_fails_permanent_errors(monkeypatch):
+    def sender(recipient, payload):
+        raise DeliveryError('nope', retry_after=7, permanent=payload.get('permanent', False))
+
+    monkeypatch.setattr(notifications, '_last_sent_at', {})
+    monkeypatch.setitem(notifications.SENDERS, 'email', sender)
+    conn = _FakeConnection([
+        (1, 'email', 'a@example.com', {}, 0),
+        (2, 'email', 'b@example.com', {'permanent': True}, 0),
+    ])
+    result = notifications.drain_outbox(conn=conn)
+    assert result['retried'] == 1 and result['failed'] == 1
+    assert _updates(conn)[0] == (1, 'nope', 7, 1)
+
+
+def test_build_digest_merges_and_escapes_plain_text_for_html():
+    chunks = notifications.build_digest([
+        (1, {'text': '<b>Заявка</b>', 'parse_mode': 'HTML'}),
+        (2, {'text': 'a < b'}),
+    ])
+    assert len(chunks) == 1
+    row_ids, text, parse_mode = chunks[0]
+    assert row_ids == [1, 2] and parse_mode == 'HTML'
+    assert '<b>Заявка</b>' in text and 'a &lt; b' in text
+
+
+def test_build_digest_splits_at_the_limit():
+    items = [(index, {'text': 'x' * 30}) for index in range(10)]
+    chunks = notifications.build_digest(items, limit=100)
+    assert all(len(text) <= 100 for _, text, _ in chunks)
+    assert [row_id for row_ids, _, _ in chunks for row_id in row_ids] == list(range(10))
+    long_chunks = notifications.build_digest([(1, {'text': 'line\n' * 100})], limit=64)
+    assert len(long_chunks) > 1 and long_chunks[-1][0] == [1]
+
+
+def test_drain_sends_coalesced_rows_as_one_digest(monkeypatch):
+    posted = []
+    monkeypatch.setattr(notifications, '_last_sent_at', {})
+    monkeypatch.setattr(notifications, '_post_telegram_message',
+                        lambda recipient, text, parse_mode: posted.append(text))
+    conn = _FakeConnection([
+        (1, 'telegram', '42', {'text': 'one', 'coalesce': True}, 0),
+        (2, 'telegram', '42', {'text': 'two', 'coalesce': True}, 0),
+    ])
+    result = notifications.drain_outbox(conn=conn)
+    assert len(posted) == 1 and 'one' in posted[0] and 'two' in posted[0]
+    assert result['sent'] == 2
+
+
+def test_drain_claims_first_and_commits_each_row(monkeypatch):
+    monkeypatch.setattr(notifications, '_last_sent_at', {})
+    monkeypatch.setitem(notifications.SENDERS, 'email', lambda recipient, payload: None)
+    conn = _FakeConnection([
+        (1, 'email', 'a@example.com', {}, 0),
+        (2, 'email', 'b@example.com', {}, 0),
+    ])
+    notifications.drain_outbox(conn=conn)
+    claim_sql, claim_params = conn.cursor_obj.statements[0]
+    assert "SET status = 'sending'" in claim_sql and claim_params[0] == notifications.SENDING_LEASE_SECONDS
+    # the claim, then one commit per delivered row
+    assert conn.commits == 3
+
+
+def test_oversized_html_item_goes_alone_as_plain_text():
+    chunks = notifications.build_digest([
+        (1, {'text': '<b>short</b>', 'parse_mode': 'HTML'}),
+        (2, {'text': '<b>long</b> &amp; ' + 'word ' * 40, 'parse_mode': 'HTML'}),
+        (3, {'text': 'tail'}),
+    ], limit=100)
+    assert chunks[0][0] == [1] and chunks[0][2] == 'HTML'
+    plain = [chunk for chunk in chunks if chunk[2] is None]
+    assert len(plain) > 1 and plain[-1][0] == [2]
+    assert all('<' not in text for _, text, _ in plain) and plain[0][1].startswith('long & ')
+    assert chunks[-1] == ([3], 'tail', 'HTML')
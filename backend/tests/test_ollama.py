@@ -0,0 +1,213 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from backend._shared import ollama
+from backend._shared.ollama_pool import EndpointPool
+
+# prompt -> response pieces streamed one per line
+STREAMS = {
+    'clean': ['Привет', ', ', 'мир', '.'],
+    'ramble': ['Привет', ', мир.', '\n\nNote:', ' this is', ' a translation'] + [' more'] * 50,
+    'long': ['слово '] * 200,
+}
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    sent = {}
+
+    def do_POST(self):
+        prompt = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['prompt']
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        time.sleep(0.05)
+        lines = [{'response': piece, 'done': False} for piece in STREAMS[prompt]]
+        lines.append({'response': '', 'done': True, 'done_reason': 'stop', 'eval_count': len(STREAMS[prompt]),
+                      'eval_duration': 200_000_000})
+        count = 0
+        try:
+            for line in lines:
+                data = (json.dumps(line) + '\n').encode()
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+                count += 1
+                time.sleep(0.01)
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        _StreamHandler.sent[prompt] = count
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stream_server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(ollama, '_pool', EndpointPool([f'http://127.0.0.1:{server.server_address[1]}'], 4))
+    ollama.reset_generate_stats()
+    yield _StreamHandler.sent
+    server.shutdown()
+    server.server_close()
+
+
+def test_parallel_map_keeps_order_and_runs_concurrently():
+    def job(delay):
+        time.sleep(delay)
+        return delay
+
+    delays = [0.3, 0.1, 0.2, 0.0]
+    started = time.perf_counter()
+    assert ollama.parallel_map(job, delays, max_workers=4) == delays
+    assert time.perf_counter() - started < 0.55
+
+
+def test_generate_caps_requests_in_flight(monkeypatch):
+    lock = threading.Lock()
+    state = {'current': 0, 'peak': 0}
+
+    def fake_post(url, **kwargs):
+        with lock:
+            state['current'] += 1
+            state['peak'] = max(state['peak'], state['current'])
+        time.sleep(0.05)
+        with lock:
+            state['current'] -= 1
+        return FakeResponse(200, kwargs['json']['prompt'])
+
+    monkeypatch.setattr(ollama, 'http_post', fake_post)
+    monkeypatch.setattr(ollama, '_pool', EndpointPool(['http://caps.test'], 2))
+    # nested maps: only the leaf requests take a slot, so this cannot deadlock
+    result = ollama.parallel_map(
+        lambda group: ollama.parallel_map(lambda n: ollama.generate({'prompt': n}).json(), group, max_workers=4),
+        [[1, 2, 3], [4, 5, 6], [7, 8]],
+        max_workers=3,
+    )
+    assert result == [[1, 2, 3], [4, 5, 6], [7, 8]]
+    assert state['peak'] == 2
+
+
+def test_stream_reads_until_done_and_records_timing(stream_server):
+    result = ollama.generate_stream({'model': 'm', 'prompt': 'clean'})
+    assert result.text == 'Привет, мир.' and result.done_reason == 'stop'
+    assert result.ttft_ms >= 50
+    # eval_count / eval_duration from the final chunk
+    assert result.tokens == 4 and result.tokens_per_second == 20.0
+    assert ollama.get_pool_stats()[0]['latency_ms'] == result.ttft_ms
+
+
+def test_stop_string_ends_generation_early(stream_server):
+    result = ollama.generate_stream({'model': 'm', 'prompt': 'ramble'}, stop=['\n\nNote:'])
+    assert result.text == 'Привет, мир.' and result.stopped_early
+    time.sleep(0.3)
+    # the server saw the disconnect long before its 56 lines were written
+    assert stream_server['ramble'] < 20
+
+
+def test_length_ceiling_and_stats(stream_server):
+    result = ollama.generate_stream({'model': 'm', 'prompt': 'long'}, max_chars=60)
+    assert result.done_reason == 'client_length' and 60 < len(result.text) <= 66
+    assert result.tokens_per_second is not None
+    stats = ollama.get_generate_stats()
+    assert stats['calls'] == 1 and stats['stopped_early'] == 1 and stats['avg_ttft_ms'] >= 50
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def test_availability_is_cached_and_checks_the_model(monkeypatch):
+    calls = []
+
+    def fake_get(url, **kwargs):
+        calls.append(url)
+        return FakeResponse(200, {'models': [{'name': 'llama3.2:latest'}]})
+
+    monkeypatch.setattr(ollama, 'http_get', fake_get)
+    monkeypatch.setattr(ollama, '_pool', EndpointPool(['http://tags.test'], 2))
+    monkeypatch.setattr(ollama, '_availability', {'checked_at': None, 'available': False, 'models': ()})
+    assert ollama.is_available('llama3.2') and ollama.is_available('llama3.2:latest')
+    assert not ollama.is_available('qwen2.5')
+    assert len(calls) == 1
+    assert ollama.is_available('llama3.2', max_age=0) and len(calls) == 2
+
+
+def test_failed_availability_is_rechecked_sooner(monkeypatch):
+    def fake_get(url, **kwargs):
+        raise ConnectionError('refused')
+
+    monkeypatch.setattr(ollama, 'http_get', fake_get)
+    monkeypatch.setattr(ollama, '_availability', {'checked_at': None, 'available': False, 'models': ()})
+    assert not ollama.is_available()
+    ollama._availability['checked_at'] -= ollama.FAILED_AVAILABILITY_TTL
+    monkeypatch.setattr(ollama, 'http_get', lambda url, **kwargs: FakeResponse(200, {'models': []}))
+    assert ollama.is_available()
+
+
+def test_warm_up_loads_with_keep_alive_and_reports_timings(monkeypatch):
+    payloads = []
+
+    def fake_post(url, **kwargs):
+        payloads.append(kwargs['json'])
+        return FakeResponse(200, {'response': '', 'done': True, 'load_duration': 2_500_000_000})
+
+    monkeypatch.setattr(ollama, 'http_post', fake_post)
+    monkeypatch.setattr(ollama, '_pool', EndpointPool(['http://warm.test'], 2))
+    [result] = ollama.warm_up_in_background('llama3.2', keep_alive='1h').result(timeout=5)
+    assert result.loaded and result.error is None
+    assert result.load_ms == 2500.0 and result.warm_latency_ms is not None
+    assert 'prompt' not in payloads[0] and payloads[1]['options'] == {'num_predict': 1}
+    assert all(payload['keep_alive'] == '1h' for payload in payloads)
+    # regular requests get the configured default
+    ollama.generate({'model': 'llama3.2', 'prompt': 'x'})
+    assert payloads[-1]['keep_alive'] == ollama.OLLAMA_KEEP_ALIVE
+
+
+def test_warm_up_reports_errors(monkeypatch):
+    monkeypatch.setattr(ollama, 'http_post', lambda url, **kwargs: FakeResponse(404, {}))
+    monkeypatch.setattr(ollama, '_pool', EndpointPool(['http://warm.test'], 2))
+    result = ollama.warm_up('missing')
+    assert not result.loaded and result.error == 'ValueError: HTTP 404'
+
+
+def test_refused_connection_fails_over_to_the_next_endpoint(monkeypatch):
+    urls = []
+
+    def fake_post(url, **kwargs):
+        urls.append(url)
+        if url.startswith('http://down.test'):
+            raise requests.ConnectionError('refused')
+        return FakeResponse(200, {'response': 'ok'})
+
+    monkeypatch.setattr(ollama, 'http_post', fake_post)
+    monkeypatch.setattr(ollama, '_pool', EndpointPool(['http://down.test', 'http://up.test'], 1))
+    assert ollama.generate({'prompt': 'x'}).json() == {'response': 'ok'}
+    assert urls == ['http://down.test/api/generate', 'http://up.test/api/generate']
+    down, up = ollama.get_pool_stats()
+    assert down['errors'] == 1 and up['requests'] == 1
+    # total completion time is not a routing sample
+    assert up['latency_ms'] is None
+
+
+def test_parallel_map_keeps_the_statement_budget():
+    from backend._shared import db
+
+    @db.statement_budget(30000)
+    def handler(event, context):
+        return ollama.parallel_map(lambda _: db.current_statement_timeout_ms(), range(3))
+
+    assert handler({}, None) == [30000] * 3
@@ -0,0 +1,64 @@
+import threading
+import time
+from contextlib import ExitStack
+
+import pytest
+
+from backend._shared.ollama_pool import EndpointPool, PoolDrainingError
+
+
+def test_routes_to_least_outstanding_endpoint():
+    pool = EndpointPool(['http://lor-a.test', 'http://lor-b.test'], 2)
+    with pool.acquire() as first, pool.acquire() as second, pool.acquire() as third:
+        assert {first.url, second.url} == {'http://lor-a.test', 'http://lor-b.test'}
+        assert third.url == first.url
+        assert pool.capacity == 4
+
+
+def test_latency_weights_routing():
+    pool = EndpointPool(['http://slow.test', 'http://fast.test'], 4)
+    slow, fast = pool.endpoints
+    pool.record(slow, 400.0, ok=True)
+    pool.record(fast, 100.0, ok=True)
+    with ExitStack() as stack:
+        held = [stack.enter_context(pool.acquire()).url for _ in range(5)]
+    # the fast box takes requests until it has four times the outstanding load of the slow one
+    assert held.count('http://fast.test') == 4 and held.count('http://slow.test') == 1
+
+
+def test_failing_endpoint_is_ejected():
+    pool = EndpointPool(['http://eject-a.test', 'http://eject-b.test'], 4)
+    bad = pool.endpoints[0]
+    for _ in range(3):
+        bad.breaker.before_call()
+        bad.breaker.record_failure()
+    assert pool.stats()[0]['ejected']
+    for _ in range(3):
+        with pool.acquire() as endpoint:
+            assert endpoint.url == 'http://eject-b.test'
+
+
+def test_waits_for_a_free_slot_and_drains():
+    pool = EndpointPool(['http://drain.test'], 1)
+    order = []
+
+    def worker():
+        with pool.acquire():
+            order.append('second')
+
+    with pool.acquire():
+        thread = threading.Thread(target=worker)
+        thread.start()
+        time.sleep(0.1)
+        order.append('first')
+    thread.join(timeout=2)
+    assert order == ['first', 'second']
+
+    finished = []
+    context = pool.acquire()
+    context.__enter__()
+    threading.Timer(0.1, lambda: (finished.append(True), context.__exit__(None, None, None))).start()
+    assert pool.drain(timeout=2) and finished
+    with pytest.raises(PoolDrainingError):
+        with pool.acquire():
+            pass
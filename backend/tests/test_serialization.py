@@ -0,0 +1,51 @@
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from backend._shared import serialization
+from backend._shared.serialization import JsonBody, body_bytes, dumps, json_body, loads
+
+
+def test_native_types_are_encoded():
+    value = {
+        'at': datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        'day': date(2026, 1, 2),
+        'price': Decimal('12.50'),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'title': 'Новости',
+    }
+    decoded = json.loads(dumps(value))
+    assert decoded == {
+        'at': '2026-01-02T03:04:05+00:00',
+        'day': '2026-01-02',
+        'price': 12.5,
+        'id': '12345678-1234-5678-1234-567812345678',
+        'title': 'Новости',
+    }
+
+
+def test_json_body_is_str_carrying_bytes():
+    body = json_body({'id': 1, 'title': 'Привет'})
+    assert isinstance(body, str)
+    assert isinstance(body, JsonBody)
+    assert body_bytes(body) is body.encoded
+    assert loads(body) == {'id': 1, 'title': 'Привет'}
+
+
+def test_body_bytes_for_plain_values():
+    assert body_bytes(None) == b''
+    assert body_bytes(b'raw') == b'raw'
+    assert body_bytes('тест') == 'тест'.encode('utf-8')
+
+
+def test_unknown_type_raises():
+    with pytest.raises(TypeError):
+        dumps({'value': object()})
+
+
+@pytest.mark.skipif(serialization.orjson is None, reason='orjson not installed')
+def test_non_str_keys():
+    assert loads(dumps({1: 'a'})) == {'1': 'a'}
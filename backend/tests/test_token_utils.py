@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from backend import token_utils
+from backend.token_utils import clear_verify_cache, create_jwt, revoke_jti, verify_jwt
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    clear_verify_cache()
+    yield
+    clear_verify_cache()
+
+
+def test_verify_jwt_round_trip_and_bad_signature():
+    token = create_jwt({'sub': '2', 'jti': 'abc'}, 'secret', 60)
+    assert verify_jwt(token, 'secret')['sub'] == '2'
+    assert verify_jwt(token, 'other-secret') is None
+    assert verify_jwt(token[:-2] + 'xx', 'secret') is None
+
+
+def test_cached_token_skips_signature_work(monkeypatch):
+    token = create_jwt({'sub': '2', 'jti': 'abc'}, 'secret', 60)
+    assert verify_jwt(token, 'secret')
+    monkeypatch.setattr(token_utils, '_decode_and_verify', lambda *_: pytest.fail('cache miss'))
+    assert verify_jwt(token, 'secret')['jti'] == 'abc'
+
+
+def test_revoke_jti_evicts_cached_token():
+    token = create_jwt({'sub': '2', 'jti': 'abc'}, 'secret', 60)
+    assert verify_jwt(token, 'secret')
+    revoke_jti('abc')
+    assert verify_jwt(token, 'secret') is None
+
+
+def test_is_revoked_callback_checked_on_miss():
+    token = create_jwt({'sub': '2', 'jti': 'abc'}, 'secret', 60)
+    assert verify_jwt(token, 'secret', is_revoked=lambda jti: jti == 'abc') is None
+
+
+def test_expired_token_rejected():
+    token = create_jwt({'sub': '2'}, 'secret', -10)
+    assert verify_jwt(token, 'secret') is None
+
+
+def test_fresh_token_valid_on_non_utc_host(monkeypatch):
+    monkeypatch.setenv('TZ', 'Europe/Moscow')
+    time.tzset()
+    try:
+        token = create_jwt({'sub': '1'}, 'secret', 900)
+        assert verify_jwt(token, 'secret')['sub'] == '1'
+    finally:
+        monkeypatch.undo()
+        time.tzset()
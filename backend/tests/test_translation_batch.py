@@ -0,0 +1,50 @@
+import json
+
+from backend._shared import translation_batch
+from backend._shared.translation_batch import make_batches, parse_batch_response, translate_batch
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return {'response': self.body}
+
+
+def test_batches_respect_size_and_length():
+    texts = ['a' * 10] * 5 + ['b' * 50, 'c' * 5]
+    assert [len(batch) for batch in make_batches(texts, size=3, max_chars=1000)] == [3, 3, 1]
+    assert [len(batch) for batch in make_batches(texts, size=10, max_chars=54)] == [5, 1, 1]
+
+
+def test_parse_validates_every_key():
+    assert parse_batch_response('{"1": " Привет ", "2": "", "3": 5}', 3) == ['Привет', None, None]
+    assert parse_batch_response('["Привет"]', 1) is None
+    assert parse_batch_response('{"1": "Прив', 1) is None
+
+
+def test_translate_batch_sends_json_prompt(monkeypatch):
+    sent = []
+
+    def fake_generate(payload):
+        sent.append(payload)
+        source = json.loads(payload['prompt'].split('JSON:\n')[1])
+        return _Response(json.dumps({key: value.upper() for key, value in source.items()}))
+
+    monkeypatch.setattr(translation_batch, 'generate', fake_generate)
+    assert translate_batch(['one title', 'two title'], 'Translate.\nJSON:\n', 'llama3.2') == ['ONE TITLE', 'TWO TITLE']
+    assert len(sent) == 1 and sent[0]['format'] == 'json' and sent[0]['model'] == 'llama3.2'
+
+
+def test_failed_batch_returns_none(monkeypatch):
+    monkeypatch.setattr(translation_batch, 'generate', lambda payload: _Response('Sure! Here is the translation'))
+    assert translate_batch(['one'], 'JSON:\n', 'm') is None
+
+    def broken(payload):
+        raise ConnectionError('refused')
+
+    monkeypatch.setattr(translation_batch, 'generate', broken)
+    assert translate_batch(['one'], 'JSON:\n', 'm') is None
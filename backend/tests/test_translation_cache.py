@@ -0,0 +1,107 @@
+from contextlib import contextmanager
+
+import pytest
+
+from backend._shared import translation_cache
+from backend._shared.translation_cache import (
+    get_translation_cache_stats,
+    lookup_translation,
+    source_hash,
+    store_translation,
+)
+
+
+class _Cursor:
+    def __init__(self, db):
+        self.db = db
+        self.row = None
+
+    def execute(self, sql, params):
+        self.db.queries += 1
+        if sql.startswith('UPDATE'):
+            model, prompt_version, digest = params
+            self.row = self.db.rows.get((model, prompt_version, digest))
+            self.row = (self.row,) if self.row is not None else None
+        else:
+            digest, model, prompt_version, translated, _length = params
+            self.db.rows[(model, prompt_version, digest)] = translated
+
+    def executemany(self, sql, rows):
+        for params in rows:
+            self.execute(sql, params)
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class _Database:
+    def __init__(self):
+        self.rows = {}
+        self.queries = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    database = _Database()
+    redis = {}
+
+    @contextmanager
+    def get_connection(**kwargs):
+        yield database
+
+    monkeypatch.setattr(translation_cache, 'get_connection', get_connection)
+    monkeypatch.setattr(translation_cache.cache, 'get', redis.get)
+    monkeypatch.setattr(translation_cache.cache, 'set', lambda key, value, tags=(), ttl=0: redis.__setitem__(key, value))
+    translation_cache.reset_translation_cache_stats()
+    yield database, redis
+    translation_cache.reset_translation_cache_stats()
+
+
+def test_hash_ignores_whitespace_differences():
+    assert source_hash('Show HN:  a\n new  tool ') == source_hash('Show HN: a new tool')
+    assert source_hash('Show HN: a new tool') != source_hash('Show HN: a new tool!')
+
+
+def test_lookup_goes_redis_then_postgres(backends):
+    database, redis = backends
+    assert lookup_translation('Hello world', 'llama3.2', '1') is None
+
+    store_translation('Hello world', 'Привет, мир', 'llama3.2', '1')
+    redis.clear()
+    queries = database.queries
+    assert lookup_translation('Hello  world', 'llama3.2', '1') == 'Привет, мир'
+    assert database.queries == queries + 1
+    # the Postgres hit refilled Redis
+    assert lookup_translation('Hello world', 'llama3.2', '1') == 'Привет, мир'
+    assert database.queries == queries + 1
+
+    # another model or prompt version is a separate key space
+    assert lookup_translation('Hello world', 'llama3.2', '2') is None
+
+    stats = get_translation_cache_stats()
+    assert (stats['redis_hits'], stats['db_hits'], stats['misses'], stats['stores']) == (1, 1, 2, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_database_errors_are_misses(backends, monkeypatch):
+    def broken(**kwargs):
+        raise RuntimeError('db down')
+
+    monkeypatch.setattr(translation_cache, 'get_connection', broken)
+    assert lookup_translation('Hello world', 'llama3.2', '1') is None
+    store_translation('Hello world', 'Привет, мир', 'llama3.2', '1')
+    assert get_translation_cache_stats()['errors'] == 2
+
+
+def test_evict_requires_a_filter():
+    with pytest.raises(ValueError):
+        translation_cache.evict_translations()
@@ -0,0 +1,75 @@
+import pytest
+
+from backend._shared import translation_memory
+from backend._shared.translation_cache import normalize_text
+from backend._shared.translation_memory import split_segments, translate_segments
+
+ARTICLE = 'First point here. Second point here! Third point here? Fourth point here.'
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    stored = {}
+
+    def lookup(texts, model, prompt_version):
+        assert prompt_version == '1-segments'
+        return {text: stored[normalize_text(text)] for text in texts if normalize_text(text) in stored}
+
+    def store(pairs, model, prompt_version):
+        assert prompt_version == '1-segments'
+        stored.update((normalize_text(text), translated) for text, translated in pairs)
+
+    monkeypatch.setattr(translation_memory, 'lookup_translations', lookup)
+    monkeypatch.setattr(translation_memory, 'store_translations', store)
+    return stored
+
+
+def fake_translate(calls):
+    def translate(text):
+        calls.append(text)
+        return ' '.join('RU ' + sentence.strip() for sentence in split_segments(text))
+    return translate
+
+
+def test_split_segments_round_trip():
+    assert ''.join(split_segments(ARTICLE)) == ARTICLE
+    assert split_segments(ARTICLE)[1] == 'Second point here! '
+
+
+def test_only_changed_sentences_are_translated(memory):
+    calls = []
+    first = translate_segments(split_segments(ARTICLE), fake_translate(calls), 'm', '1')
+    assert first.calls == 1 and first.reused == 0 and first.complete
+    assert len(memory) == 4
+
+    edited = ARTICLE.replace('Third point here?', 'Third point, rewritten upstream?')
+    calls.clear()
+    second = translate_segments(split_segments(edited), fake_translate(calls), 'm', '1')
+    assert calls == ['Third point, rewritten upstream? ']
+    assert second.reused == 3 and second.calls == 1
+    assert second.text == ('RU First point here. RU Second point here! '
+                           'RU Third point, rewritten upstream? RU Fourth point here.')
+
+
+def test_runs_respect_max_chars_and_failures_keep_source(memory):
+    calls = []
+    result = translate_segments(split_segments(ARTICLE), lambda text: calls.append(text), 'm', '1', max_chars=40)
+    assert len(calls) == 2 and all(len(call) <= 40 for call in calls)
+    assert not result.complete
+    assert result.text == ARTICLE
+    assert memory == {}
+
+
+def test_misaligned_output_is_not_stored_per_sentence(memory):
+    translate_segments(split_segments(ARTICLE), lambda text: 'Один длинный перевод без разбиения', 'm', '1')
+    assert memory == {}
+
+
+def test_merged_and_split_sentences_are_not_stored(memory):
+    # four sentences back for four sources, but the first two were merged and the last one split
+    def translate(text):
+        return ('RU First and second point here, together in one long sentence. '
+                'RU Third point here? RU Fourth. RU Point here.')
+
+    result = translate_segments(split_segments(ARTICLE), translate, 'm', '1')
+    assert result.complete and memory == {}
@@ -0,0 +1,44 @@
+from backend._shared.security import validate_origin
+from backend._shared.validation import (
+    FieldSpec,
+    OriginMatcher,
+    is_valid_email,
+    is_valid_phone,
+    validate_form,
+)
+
+SPEC = {
+    'name': FieldSpec(default='Не указано'),
+    'phone': FieldSpec(required=True, validator=is_valid_phone, error='bad phone'),
+    'email': FieldSpec(validator=is_valid_email, error='bad email', empty_as_none=True),
+    'cookies': FieldSpec(default=False, sanitize=False),
+}
+
+
+def test_validate_form_cleans_and_collects_errors_in_spec_order():
+    cleaned, errors = validate_form({'name': '<b>Ann</b>', 'phone': '123', 'email': 'nope'}, SPEC)
+    assert cleaned['name'] == '&lt;b&gt;Ann&lt;/b&gt;'
+    assert cleaned['cookies'] is False
+    assert errors == ['bad phone', 'bad email']
+
+
+def test_validate_form_accepts_valid_payload():
+    cleaned, errors = validate_form({'phone': '+7 (999) 123-45-67', 'email': ''}, SPEC)
+    assert errors == []
+    assert cleaned['email'] is None
+    assert cleaned['name'] == 'Не указано'
+
+
+def test_origin_matcher_matches_hosts_and_subdomains_only():
+    matcher = OriginMatcher(['https://centerai.tech', 'localhost:5173'])
+    assert matcher.matches('https://centerai.tech')
+    assert matcher.matches('https://www.centerai.tech/brief?x=1')
+    assert matcher.matches('http://localhost:3000')
+    assert not matcher.matches('https://centerai.tech.evil.com')
+    assert not matcher.matches('')
+
+
+def test_validate_origin_reads_allowed_origins_env(monkeypatch):
+    monkeypatch.setenv('ALLOWED_ORIGINS', 'example.com, other.org')
+    assert validate_origin('https://app.example.com')
+    assert not validate_origin('https://example.net')
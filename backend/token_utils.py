@@ -2,8 +2,18 @@ import base64
 import hashlib
 import hmac
 import json
-from datetime import datetime
-from typing import Any, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+VERIFY_CACHE_SIZE = 1024
+# Upper bound on how long a verified token is trusted without re-checking revocation
+VERIFY_CACHE_TTL_SECONDS = 60
+
+_verify_cache: 'OrderedDict[str, Tuple[Dict[str, Any], float]]' = OrderedDict()
+_revoked_jtis: Dict[str, float] = {}
+_cache_lock = threading.Lock()
 
 
 def base64url_encode(data: bytes) -> str:
@@ -21,7 +31,7 @@ def hmac_sha256(payload: str, secret: str) -> str:
 
 
 def create_jwt(payload: Dict[str, Any], secret: str, expiry_seconds: int) -> str:
-    now = int(datetime.utcnow().timestamp())
+    now = int(time.time())
     claims = {**payload, 'iat': now, 'exp': now + expiry_seconds}
     header = {'alg': 'HS256', 'typ': 'JWT'}
     segments = [
@@ -33,15 +43,99 @@ def create_jwt(payload: Dict[str, Any], secret: str, expiry_seconds: int) -> str
     return '.'.join(segments)
 
 
-def verify_jwt(token: str, secret: str) -> Optional[Dict[str, Any]]:
+def _cache_key(token: str, secret: str) -> str:
+    # Keyed by secret as well, so an access token never hits an entry verified with the refresh secret
+    return hashlib.sha256(f'{secret}\x00{token}'.encode('utf-8')).hexdigest()
+
+
+def _decode_and_verify(token: str, secret: str) -> Optional[Dict[str, Any]]:
     try:
         header_b64, payload_b64, signature = token.split('.')
     except ValueError:
         return None
     signed_part = '.'.join([header_b64, payload_b64])
-    if hmac_sha256(signed_part, secret) != signature:
+    if not hmac.compare_digest(hmac_sha256(signed_part, secret), signature):
+        return None
+    try:
+        payload = json.loads(base64url_decode(payload_b64))
+    except (ValueError, TypeError):
         return None
-    payload = json.loads(base64url_decode(payload_b64))
-    if payload.get('exp') and payload['exp'] < int(datetime.utcnow().timestamp()):
+    if not isinstance(payload, dict):
         return None
     return payload
+
+
+def is_jti_revoked(jti: Optional[str]) -> bool:
+    if not jti:
+        return False
+    with _cache_lock:
+        revoked_until = _revoked_jtis.get(jti)
+        if revoked_until is None:
+            return False
+        if revoked_until < time.time():
+            del _revoked_jtis[jti]
+            return False
+        return True
+
+
+def revoke_jti(jti: str, ttl_seconds: int = VERIFY_CACHE_TTL_SECONDS) -> None:
+    '''Drops cached verifications for a token id and refuses to re-cache it for ttl_seconds.'''
+    if not jti:
+        return
+    with _cache_lock:
+        _revoked_jtis[jti] = time.time() + ttl_seconds
+        stale = [key for key, (payload, _) in _verify_cache.items() if payload.get('jti') == jti]
+        for key in stale:
+            del _verify_cache[key]
+
+
+def clear_verify_cache() -> None:
+    with _cache_lock:
+        _verify_cache.clear()
+        _revoked_jtis.clear()
+
+
+def verify_jwt(
+    token: str,
+    secret: str,
+    is_revoked: Optional[Callable[[str], bool]] = None,
+) -> Optional[Dict[str, Any]]:
+    '''
+    Verifies an HS256 token and returns its claims.
+    Valid tokens are kept in an LRU cache until min(exp, now + VERIFY_CACHE_TTL_SECONDS);
+    is_revoked is only consulted on a cache miss.
+    '''
+    if not token or not secret:
+        return None
+    now = time.time()
+    key = _cache_key(token, secret)
+    with _cache_lock:
+        cached = _verify_cache.get(key)
+        if cached is not None:
+            payload, expires_at = cached
+            if expires_at > now:
+                _verify_cache.move_to_end(key)
+                return dict(payload)
+            del _verify_cache[key]
+
+    payload = _decode_and_verify(token, secret)
+    if payload is None:
+        return None
+    exp = payload.get('exp')
+    if exp and exp < int(now):
+        return None
+    jti = payload.get('jti')
+    if is_jti_revoked(jti):
+        return None
+    if jti and is_revoked is not None and is_revoked(jti):
+        return None
+
+    expires_at = now + VERIFY_CACHE_TTL_SECONDS
+    if exp:
+        expires_at = min(expires_at, float(exp))
+    with _cache_lock:
+        _verify_cache[key] = (payload, expires_at)
+        _verify_cache.move_to_end(key)
+        while len(_verify_cache) > VERIFY_CACHE_SIZE:
+            _verify_cache.popitem(last=False)
+    return dict(payload)
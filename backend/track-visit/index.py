@@ -1,9 +1,24 @@
 import json
-import psycopg2
 import os
 from datetime import datetime
 from typing import Dict, Any
 
+from backend._shared.db import execute_prepared, get_connection, register_statement
+
+register_statement('track_visit_insert', """
+    INSERT INTO site_visits 
+    (visit_date, page_path, user_agent, referrer, session_id, ip_address, device_type, browser, is_admin)
+    VALUES (CURRENT_DATE, %s, %s, %s, %s, %s, %s, %s, %s)
+""")
+register_statement('track_visit_daily_stats', """
+    INSERT INTO daily_stats (stat_date, total_visits, page_views)
+    VALUES (CURRENT_DATE, 1, 1)
+    ON CONFLICT (stat_date) DO UPDATE
+    SET total_visits = daily_stats.total_visits + 1,
+        page_views = daily_stats.page_views + 1,
+        updated_at = CURRENT_TIMESTAMP
+""")
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Отслеживание посещений сайта
@@ -65,29 +80,15 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         elif 'edge' in user_agent.lower():
             browser = 'Edge'
         
-        dsn = os.environ.get('DATABASE_URL')
-        conn = psycopg2.connect(dsn)
-        cur = conn.cursor()
-        
-        cur.execute("""
-            INSERT INTO site_visits 
-            (visit_date, page_path, user_agent, referrer, session_id, ip_address, device_type, browser, is_admin)
-            VALUES (CURRENT_DATE, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (page_path, user_agent, referrer, session_id, ip_address, device_type, browser, is_admin))
-        
-        if not is_admin:
-            cur.execute("""
-                INSERT INTO daily_stats (stat_date, total_visits, page_views)
-                VALUES (CURRENT_DATE, 1, 1)
-                ON CONFLICT (stat_date) DO UPDATE
-                SET total_visits = daily_stats.total_visits + 1,
-                    page_views = daily_stats.page_views + 1,
-                    updated_at = CURRENT_TIMESTAMP
-            """)
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_connection() as conn:
+            cur = conn.cursor()
+            execute_prepared(cur, 'track_visit_insert', (
+                page_path, user_agent, referrer, session_id, ip_address, device_type, browser, is_admin
+            ))
+            if not is_admin:
+                execute_prepared(cur, 'track_visit_daily_stats')
+            conn.commit()
+            cur.close()
         
         return {
             'statusCode': 200,
@@ -2,7 +2,8 @@ import json
 import os
 from datetime import datetime, timedelta
 from typing import Dict, Any
-import requests
+
+from backend._shared.http import http_get
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
@@ -89,7 +90,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'Content-Type': 'application/json'
         }
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = http_get(url, params=params, headers=headers, timeout=10)
         
         if response.status_code != 200:
             return {
@@ -1,7 +1,8 @@
 import json
 import os
 from typing import Dict, Any, List
-import requests
+
+from backend._shared.http import http_get
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
@@ -61,7 +62,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         hosts_url = 'https://api.webmaster.yandex.net/v4/user/hosts'
         
         try:
-            hosts_response = requests.get(hosts_url, headers=headers, timeout=10)
+            hosts_response = http_get(hosts_url, headers=headers, timeout=10)
             
             if hosts_response.status_code != 200:
                 return {
@@ -120,7 +121,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         indexing_url = f'https://api.webmaster.yandex.net/v4/user/{user_id}/hosts/{host_id}/summary'
         
         try:
-            indexing_response = requests.get(indexing_url, headers=headers, timeout=10)
+            indexing_response = http_get(indexing_url, headers=headers, timeout=10)
             
             if indexing_response.status_code == 200:
                 indexing_data = indexing_response.json()
@@ -139,7 +140,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         diagnostics_url = f'https://api.webmaster.yandex.net/v4/user/{user_id}/hosts/{host_id}/diagnostics'
         
         try:
-            diagnostics_response = requests.get(diagnostics_url, headers=headers, timeout=10)
+            diagnostics_response = http_get(diagnostics_url, headers=headers, timeout=10)
             
             if diagnostics_response.status_code == 200:
                 diagnostics_data = diagnostics_response.json()
@@ -161,7 +162,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         sqi_url = f'https://api.webmaster.yandex.net/v4/user/{user_id}/hosts/{host_id}/sqi-history'
         
         try:
-            sqi_response = requests.get(sqi_url, headers=headers, timeout=10)
+            sqi_response = http_get(sqi_url, headers=headers, timeout=10)
             
             if sqi_response.status_code == 200:
                 sqi_data = sqi_response.json()